@@ -0,0 +1,96 @@
+"""
+Synthetic Python corpora for benchmarking pyrefactor.
+
+Every generator is deterministic for a given seed, so the same corpus can be
+rebuilt on another machine and timings compared against a saved baseline.
+"""
+import random
+from pathlib import Path
+from typing import Callable, Dict, List
+
+
+def deep_nesting(rng: random.Random, depth: int) -> str:
+    """A function with ``depth`` nested loops and conditionals."""
+    lines = ["def deeply_nested(data):", "    total = 0"]
+    indent = "    "
+    for level in range(depth):
+        if level % 2 == 0:
+            lines.append(f"{indent}for i{level} in range(len(data)):")
+        else:
+            lines.append(f"{indent}if data[i{level - 1}] > {rng.randint(0, 100)}:")
+        indent += "    "
+    lines.append(f"{indent}total += {rng.randint(1, 9)}")
+    lines.append("    return total")
+    return "\n".join(lines) + "\n"
+
+
+def huge_function(rng: random.Random, statements: int) -> str:
+    """One function with ``statements`` mixed statements and loops."""
+    lines = ["def huge_function(values):", "    result = []"]
+    for index in range(statements):
+        choice = rng.randrange(4)
+        if choice == 0:
+            lines.append(f"    x{index} = values[{index % 7}] * {rng.randint(1, 50)}")
+        elif choice == 1:
+            lines.append(f"    for item{index} in values:")
+            lines.append(f"        result.append(item{index} + {index})")
+        elif choice == 2:
+            lines.append(f"    if len(values) > {index}:")
+            lines.append(f"        result.append({index})")
+        else:
+            lines.append(f"    while len(result) < {index % 5}:")
+            lines.append(f"        result.append(len(result))")
+    lines.append("    return result")
+    return "\n".join(lines) + "\n"
+
+
+def small_module(rng: random.Random, functions: int) -> str:
+    """A small module with a few short functions."""
+    parts = []
+    for index in range(functions):
+        parts.append(
+            f"def helper_{index}(a, b):\n"
+            f"    if a > b:\n"
+            f"        return a - {rng.randint(0, 9)}\n"
+            f"    return b + {rng.randint(0, 9)}\n"
+        )
+    return "\n\n".join(parts)
+
+
+def long_elif_chain(rng: random.Random, branches: int) -> str:
+    """A function dispatching over a long if/elif/else chain."""
+    lines = ["def dispatch(code):", "    if code == 0:", "        return 'zero'"]
+    for index in range(1, branches):
+        lines.append(f"    elif code == {index}:")
+        lines.append(f"        return '{rng.choice('abcdef')}{index}'")
+    lines.append("    else:")
+    lines.append("        return None")
+    return "\n".join(lines) + "\n"
+
+
+SHAPES: Dict[str, Callable[[random.Random, int], List[str]]] = {
+    "deep_nesting": lambda rng, scale: [deep_nesting(rng, 6 + index % 10) for index in range(10 * scale)],
+    "huge_functions": lambda rng, scale: [huge_function(rng, 2000 * scale) for _ in range(2)],
+    "many_small_files": lambda rng, scale: [small_module(rng, 3) for _ in range(200 * scale)],
+    "long_elif_chains": lambda rng, scale: [long_elif_chain(rng, 100 * scale) for _ in range(5)],
+}
+
+
+def generate_sources(shape: str, scale: int = 1, seed: int = 0) -> List[str]:
+    """Generate the source files of one corpus shape in memory."""
+    return SHAPES[shape](random.Random(f"{shape}:{seed}"), scale)
+
+
+def write_corpus(directory: Path, shapes: List[str], scale: int = 1, seed: int = 0) -> Dict[str, List[Path]]:
+    """Write the requested shapes below ``directory``, one subdirectory per shape."""
+    written = {}
+    for shape in shapes:
+        shape_dir = Path(directory) / shape
+        shape_dir.mkdir(parents=True, exist_ok=True)
+        paths = []
+        for index, source in enumerate(generate_sources(shape, scale, seed)):
+            path = shape_dir / f"{shape}_{index:05d}.py"
+            path.write_text(source, encoding="utf-8")
+            paths.append(path)
+        written[shape] = paths
+    return written
@@ -0,0 +1,182 @@
+"""
+Benchmark suite for pyrefactor.
+
+Measures throughput (files/sec), wall time and peak memory of analyze_code,
+each analysis rule, ProjectAnalyzer and generate_tests over synthetic corpora,
+and saves the numbers as a JSON baseline that later runs can be compared to:
+
+    python benchmarks/run.py --output baseline.json
+    python benchmarks/run.py --compare baseline.json
+"""
+import argparse
+import ast
+import gc
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import pyrefactor  # noqa: E402
+from corpus import SHAPES, generate_sources, write_corpus  # noqa: E402
+from pyrefactor import analyze_code, generate_tests  # noqa: E402
+from pyrefactor.analyzer import default_rules  # noqa: E402
+from pyrefactor.engine import RuleEngine  # noqa: E402
+from pyrefactor.file_analyzer import ProjectAnalyzer  # noqa: E402
+
+
+def measure(func: Callable[[], object], repeat: int, trace_memory: bool = True) -> Dict[str, float]:
+    """Best wall time over ``repeat`` runs, plus peak traced memory of one run."""
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+
+    result = {"seconds": best}
+    if trace_memory:
+        gc.collect()
+        tracemalloc.start()
+        func()
+        result["peak_mb"] = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        tracemalloc.stop()
+    return result
+
+
+def _rss_mb(who: str) -> float:
+    """Peak resident memory of this process ("self") or of its reaped children ("children")."""
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_SELF if who == "self" else resource.RUSAGE_CHILDREN).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return usage / (1024 * 1024) if sys.platform == "darwin" else usage / 1024
+
+
+def project_rss(directory: str, jobs: Optional[int]) -> Dict[str, float]:
+    """Analyze ``directory`` with ProjectAnalyzer and return the peak memory of this process and its workers."""
+    ProjectAnalyzer(directory, jobs=jobs).analyze_project()
+    return {"peak_rss_mb": _rss_mb("self"), "peak_worker_rss_mb": _rss_mb("children")}
+
+
+def _project_rss_in_subprocess(directory: str, jobs: Optional[int]) -> Dict[str, float]:
+    """
+    Run project_rss() in a fresh interpreter.
+
+    getrusage() only knows the peak over a process's whole life, and over
+    every child reaped so far, so measuring in this process would fold in
+    all earlier benchmarks.
+    """
+    code = (f"import json, sys; sys.path.insert(0, {str(Path(__file__).resolve().parent)!r}); import run; "
+            f"print(json.dumps(run.project_rss({directory!r}, {jobs!r})))")
+    output = subprocess.run([sys.executable, "-c", code], check=True, stdout=subprocess.PIPE, text=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def run_benchmarks(shapes: List[str], scale: int, seed: int, repeat: int, jobs: int) -> Dict[str, Dict[str, float]]:
+    results = {}
+
+    for shape in shapes:
+        sources = generate_sources(shape, scale, seed)
+        n_files = len(sources)
+
+        def throughput(timing: Dict[str, float]) -> Dict[str, float]:
+            timing["files"] = n_files
+            timing["files_per_sec"] = n_files / timing["seconds"] if timing["seconds"] else 0.0
+            return timing
+
+        results[f"analyze_code/{shape}"] = throughput(measure(
+            lambda: [analyze_code(source) for source in sources], repeat))
+
+        trees = [ast.parse(source) for source in sources]
+        results[f"parse/{shape}"] = throughput(measure(
+            lambda: [ast.parse(source) for source in sources], repeat, trace_memory=False))
+        for rule in default_rules():
+            rule_type = type(rule)
+            results[f"rule/{rule_type.__name__}/{shape}"] = throughput(measure(
+                lambda: [RuleEngine([rule_type()]).run(tree, source) for tree, source in zip(trees, sources)],
+                repeat, trace_memory=False))
+
+        results[f"generate_tests/{shape}"] = throughput(measure(
+            lambda: [generate_tests(source, "module") for source in sources], repeat))
+
+        with tempfile.TemporaryDirectory() as directory:
+            write_corpus(Path(directory), [shape], scale, seed)
+            analyzer = ProjectAnalyzer(directory, jobs=jobs)
+            timing = throughput(measure(analyzer.analyze_project, repeat, trace_memory=False))
+            timing.update(_project_rss_in_subprocess(directory, jobs))
+            results[f"project/{shape}"] = timing
+
+    return results
+
+
+def compare(current: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], tolerance: float) -> int:
+    """Print a comparison table; return the number of throughput regressions."""
+    regressions = 0
+    print(f"{'benchmark':<50} {'baseline':>12} {'current':>12} {'change':>9}")
+    for name, timing in current.items():
+        previous = baseline.get(name)
+        if not previous or not previous.get("seconds"):
+            print(f"{name:<50} {'-':>12} {timing['seconds']:>11.4f}s {'new':>9}")
+            continue
+        change = timing["seconds"] / previous["seconds"] - 1
+        flag = ""
+        if change > tolerance:
+            regressions += 1
+            flag = "  REGRESSION"
+        print(f"{name:<50} {previous['seconds']:>11.4f}s {timing['seconds']:>11.4f}s {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shape", action="append", choices=sorted(SHAPES), help="corpus shape (default: all)")
+    parser.add_argument("--scale", type=int, default=1, help="corpus size multiplier (default: 1)")
+    parser.add_argument("--seed", type=int, default=0, help="corpus random seed (default: 0)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per benchmark; the best is kept (default: 3)")
+    parser.add_argument("--jobs", type=int, default=None, help="ProjectAnalyzer worker processes")
+    parser.add_argument("--output", help="save results as a JSON baseline")
+    parser.add_argument("--compare", help="compare against a saved JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="slowdown counted as a regression by --compare (default: 0.10)")
+    args = parser.parse_args(argv)
+
+    shapes = args.shape or sorted(SHAPES)
+    results = run_benchmarks(shapes, args.scale, args.seed, args.repeat, args.jobs)
+    report = {
+        "meta": {
+            "pyrefactor": pyrefactor.__version__,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "scale": args.scale,
+            "seed": args.seed,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        return 1 if compare(results, baseline, args.tolerance) else 0
+
+    for name, timing in results.items():
+        print(f"{name:<50} {timing['seconds']:>9.4f}s {timing['files_per_sec']:>10.1f} files/s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -30,6 +30,11 @@ setup(
     ],
     python_requires=">=3.8",
     install_requires=requirements,
+    entry_points={
+        "console_scripts": [
+            "pyrefactor=pyrefactor.cli:main",
+        ],
+    },
     extras_require={
         "dev": [
             "pytest>=7.3.1",
@@ -2,8 +2,8 @@
 pyrefactor - Python code refactoring and optimization assistant.
 """
 
-from .analyzer import analyze_code, generate_tests
-from .models import CodeIssue
+from .analyzer import analyze_code, analyze_many, generate_tests
+from .models import CodeIssue, SourceAnalysis
 
 __version__ = "0.1.3"
-__all__ = ["analyze_code", "generate_tests", "CodeIssue"]
+__all__ = ["analyze_code", "analyze_many", "generate_tests", "CodeIssue", "SourceAnalysis"]
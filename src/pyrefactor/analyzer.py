@@ -1,64 +1,77 @@
 import ast
-from typing import List
+from concurrent.futures import FIRST_COMPLETED, Executor, ProcessPoolExecutor, wait
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Hashable, Iterable, Iterator, List, Optional, Tuple, Union
 
+from .engine import Rule, RuleEngine
 from .generators import UnitTestGenerator
-from .models import CodeIssue
-from .visitors import ComplexityVisitor, CodeSmellVisitor, OptimizationVisitor
+from .incremental import SegmentCache
+from .models import CodeIssue, SourceAnalysis, SourceText
+from .numpy_rules import NumpyVectorizationVisitor
+from .pandas_rules import PandasVisitor
+from .profiling import AnalysisStats, optional_phase
+from .visitors import (
+    ComplexityVisitor, CodeSmellVisitor, LoopInvariantVisitor, MembershipTestVisitor, MemoizationVisitor,
+    OptimizationVisitor,
+)
 
 
-class CodeAnalyzer:
-    """Main class for analyzing and refactoring Python code."""
+def default_rules() -> List[Rule]:
+    """Create a fresh instance of every built-in analysis rule."""
+    return [ComplexityVisitor(), CodeSmellVisitor(), OptimizationVisitor(), MembershipTestVisitor(),
+            LoopInvariantVisitor(), NumpyVectorizationVisitor(), PandasVisitor(), MemoizationVisitor()]
+
 
-    def __init__(self, source_code: str):
-        self.source_code = source_code
-        self.ast_tree = ast.parse(source_code)
+class CodeAnalyzer:
+    """
+    Main class for analyzing and refactoring Python code.
+
+    The syntax tree is released as soon as analyze() has run the rules, so
+    an analyzer that is kept around only holds on to its issues and the
+    (releasable) source text. Accessing ``ast_tree`` afterwards re-parses.
+
+    With a ``segment_cache``, findings of unchanged top-level definitions
+    are reused from earlier analyses instead of walking them again.
+    """
+
+    def __init__(self, source_code: Union[str, bytes], rules: Optional[List[Rule]] = None, filepath: Optional[Path] = None,
+                 stats: Optional[AnalysisStats] = None, tree: Optional[ast.AST] = None,
+                 segment_cache: Optional[SegmentCache] = None):
+        self.source = SourceText(source_code, filepath)
+        self.stats = stats
+        self.segment_cache = segment_cache
+        if tree is not None:
+            # An already parsed tree of source_code, e.g. from a warm cache
+            self._tree = tree
+        else:
+            with optional_phase(stats, "parse"):
+                self._tree = ast.parse(source_code)
+        self.rules = rules if rules is not None else default_rules()
         self.issues: List[CodeIssue] = []
 
+    @property
+    def source_code(self) -> str:
+        return self.source.text
+
+    @property
+    def ast_tree(self) -> ast.AST:
+        if self._tree is None:
+            with optional_phase(self.stats, "parse"):
+                self._tree = ast.parse(self.source.text)
+        return self._tree
+
     def analyze(self) -> List[CodeIssue]:
-        """Perform comprehensive code analysis."""
-        self._analyze_complexity()
-        self._detect_code_smells()
-        self._find_optimization_opportunities()
+        """Perform comprehensive code analysis in a single pass over the AST."""
+        if self.segment_cache is not None:
+            self.issues.extend(self.segment_cache.analyze(self.ast_tree, self.source, self.rules, self.stats))
+        else:
+            engine = RuleEngine(self.rules, self.stats)
+            engine.run(self.ast_tree, self.source)
+            self.issues.extend(engine.issues)
+        self._tree = None
         return self.issues
 
-    def _analyze_complexity(self):
-        """Analyze cyclomatic complexity of the code."""
-        visitor = ComplexityVisitor()
-        visitor.visit(self.ast_tree)
-
-        for func_node, complexity in visitor.complexities.items():
-            if complexity > 10:  # McCabe complexity threshold
-                self.issues.append(CodeIssue(
-                    line_number=func_node.lineno,
-                    issue_type="high_complexity",
-                    description=f"Function '{func_node.name}' has high cyclomatic complexity ({complexity})",
-                    suggestion="Consider breaking down this function into smaller, more focused functions",
-                    original_code=self._get_node_source(func_node)
-                ))
-
-    def _detect_code_smells(self):
-        """Detect common code smells."""
-        visitor = CodeSmellVisitor()
-        visitor.visit(self.ast_tree)
-
-        for issue in visitor.issues:
-            self.issues.append(issue)
-
-    def _find_optimization_opportunities(self):
-        """Identify potential optimization opportunities."""
-        visitor = OptimizationVisitor()
-        visitor.visit(self.ast_tree)
-
-        for issue in visitor.issues:
-            self.issues.append(issue)
-
-    def _get_node_source(self, node: ast.AST) -> str:
-        """Extract source code for a given AST node."""
-        lines = self.source_code.splitlines()
-        if hasattr(node, 'lineno') and hasattr(node, 'end_lineno'):
-            return '\n'.join(lines[node.lineno - 1:node.end_lineno])
-        return ""
-
     def generate_unit_tests(self, module_name: str) -> str:
         """Generate unit tests for the analyzed code."""
         test_generator = UnitTestGenerator(self.ast_tree, module_name)
@@ -75,3 +88,68 @@ def generate_tests(source_code: str, module_name: str) -> str:
     """Generate unit tests for the given source code."""
     analyzer = CodeAnalyzer(source_code)
     return analyzer.generate_unit_tests(module_name)
+
+
+def _analyze_sources(batch: List[Tuple[Hashable, Union[str, bytes]]],
+                     rules_factory: Callable[[], List[Rule]] = default_rules) -> List[SourceAnalysis]:
+    """Analyze a batch of in-memory sources, capturing errors per item."""
+    results = []
+    for source_id, source_code in batch:
+        try:
+            issues = CodeAnalyzer(source_code, rules=rules_factory()).analyze()
+            results.append(SourceAnalysis(source_id, issues))
+        except Exception as e:
+            results.append(SourceAnalysis(source_id, [], error=f"{type(e).__name__}: {str(e)}"))
+    return results
+
+
+def analyze_many(sources: Iterable[Tuple[Hashable, Union[str, bytes]]], jobs: int = 1,
+                 executor: Optional[Executor] = None, batch_size: int = 64,
+                 max_in_flight: Optional[int] = None,
+                 rules_factory: Callable[[], List[Rule]] = default_rules) -> Iterator[SourceAnalysis]:
+    """
+    Analyze many in-memory sources, yielding a SourceAnalysis per item.
+
+    ``sources`` yields ``(id, source)`` pairs and is consumed lazily. Items
+    that fail (e.g. with a SyntaxError) are reported through the ``error``
+    of their result instead of raising. Sources are analyzed in batches of
+    ``batch_size`` so that pool overhead is paid per batch, not per item.
+
+    With ``jobs`` > 1 (or an ``executor``, which is left running so it can
+    be reused across calls) batches are analyzed in parallel, at most
+    ``max_in_flight`` (default: twice ``jobs``) at a time, and results arrive
+    in completion order. Otherwise they are analyzed in-process, in input
+    order. When passing an ``executor``, give its number of workers as
+    ``jobs``. A custom ``rules_factory`` must be picklable to be used with a
+    process pool.
+    """
+    iterator = iter(sources)
+    batches = iter(lambda: list(islice(iterator, batch_size)), [])
+
+    if executor is None and jobs <= 1:
+        for batch in batches:
+            yield from _analyze_sources(batch, rules_factory)
+        return
+
+    owned = executor is None
+    if owned:
+        executor = ProcessPoolExecutor(max_workers=jobs)
+    max_in_flight = max_in_flight or max(jobs, 1) * 2
+    pending = set()
+    try:
+        for batch in batches:
+            while len(pending) >= max_in_flight:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+            pending.add(executor.submit(_analyze_sources, batch, rules_factory))
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield from future.result()
+    finally:
+        for future in pending:
+            future.cancel()
+        if owned:
+            executor.shutdown()
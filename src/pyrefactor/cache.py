@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from .analyzer import default_rules
+from .engine import rules_signature
+from .models import CodeIssue, FileAnalysis
+
+
+class ResultCache:
+    """
+    Persistent, content-addressed cache of per-file analysis results.
+
+    Entries are keyed by a hash of the file contents, the pyrefactor version
+    and the rule configuration, so a cached result is reused for any
+    byte-identical file no matter where it lives. An index of
+    ``(size, mtime)`` per path lets warm runs skip re-hashing unchanged files,
+    which makes a hit little more than a ``stat()`` and one small read.
+    """
+
+    INDEX_FILE = "index.json"
+
+    def __init__(self, directory: str, config: Optional[str] = None, max_bytes: int = 256 * 1024 * 1024,
+                 max_entries: Optional[int] = None):
+        from . import __version__
+
+        if config is None:
+            config = rules_signature(default_rules())
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._salt = f"{__version__}\0{config}".encode("utf-8")
+        self._files: Dict[str, list] = {}
+        self._entries: Dict[str, list] = {}
+        self._pending: Dict[str, str] = {}
+        self._load_index()
+
+    def _load_index(self):
+        try:
+            with open(self.directory / self.INDEX_FILE, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            self._files = index.get("files", {})
+            self._entries = index.get("entries", {})
+        except (OSError, ValueError):
+            self._files, self._entries = {}, {}
+
+    def _entry_path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def _entry_key(self, content_digest: str) -> str:
+        return hashlib.sha256(self._salt + content_digest.encode("ascii")).hexdigest()
+
+    def _content_digest(self, filepath: Path, stat: os.stat_result) -> str:
+        """Hash of the file contents, reusing the index when size and mtime match."""
+        record = self._files.get(str(filepath))
+        if record and record[0] == stat.st_size and record[1] == stat.st_mtime_ns:
+            return record[2]
+
+        with open(filepath, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        self._files[str(filepath)] = [stat.st_size, stat.st_mtime_ns, digest]
+        return digest
+
+    def lookup(self, filepath: Path) -> Optional[FileAnalysis]:
+        """Return the cached analysis of ``filepath``, or None on a miss."""
+        try:
+            stat = os.stat(filepath)
+            key = self._entry_key(self._content_digest(filepath, stat))
+        except OSError:
+            return None
+
+        if key not in self._entries:
+            self._pending[str(filepath)] = key
+            return None
+
+        try:
+            with open(self._entry_path(key), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            del self._entries[key]
+            self._pending[str(filepath)] = key
+            return None
+
+        self._entries[key][1] = time.time()
+        return FileAnalysis(
+            filepath=filepath,
+            issues=[CodeIssue(**issue) for issue in data["issues"]],
+            error=data["error"],
+        )
+
+    def store(self, analysis: FileAnalysis):
+        """Record the analysis of a file previously passed to lookup()."""
+        key = self._pending.pop(str(analysis.filepath), None)
+        if key is None:
+            return
+        # The file was edited after it was analyzed; its snippets are gone
+        sources = {issue.span.source for issue in analysis.issues if issue.span is not None}
+        if any(source.changed() for source in sources):
+            return
+
+        payload = json.dumps({
+            "issues": [issue.to_dict() for issue in analysis.issues],
+            "error": analysis.error,
+        })
+        entry_path = self._entry_path(key)
+        entry_path.parent.mkdir(parents=True, exist_ok=True)
+        self._atomic_write(entry_path, payload)
+        self._entries[key] = [len(payload), time.time()]
+
+    def save(self):
+        """Evict least recently used entries over the limits and persist the index."""
+        self._evict()
+        self._files = {
+            path: record for path, record in self._files.items()
+            if self._entry_key(record[2]) in self._entries
+        }
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._atomic_write(
+            self.directory / self.INDEX_FILE,
+            json.dumps({"files": self._files, "entries": self._entries}),
+        )
+
+    def _evict(self):
+        total = sum(size for size, _ in self._entries.values())
+        over_count = len(self._entries) - self.max_entries if self.max_entries is not None else 0
+        if total <= self.max_bytes and over_count <= 0:
+            return
+
+        for key, (size, _) in sorted(self._entries.items(), key=lambda item: item[1][1]):
+            if total <= self.max_bytes and over_count <= 0:
+                break
+            try:
+                os.unlink(self._entry_path(key))
+            except OSError:
+                pass
+            del self._entries[key]
+            total -= size
+            over_count -= 1
+
+    @staticmethod
+    def _atomic_write(path: Path, content: str):
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
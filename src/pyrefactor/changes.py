@@ -0,0 +1,81 @@
+import json
+import os
+import subprocess
+from pathlib import Path
+from typing import Dict, Iterable, List, Set
+
+
+def _git(root: Path, *args: str) -> str:
+    completed = subprocess.run(
+        ["git", "-C", str(root), *args],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"git {' '.join(args)} failed: {completed.stderr.strip()}")
+    return completed.stdout
+
+
+def git_changed_files(root: Path, ref: str) -> Set[Path]:
+    """
+    Files that differ from ``ref`` in the git repository containing ``root``.
+
+    Includes committed, staged and unstaged changes relative to ``ref`` as
+    well as untracked files that are not ignored. Paths are absolute.
+    """
+    toplevel = Path(_git(root, "rev-parse", "--show-toplevel").strip())
+    diff = _git(root, "diff", "--name-only", "-z", ref, "--")
+    untracked = _git(root, "ls-files", "--others", "--exclude-standard", "-z", "--full-name")
+
+    return {
+        (toplevel / name).resolve()
+        for name in (diff + untracked).split("\0")
+        if name
+    }
+
+
+class MtimeIndex:
+    """
+    Persistent (size, mtime) index used to detect changed files in trees
+    that are not under git.
+    """
+
+    def __init__(self, index_file: str):
+        self.index_file = Path(index_file)
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                self._records: Dict[str, List[int]] = json.load(f)
+        except (OSError, ValueError):
+            self._records = {}
+
+    @staticmethod
+    def _signature(filepath: Path) -> List[int]:
+        stat = os.stat(filepath)
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def changed(self, filepaths: Iterable[Path]) -> List[Path]:
+        """Files that are new or whose size or mtime differ from the index."""
+        changed = []
+        for filepath in filepaths:
+            try:
+                if self._records.get(str(filepath)) != self._signature(filepath):
+                    changed.append(filepath)
+            except OSError:
+                changed.append(filepath)
+        return changed
+
+    def update(self, filepaths: Iterable[Path]):
+        """Record the current signature of ``filepaths`` and forget all other files."""
+        records = {}
+        for filepath in filepaths:
+            try:
+                records[str(filepath)] = self._signature(filepath)
+            except OSError:
+                pass
+        self._records = records
+
+    def save(self):
+        self.index_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.index_file, 'w', encoding='utf-8') as f:
+            json.dump(self._records, f)
@@ -0,0 +1,213 @@
+"""
+Command line interface for pyrefactor.
+"""
+import argparse
+import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .cache import ResultCache
+from .file_analyzer import ProjectAnalyzer
+from .models import FileAnalysis
+
+DEFAULT_CACHE_DIR = ".pyrefactor_cache"
+# The per-user runtime directory is private; the temp dir is shared, but the
+# daemon only lets its own user connect to the socket.
+DEFAULT_SOCKET = os.path.join(
+    os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir(),
+    f"pyrefactor-{os.getuid() if hasattr(os, 'getuid') else 0}.sock",
+)
+
+
+def _project_analyzer(args: argparse.Namespace) -> ProjectAnalyzer:
+    cache = None
+    if not args.no_cache:
+        cache_dir = args.cache_dir or str(Path(args.path) / DEFAULT_CACHE_DIR)
+        cache = ResultCache(cache_dir, max_bytes=args.cache_size * 1024 * 1024)
+
+    return ProjectAnalyzer(
+        args.path,
+        exclude_dirs=args.exclude_dir,
+        exclude_files=args.exclude_file,
+        jobs=args.jobs,
+        cache=cache,
+        profile=args.profile,
+        trace_memory=args.trace_memory,
+        respect_gitignore=not args.no_gitignore,
+        memory_budget=args.memory_budget * 1024 * 1024 if args.memory_budget else None,
+        shard=getattr(args, "shard", None),
+    )
+
+
+def _analyze(args: argparse.Namespace) -> int:
+    analyzer = _project_analyzer(args)
+    if analyzer.shard is not None:
+        if not args.output:
+            raise SystemExit("pyrefactor analyze: --shard needs -o/--output for the shard result file")
+        results = _analyze_project(analyzer, args)
+        analyzer.save_shard(results, args.output)
+        return 0
+    if args.format != "markdown":
+        return _write_machine_readable(analyzer, args)
+
+    results = _analyze_project(analyzer, args)
+    report = analyzer.generate_report(results, output_file=args.output, stats=analyzer.stats)
+    if not args.output:
+        sys.stdout.write(report + "\n")
+    return 0
+
+
+def _write_machine_readable(analyzer: ProjectAnalyzer, args: argparse.Namespace) -> int:
+    if args.changed_since is None and args.index is None:
+        # Stream results as they are produced instead of holding them all.
+        analyses = analyzer.iter_project()
+    else:
+        analyses = _analyze_project(analyzer, args).values()
+    return _write_analyses(analyses, analyzer.root_path, args)
+
+
+def _analyze_project(analyzer: ProjectAnalyzer, args: argparse.Namespace) -> Dict[str, FileAnalysis]:
+    """
+    Analyze the project, re-analyzing only changed files with --changed-since / --index.
+
+    Unchanged files are reported from the cache, so the report stays complete;
+    with --no-cache it only covers the changed files.
+    """
+    if args.changed_since is None and args.index is None:
+        return analyzer.analyze_project()
+    return analyzer.analyze_project(changed_since=args.changed_since, index_file=args.index,
+                                    previous=analyzer.cached_results() if analyzer.cache else None)
+
+
+def _write_analyses(analyses, root_path: Path, args: argparse.Namespace) -> int:
+    from .writers import write_results
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            write_results(analyses, f, args.format, root_path=root_path)
+    else:
+        write_results(analyses, sys.stdout, args.format, root_path=root_path)
+    return 0
+
+
+def _merge(args: argparse.Namespace) -> int:
+    from .sharding import merge_shards
+
+    try:
+        root, results = merge_shards(args.shards, root_path=args.root)
+    except (OSError, ValueError, KeyError) as e:
+        raise SystemExit(f"pyrefactor merge: {e}")
+
+    if args.format != "markdown":
+        return _write_analyses(results.values(), root, args)
+    report = ProjectAnalyzer(str(root)).generate_report(results, output_file=args.output)
+    if not args.output:
+        sys.stdout.write(report + "\n")
+    return 0
+
+
+def _watch(args: argparse.Namespace) -> int:
+    from .watch import ProjectWatcher
+
+    def report_update(update):
+        for filepath in update.removed:
+            sys.stderr.write(f"removed {filepath}\n")
+        for filepath, analysis in update.analyzed.items():
+            status = analysis.error or f"{len(analysis.issues)} issue(s)"
+            sys.stderr.write(f"analyzed {filepath}: {status}\n")
+        if not args.output:
+            sys.stdout.write(watcher.report + "\n")
+            sys.stdout.flush()
+
+    watcher = ProjectWatcher(
+        _project_analyzer(args),
+        debounce=args.debounce,
+        poll_interval=args.poll_interval,
+        use_inotify=not args.poll,
+        output_file=args.output,
+        on_update=report_update,
+    )
+    watcher.start()
+    if not args.output:
+        sys.stdout.write(watcher.report + "\n")
+        sys.stdout.flush()
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def _daemon(args: argparse.Namespace) -> int:
+    from .daemon import serve
+
+    serve(args.socket, max_entries=args.max_entries, jobs=args.jobs)
+    return 0
+
+
+def _shard(spec: str):
+    from .sharding import parse_shard
+
+    try:
+        return parse_shard(spec)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def _add_project_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("path", help="directory to analyze")
+    parser.add_argument("-o", "--output", help="write the report to this file instead of stdout")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="number of worker processes (default: CPU count)")
+    parser.add_argument("--exclude-dir", action="append", default=None, help="directory name or glob to skip (repeatable)")
+    parser.add_argument("--exclude-file", action="append", default=None, help="file name or glob to skip (repeatable)")
+    parser.add_argument("--no-gitignore", action="store_true", help="also analyze files matched by .gitignore")
+    parser.add_argument("--memory-budget", type=int, metavar="MIB", help="limit the estimated memory of work in flight (MiB)")
+    parser.add_argument("--no-cache", action="store_true", help="do not read or write the result cache")
+    parser.add_argument("--cache-dir", help=f"result cache location (default: <path>/{DEFAULT_CACHE_DIR})")
+    parser.add_argument("--cache-size", type=int, default=256, help="maximum cache size in MiB (default: 256)")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="pyrefactor", description="Python code refactoring and optimization assistant")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    analyze = subparsers.add_parser("analyze", help="analyze a project directory and write a report")
+    _add_project_arguments(analyze)
+    analyze.add_argument("--format", choices=("markdown", "jsonl", "sarif"), default="markdown",
+                         help="report format; jsonl and sarif are streamed as files finish (default: markdown)")
+    analyze.add_argument("--shard", type=_shard, metavar="I/N",
+                         help="analyze only shard I of N (1-based) and write a shard result file to -o for 'merge'")
+    analyze.add_argument("--changed-since", metavar="REF", help="only analyze files changed since this git ref; others are reported from the cache (with --no-cache the report only covers the changed files)")
+    analyze.add_argument("--index", metavar="FILE", help="only analyze files whose size/mtime changed since the last run recorded in FILE; others are reported from the cache (with --no-cache the report only covers the changed files)")
+    analyze.add_argument("--profile", action="store_true", help="append per-phase, per-rule and per-file timings to the report")
+    analyze.add_argument("--trace-memory", action="store_true", help="with --profile, also record allocation deltas (slower)")
+    analyze.set_defaults(func=_analyze)
+
+    merge = subparsers.add_parser("merge", help="combine shard result files into one report")
+    merge.add_argument("shards", nargs="+", help="shard result files written by 'analyze --shard'")
+    merge.add_argument("-o", "--output", help="write the report to this file instead of stdout")
+    merge.add_argument("--format", choices=("markdown", "jsonl", "sarif"), default="markdown", help="report format (default: markdown)")
+    merge.add_argument("--root", help="directory the shard paths are relative to (default: the root recorded by the shards, which must agree); needed for shards run in different checkouts")
+    merge.set_defaults(func=_merge)
+
+    watch = subparsers.add_parser("watch", help="keep a report up to date while files change")
+    _add_project_arguments(watch)
+    watch.add_argument("--debounce", type=float, default=0.2, help="seconds to wait for a burst of changes to settle (default: 0.2)")
+    watch.add_argument("--poll", action="store_true", help="poll file stats instead of using inotify")
+    watch.add_argument("--poll-interval", type=float, default=1.0, help="seconds between polls (default: 1.0)")
+    watch.set_defaults(func=_watch, profile=False, trace_memory=False)
+
+    daemon = subparsers.add_parser("daemon", help="serve analysis requests on a Unix domain socket")
+    daemon.add_argument("--socket", default=DEFAULT_SOCKET, help=f"socket path (default: {DEFAULT_SOCKET})")
+    daemon.add_argument("--max-entries", type=int, default=512, help="parsed trees/results kept in memory (default: 512)")
+    daemon.add_argument("-j", "--jobs", type=int, default=1, help="worker processes for directory requests (default: 1)")
+    daemon.set_defaults(func=_daemon)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
@@ -0,0 +1,297 @@
+"""
+Long-running analysis daemon.
+
+A warm pyrefactor process listens on a Unix domain socket and answers
+newline-delimited JSON requests, one JSON response line per request:
+
+    {"id": 1, "op": "analyze_source", "source": "def f(): ..."}
+    {"id": 2, "op": "analyze_path", "path": "/abs/path/module.py"}
+    {"id": 3, "op": "generate_tests", "source": "...", "module_name": "stats"}
+    {"id": 4, "op": "ping"}
+    {"id": 5, "op": "shutdown"}
+
+Responses are ``{"id": ..., "ok": true, "result": ...}`` or
+``{"id": ..., "ok": false, "error": "..."}``. Parsed trees and results are
+kept in an in-memory LRU cache across requests, so re-analyzing an unchanged
+buffer costs a hash and a dictionary lookup, and re-analyzing an unchanged
+file costs a ``stat()`` and a dictionary lookup. When a buffer did change,
+findings for its unchanged top-level definitions are reused from a segment
+cache and only the edited definitions are walked again.
+"""
+import ast
+import errno
+import hashlib
+import json
+import os
+import socket
+import socketserver
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from stat import S_ISSOCK
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+from .analyzer import CodeAnalyzer
+from .file_analyzer import ProjectAnalyzer
+from .generators import UnitTestGenerator
+from .incremental import SegmentCache
+from .reader import read_source
+
+
+class _LRUCache:
+    """Thread-safe least-recently-used mapping."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Any, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key, compute: Callable[[], Any]):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        value = compute()
+
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class AnalysisService:
+    """Request handling and warm caches, independent of the transport."""
+
+    def __init__(self, max_entries: int = 512, jobs: int = 1):
+        self.jobs = jobs
+        self._trees = _LRUCache(max_entries)
+        self._results = _LRUCache(max_entries)
+        self._file_digests = _LRUCache(max_entries * 4)
+        self._segments = SegmentCache(max_entries * 16)
+        self.handlers: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+            "analyze_source": self.analyze_source,
+            "analyze_path": self.analyze_path,
+            "generate_tests": self.generate_tests,
+            "ping": lambda request: "pong",
+            "stats": self.stats,
+        }
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        response = {"id": request.get("id")}
+        handler = self.handlers.get(request.get("op"))
+        if handler is None:
+            response.update(ok=False, error=f"Unknown op: {request.get('op')!r}")
+            return response
+        try:
+            response.update(ok=True, result=handler(request))
+        except Exception as e:
+            response.update(ok=False, error=f"{type(e).__name__}: {str(e)}")
+        return response
+
+    def _parse(self, digest: str, load_source: Callable[[], Union[str, bytes]]) -> ast.AST:
+        return self._trees.get_or_compute(digest, lambda: ast.parse(load_source()))
+
+    def _analyze(self, digest: str, load_source: Callable[[], Union[str, bytes]],
+                 filepath: Optional[Path] = None) -> Dict[str, Any]:
+        def compute():
+            source = load_source()
+            analyzer = CodeAnalyzer(source, filepath=filepath, tree=self._parse(digest, lambda: source),
+                                    segment_cache=self._segments)
+            return [issue.to_dict() for issue in analyzer.analyze()]
+
+        try:
+            return {"issues": self._results.get_or_compute(digest, compute), "error": None}
+        except SyntaxError as e:
+            return {"issues": [], "error": f"{type(e).__name__}: {str(e)}"}
+
+    @staticmethod
+    def _digest(source: Union[str, bytes]) -> str:
+        if isinstance(source, str):
+            source = source.encode("utf-8", "surrogatepass")
+        return hashlib.sha256(source).hexdigest()
+
+    def _file_digest(self, path: Path) -> Tuple[str, Callable[[], bytes]]:
+        """Content digest of a file, re-hashed only when its size or mtime change."""
+        stat = path.stat()
+        loaded = {}
+
+        def digest_file() -> str:
+            loaded["source"] = read_source(path)
+            return self._digest(loaded["source"])
+
+        digest = self._file_digests.get_or_compute((str(path), stat.st_size, stat.st_mtime_ns), digest_file)
+        return digest, lambda: loaded["source"] if "source" in loaded else read_source(path)
+
+    def analyze_source(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        source = request["source"]
+        return self._analyze(self._digest(source), lambda: source)
+
+    def analyze_path(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        path = Path(request["path"])
+        if path.is_dir():
+            analyzer = ProjectAnalyzer(str(path), jobs=request.get("jobs", self.jobs))
+            return {
+                filepath: {"issues": [issue.to_dict() for issue in analysis.issues], "error": analysis.error}
+                for filepath, analysis in analyzer.analyze_project().items()
+            }
+        digest, load_source = self._file_digest(path)
+        return self._analyze(digest, load_source, filepath=path)
+
+    def generate_tests(self, request: Dict[str, Any]) -> str:
+        if "path" in request:
+            path = Path(request["path"])
+            digest, load_source = self._file_digest(path)
+            module_name = request.get("module_name") or path.stem
+        else:
+            source = request["source"]
+            digest, load_source = self._digest(source), lambda: source
+            module_name = request["module_name"]
+        return UnitTestGenerator(self._parse(digest, load_source), module_name).generate_tests()
+
+    def stats(self, request: Dict[str, Any]) -> Dict[str, int]:
+        return {
+            "trees": len(self._trees),
+            "results": len(self._results),
+            "hits": self._results.hits,
+            "misses": self._results.misses,
+            "segments": len(self._segments),
+            "segment_hits": self._segments.hits,
+            "segment_misses": self._segments.misses,
+        }
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                response = {"id": None, "ok": False, "error": f"Invalid JSON: {e}"}
+            else:
+                if request.get("op") == "shutdown":
+                    self._send({"id": request.get("id"), "ok": True, "result": None})
+                    threading.Thread(target=self.server.shutdown, daemon=True).start()
+                    return
+                response = self.server.service.handle(request)
+            self._send(response)
+
+    def _send(self, response: Dict[str, Any]):
+        self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+        self.wfile.flush()
+
+
+def _remove_stale_socket(socket_path: str):
+    """
+    Remove a socket left behind by a daemon that is no longer running.
+
+    Raises FileExistsError if ``socket_path`` is something other than a
+    socket, and OSError (EADDRINUSE) if a daemon is still listening on it.
+    """
+    try:
+        mode = os.lstat(socket_path).st_mode
+    except FileNotFoundError:
+        return
+    if not S_ISSOCK(mode):
+        raise FileExistsError(errno.EEXIST, "Refusing to replace a file that is not a socket", socket_path)
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+    except ConnectionRefusedError:
+        os.unlink(socket_path)
+        return
+    except FileNotFoundError:
+        return
+    finally:
+        probe.close()
+    raise OSError(errno.EADDRINUSE, "Another daemon is listening on this socket", socket_path)
+
+
+if hasattr(socketserver, "ThreadingUnixStreamServer"):
+    class AnalysisServer(socketserver.ThreadingUnixStreamServer):
+        """Serves an AnalysisService on a Unix domain socket."""
+
+        daemon_threads = True
+
+        def __init__(self, socket_path: str, service: Optional[AnalysisService] = None):
+            self.socket_path = socket_path
+            self.service = service or AnalysisService()
+            _remove_stale_socket(socket_path)
+            super().__init__(socket_path, _RequestHandler)
+
+        def server_bind(self):
+            # Only the daemon's own user may connect: analyze_path reads any
+            # file the daemon can read. Creating the socket under a restrictive
+            # umask leaves no window in which it is accessible to others.
+            umask = os.umask(0o177)
+            try:
+                super().server_bind()
+            finally:
+                os.umask(umask)
+
+        def server_close(self):
+            super().server_close()
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                pass
+else:  # pragma: no cover - Windows
+    class AnalysisServer:
+        def __init__(self, *args, **kwargs):
+            raise RuntimeError("The analysis daemon requires Unix domain socket support")
+
+
+class DaemonClient:
+    """Minimal synchronous client for the analysis daemon."""
+
+    def __init__(self, socket_path: str, timeout: Optional[float] = None):
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.settimeout(timeout)
+        self._socket.connect(socket_path)
+        self._file = self._socket.makefile("rwb")
+        self._next_id = 0
+
+    def request(self, op: str, **params) -> Any:
+        self._next_id += 1
+        self._file.write(json.dumps({"id": self._next_id, "op": op, **params}).encode("utf-8") + b"\n")
+        self._file.flush()
+        response = json.loads(self._file.readline())
+        if not response["ok"]:
+            raise RuntimeError(response["error"])
+        return response["result"]
+
+    def analyze_source(self, source: str) -> Dict[str, Any]:
+        return self.request("analyze_source", source=source)
+
+    def analyze_path(self, path: str) -> Dict[str, Any]:
+        return self.request("analyze_path", path=str(path))
+
+    def generate_tests(self, source: str, module_name: str) -> str:
+        return self.request("generate_tests", source=source, module_name=module_name)
+
+    def close(self):
+        self._file.close()
+        self._socket.close()
+
+    def __enter__(self) -> "DaemonClient":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def serve(socket_path: str, max_entries: int = 512, jobs: int = 1):
+    """Run the daemon in the foreground until a shutdown request arrives."""
+    with AnalysisServer(socket_path, AnalysisService(max_entries=max_entries, jobs=jobs)) as server:
+        server.serve_forever()
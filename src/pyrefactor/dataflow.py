@@ -0,0 +1,218 @@
+"""
+Lightweight local data flow for rules.
+
+Rules run in a single forward pass, so this is deliberately simple: it
+remembers what kind of value each local name of the current function was
+last bound to (a list, a str, a parameter, ...) and which names a loop
+rebinds or mutates. It does not follow branches or aliases; rules built on
+it should only report patterns that are safe under those limits.
+"""
+import ast
+from typing import Dict, List, Optional, Set, Union
+
+# Kind of a function parameter whose type is not known
+PARAMETER = "parameter"
+
+_CALL_KINDS = {
+    "list": "list",
+    "sorted": "list",
+    "tuple": "tuple",
+    "set": "set",
+    "frozenset": "set",
+    "dict": "dict",
+    "str": "str",
+}
+
+_ANNOTATION_KINDS = {
+    "list": "list", "List": "list", "Sequence": "list", "MutableSequence": "list",
+    "tuple": "tuple", "Tuple": "tuple",
+    "set": "set", "Set": "set", "frozenset": "set", "FrozenSet": "set",
+    "AbstractSet": "set", "MutableSet": "set",
+    "dict": "dict", "Dict": "dict", "Mapping": "dict", "MutableMapping": "dict",
+    "str": "str",
+}
+
+# Methods that change a list, set, dict or bytearray in place
+MUTATING_METHODS = frozenset({
+    "append", "extend", "insert", "remove", "pop", "clear", "sort", "reverse",
+    "add", "discard", "update", "difference_update", "intersection_update",
+    "symmetric_difference_update", "setdefault", "popitem",
+})
+
+Function = Union[ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda]
+
+
+def value_kind(node: ast.AST) -> Optional[str]:
+    """Kind of value an expression evaluates to, when it is obvious."""
+    if isinstance(node, (ast.List, ast.ListComp)):
+        return "list"
+    if isinstance(node, ast.Tuple):
+        return "tuple"
+    if isinstance(node, (ast.Set, ast.SetComp)):
+        return "set"
+    if isinstance(node, (ast.Dict, ast.DictComp)):
+        return "dict"
+    if isinstance(node, ast.JoinedStr) or (isinstance(node, ast.Constant) and isinstance(node.value, str)):
+        return "str"
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+        # Iterative, since long "a" + "b" + ... chains nest deeper than the recursion limit
+        kinds, operands = set(), [node]
+        while operands:
+            operand = operands.pop()
+            if isinstance(operand, ast.BinOp) and isinstance(operand.op, ast.Add):
+                operands += [operand.left, operand.right]
+            else:
+                kinds.add(value_kind(operand))
+        return kinds.pop() if len(kinds) == 1 else None
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+        return _CALL_KINDS.get(node.func.id)
+    return None
+
+
+def annotation_kind(annotation: Optional[ast.AST]) -> Optional[str]:
+    """Kind named by a type annotation such as ``List[int]`` or ``typing.Set``."""
+    if isinstance(annotation, ast.Subscript):
+        annotation = annotation.value
+    if isinstance(annotation, ast.Attribute):
+        return _ANNOTATION_KINDS.get(annotation.attr)
+    if isinstance(annotation, ast.Name):
+        return _ANNOTATION_KINDS.get(annotation.id)
+    return None
+
+
+def mutated_names(node: ast.AST) -> Set[str]:
+    """Names that are rebound, deleted or mutated in place anywhere below ``node``."""
+    names = set()
+    for child in ast.walk(node):
+        if isinstance(child, ast.Name) and not isinstance(child.ctx, ast.Load):
+            names.add(child.id)
+        elif isinstance(child, (ast.Subscript, ast.Attribute)) and not isinstance(child.ctx, ast.Load):
+            if isinstance(child.value, ast.Name):
+                names.add(child.value.id)
+        elif (isinstance(child, ast.Call) and isinstance(child.func, ast.Attribute)
+                and child.func.attr in MUTATING_METHODS and isinstance(child.func.value, ast.Name)):
+            names.add(child.func.value.id)
+    return names
+
+
+def dotted_name(node: ast.AST) -> Optional[str]:
+    """``"a.b.c"`` for a chain of attribute lookups on a name, else None."""
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return None
+    parts.append(node.id)
+    return ".".join(reversed(parts))
+
+
+def rebound_paths(node: ast.AST) -> Set[str]:
+    """Names and attribute chains (``"self.items"``) assigned or deleted below ``node``."""
+    paths = set()
+    for child in ast.walk(node):
+        if isinstance(child, (ast.Name, ast.Attribute)) and not isinstance(child.ctx, ast.Load):
+            path = dotted_name(child)
+            if path is not None:
+                paths.add(path)
+    return paths
+
+
+def mutated_paths(node: ast.AST) -> Set[str]:
+    """Like rebound_paths(), plus the objects changed in place by item stores or mutating methods."""
+    paths = rebound_paths(node)
+    for child in ast.walk(node):
+        value = None
+        if isinstance(child, ast.Subscript) and not isinstance(child.ctx, ast.Load):
+            value = child.value
+        elif (isinstance(child, ast.Call) and isinstance(child.func, ast.Attribute)
+                and child.func.attr in MUTATING_METHODS):
+            value = child.func.value
+        path = dotted_name(value) if value is not None else None
+        if path is not None:
+            paths.add(path)
+    return paths
+
+
+def depends_on(path: str, changed: Set[str]) -> bool:
+    """Whether ``path`` (e.g. ``"a.b.c"``) is, or is reached through, one of ``changed``."""
+    return any(path == other or path.startswith(other + ".") for other in changed)
+
+
+def module_imports(tree: ast.AST) -> Dict[str, str]:
+    """
+    Names bound by the top-level imports of a module, mapped to what they import.
+
+    ``import numpy as np`` gives ``{"np": "numpy"}`` and ``from datetime
+    import datetime`` gives ``{"datetime": "datetime.datetime"}``.
+    """
+    names = {}
+    for node in getattr(tree, "body", ()):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.asname is not None:
+                    names[alias.asname] = alias.name
+                else:
+                    root = alias.name.split(".")[0]
+                    names[root] = root
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            for alias in node.names:
+                if alias.name != "*":
+                    names[alias.asname or alias.name] = f"{node.module}.{alias.name}"
+    return names
+
+
+class LocalKinds:
+    """
+    Flow-insensitive record of what the locals of the current function hold.
+
+    Only names bound inside functions are tracked; module and class level
+    bindings are ignored, so a rule using this stays local to one top-level
+    definition (as "definition"-scoped rules must).
+    """
+
+    def __init__(self):
+        self._scopes: List[Optional[Dict[str, Optional[str]]]] = [None]
+
+    @property
+    def in_function(self) -> bool:
+        return self._scopes[-1] is not None
+
+    def enter_function(self, node: Function):
+        scope: Dict[str, Optional[str]] = {}
+        args = node.args
+        for arg in args.posonlyargs + args.args + args.kwonlyargs:
+            scope[arg.arg] = annotation_kind(arg.annotation) or PARAMETER
+        if args.vararg is not None:
+            scope[args.vararg.arg] = "tuple"
+        if args.kwarg is not None:
+            scope[args.kwarg.arg] = "dict"
+        self._scopes.append(scope)
+
+    def enter_class(self):
+        self._scopes.append(None)
+
+    def leave(self):
+        self._scopes.pop()
+
+    def bind(self, target: ast.AST, value: Optional[ast.AST]):
+        """Record an assignment of ``value`` (None if unknown) to ``target``."""
+        scope = self._scopes[-1]
+        if scope is None:
+            return
+        if isinstance(target, ast.Name):
+            scope[target.id] = value_kind(value) if value is not None else None
+        elif isinstance(target, (ast.Tuple, ast.List)):
+            for element in target.elts:
+                self.bind(element, None)
+        elif isinstance(target, ast.Starred):
+            self.bind(target.value, None)
+
+    def is_local(self, name: str) -> bool:
+        """Whether ``name`` has been bound in the current function so far."""
+        scope = self._scopes[-1]
+        return scope is not None and name in scope
+
+    def kind(self, name: str) -> Optional[str]:
+        scope = self._scopes[-1]
+        return scope.get(name) if scope is not None else None
@@ -0,0 +1,227 @@
+import os
+import re
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+
+def _translate(pattern: str) -> str:
+    """Translate a gitignore-style glob into a regular expression body."""
+    result = []
+    i, n = 0, len(pattern)
+    while i < n:
+        if pattern.startswith("**/", i):
+            result.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("/**", i) and i + 3 == n:
+            result.append("/.*")
+            i += 3
+        elif pattern.startswith("**", i):
+            result.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            result.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            result.append("[^/]")
+            i += 1
+        elif pattern[i] == "[":
+            end = pattern.find("]", i + 2)
+            if end == -1:
+                result.append(re.escape("["))
+                i += 1
+                continue
+            body = pattern[i + 1:end]
+            if body.startswith("!"):
+                body = "^" + body[1:]
+            result.append(f"[{body.replace(chr(92), chr(92) * 2)}]")
+            i = end + 1
+        elif pattern[i] == "\\" and i + 1 < n:
+            result.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            result.append(re.escape(pattern[i]))
+            i += 1
+    return "".join(result)
+
+
+class IgnoreRules:
+    """
+    A compiled list of gitignore-style patterns, relative to one directory.
+
+    Supports ``#`` comments, ``!`` negation, trailing ``/`` for directories,
+    anchoring with a leading or inner ``/``, and ``*``, ``?``, ``[...]`` and
+    ``**`` wildcards. As in git, the last matching pattern wins. Consecutive
+    patterns with the same polarity are merged into one regular expression,
+    so matching costs one regex call per group rather than per pattern.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        groups: List[Tuple[bool, List[str], List[str]]] = []
+        for raw in patterns:
+            parsed = self._parse(raw)
+            if parsed is None:
+                continue
+            negated, dir_only, regex = parsed
+            if not groups or groups[-1][0] != negated:
+                groups.append((negated, [], []))
+            groups[-1][1 if dir_only else 2].append(regex)
+
+        # Evaluated last to first: the first group that matches decides.
+        self._groups = [
+            (negated, self._compile(dir_patterns + any_patterns), self._compile(any_patterns))
+            for negated, dir_patterns, any_patterns in reversed(groups)
+        ]
+
+    @staticmethod
+    def _compile(regexes: List[str]) -> Optional["re.Pattern"]:
+        return re.compile("|".join(f"(?:{regex})" for regex in regexes)) if regexes else None
+
+    @staticmethod
+    def _parse(raw: str) -> Optional[Tuple[bool, bool, str]]:
+        line = raw.rstrip("\n")
+        if not line.endswith("\\ "):
+            line = line.rstrip()
+        if not line or line.startswith("#"):
+            return None
+
+        negated = line.startswith("!")
+        if negated:
+            line = line[1:]
+        elif line.startswith("\\!") or line.startswith("\\#"):
+            line = line[1:]
+
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            return None
+
+        anchored = "/" in line
+        line = line.lstrip("/")
+        regex = _translate(line)
+        if not anchored:
+            regex = f"(?:.*/)?{regex}"
+        return negated, dir_only, f"{regex}$"
+
+    @classmethod
+    def from_file(cls, path: Path) -> Optional["IgnoreRules"]:
+        try:
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                rules = cls(f)
+        except OSError:
+            return None
+        return rules if rules._groups else None
+
+    def match(self, relpath: str, is_dir: bool) -> Optional[bool]:
+        """True if ignored, False if explicitly re-included, None if no pattern matches."""
+        for negated, dir_regex, any_regex in self._groups:
+            regex = dir_regex if is_dir else any_regex
+            if regex is not None and regex.match(relpath):
+                return not negated
+        return None
+
+
+class FileDiscovery:
+    """
+    Lazily discovers Python files below a root directory with ``os.scandir``.
+
+    Excluded directories and files may be exact names or glob patterns, and
+    ``.gitignore`` files found along the way are honoured. Ignored
+    directories are pruned without being entered, and paths are yielded as
+    soon as they are found so analysis can start while the walk continues.
+    """
+
+    def __init__(self, root_path: Path, exclude_dirs: Iterable[str] = (), exclude_files: Iterable[str] = (),
+                 respect_gitignore: bool = True, suffix: str = ".py"):
+        self.root_path = Path(root_path)
+        self.suffix = suffix
+        self.respect_gitignore = respect_gitignore
+        self._excluded_dirs = IgnoreRules(f"{pattern}/" for pattern in exclude_dirs)
+        self._excluded_files = IgnoreRules(exclude_files)
+
+    def __iter__(self) -> Iterator[Path]:
+        return self._walk(files=True, dirs=False)
+
+    def directories(self) -> Iterator[Path]:
+        """Lazily yield the root and every directory that is not pruned."""
+        return self._walk(files=False, dirs=True)
+
+    def includes(self, path: Path) -> bool:
+        """
+        Whether ``path`` would be yielded by a walk, without walking the tree.
+
+        Only the ``.gitignore`` files of the path's ancestors are read, so
+        this is cheap enough to call for every file reported as changed.
+        """
+        path = Path(path)
+        try:
+            parts = path.relative_to(self.root_path).parts
+        except ValueError:
+            return False
+        if not parts or not path.name.endswith(self.suffix):
+            return False
+
+        directory, reldir, ignores = self.root_path, "", ()
+        for part in parts[:-1]:
+            ignores = self._with_gitignore(directory, reldir, ignores)
+            relpath = f"{reldir}{part}"
+            if self._excluded_dirs.match(relpath, True) or self._ignored(relpath, True, ignores):
+                return False
+            directory, reldir = directory / part, f"{relpath}/"
+
+        ignores = self._with_gitignore(directory, reldir, ignores)
+        relpath = f"{reldir}{parts[-1]}"
+        return not self._excluded_files.match(relpath, False) and not self._ignored(relpath, False, ignores)
+
+    def _with_gitignore(self, directory, reldir: str, ignores: Tuple) -> Tuple:
+        if self.respect_gitignore:
+            rules = IgnoreRules.from_file(Path(directory) / ".gitignore")
+            if rules is not None:
+                return ignores + ((reldir, rules),)
+        return ignores
+
+    def _walk(self, files: bool, dirs: bool) -> Iterator[Path]:
+        # Each stack entry: directory path, its path relative to the root, and
+        # the gitignore rules in effect as (base relative path, rules) pairs.
+        stack = [(str(self.root_path), "", ())]
+
+        while stack:
+            directory, reldir, ignores = stack.pop()
+            ignores = self._with_gitignore(directory, reldir, ignores)
+            if dirs:
+                yield Path(directory)
+
+            try:
+                with os.scandir(directory) as it:
+                    entries = sorted(it, key=lambda entry: entry.name)
+            except OSError:
+                continue
+
+            subdirs = []
+            for entry in entries:
+                relpath = f"{reldir}{entry.name}"
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    continue
+
+                if is_dir:
+                    if not self._excluded_dirs.match(relpath, True) and not self._ignored(relpath, True, ignores):
+                        subdirs.append((entry.path, f"{relpath}/", ignores))
+                elif (files
+                        and entry.name.endswith(self.suffix)
+                        and entry.is_file()
+                        and not self._excluded_files.match(relpath, False)
+                        and not self._ignored(relpath, False, ignores)):
+                    yield Path(entry.path)
+
+            stack.extend(reversed(subdirs))
+
+    @staticmethod
+    def _ignored(relpath: str, is_dir: bool, ignores: Tuple[Tuple[str, IgnoreRules], ...]) -> bool:
+        """Apply gitignore rules from the outermost to the innermost directory."""
+        ignored = False
+        for base, rules in ignores:
+            decision = rules.match(relpath[len(base):], is_dir)
+            if decision is not None:
+                ignored = decision
+        return ignored
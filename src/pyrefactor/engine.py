@@ -0,0 +1,205 @@
+import ast
+import json
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Type, Union
+
+from .models import CodeIssue, SourceSpan, SourceText
+from .profiling import AnalysisStats, optional_phase
+
+Handler = Callable[[ast.AST], None]
+
+_HANDLER_CACHE: Dict[tuple, Dict[Type[ast.AST], str]] = {}
+# Node type -> its _fields in reverse, so children can be pushed onto a stack
+_REVERSED_FIELDS: Dict[type, tuple] = {}
+
+
+class Rule:
+    """
+    Base class for analysis rules.
+
+    A rule declares the node types it cares about by defining
+    ``enter_<NodeType>`` and/or ``leave_<NodeType>`` methods, e.g.
+    ``enter_For`` is called before the children of every ``ast.For`` node
+    are traversed and ``leave_For`` after them.
+
+    ``scope`` tells incremental analysis what a rule's findings depend on.
+    A "module" rule is always run over the whole tree. A "definition" rule
+    promises that everything it reports while walking a top-level statement
+    depends only on that statement and the module's imports, and that it
+    reports nothing from finish(); its findings for unchanged definitions
+    can then be reused (see pyrefactor.incremental).
+    """
+
+    scope = "module"
+
+    def __init__(self):
+        self.issues: List[CodeIssue] = []
+        self.source: Optional[SourceText] = None
+
+    @classmethod
+    def handlers(cls, prefix: str) -> Dict[Type[ast.AST], str]:
+        """Map AST node types to the names of this rule's ``prefix`` handlers."""
+        cached = _HANDLER_CACHE.get((cls, prefix))
+        if cached is not None:
+            return cached
+        handlers = {}
+        for attr in dir(cls):
+            if attr.startswith(prefix):
+                node_type = getattr(ast, attr[len(prefix):], None)
+                if not (isinstance(node_type, type) and issubclass(node_type, ast.AST)):
+                    raise TypeError(f"{cls.__name__}.{attr} does not name an AST node type")
+                handlers[node_type] = attr
+        _HANDLER_CACHE[(cls, prefix)] = handlers
+        return handlers
+
+    def config(self) -> Dict[str, object]:
+        """Settings that change what this rule reports (used in cache keys)."""
+        return {}
+
+    def begin(self, tree: ast.AST, source: Optional[SourceText] = None):
+        """Called once before the traversal starts."""
+        self.source = source
+
+    def finish(self, tree: ast.AST):
+        """Called once after the traversal has finished."""
+
+    def visit(self, tree: ast.AST, source: Union[str, SourceText, None] = None) -> "Rule":
+        """Run this rule on its own over ``tree``."""
+        RuleEngine([self]).run(tree, source)
+        return self
+
+    def node_source(self, node: ast.AST) -> Union[SourceSpan, str]:
+        """
+        Source code for a given AST node.
+
+        Returns a lazy SourceSpan when the source is known, so the text is
+        only extracted if a report asks for it; otherwise unparses the node.
+        """
+        if self.source is not None and getattr(node, 'end_lineno', None) is not None:
+            return SourceSpan(self.source, node.lineno, node.col_offset, node.end_lineno, node.end_col_offset)
+        return ast.unparse(node)
+
+
+class RuleEngine:
+    """
+    Runs any number of rules over an AST in a single traversal.
+
+    When ``stats`` is given, every rule handler is wrapped so its time, call
+    count and allocations are charged to the rule in the stats object.
+    """
+
+    def __init__(self, rules: Iterable[Rule], stats: Optional[AnalysisStats] = None):
+        self.rules = list(rules)
+        self.stats = stats
+        self._enter = self._build_dispatch('enter_')
+        self._leave = self._build_dispatch('leave_')
+
+    def _build_dispatch(self, prefix: str) -> Dict[Type[ast.AST], List[Handler]]:
+        """Build the node type -> bound handlers table for all rules."""
+        dispatch = defaultdict(list)
+        for rule in self.rules:
+            for node_type, name in type(rule).handlers(prefix).items():
+                handler = getattr(rule, name)
+                if self.stats is not None:
+                    handler = self.stats.timed(type(rule).__name__, handler)
+                dispatch[node_type].append(handler)
+        return dict(dispatch)
+
+    def run(self, tree: ast.AST, source: Union[str, SourceText, None] = None) -> List[Rule]:
+        """Traverse ``tree`` once, feeding every node to the interested rules."""
+        if isinstance(source, str):
+            source = SourceText(source)
+        with optional_phase(self.stats, "traverse"):
+            for rule in self.rules:
+                self._hook(rule, rule.begin)(tree, source)
+            self._walk(tree)
+            for rule in self.rules:
+                self._hook(rule, rule.finish)(tree)
+        return self.rules
+
+    def run_segments(self, tree: ast.AST, segments: Iterable[Sequence[ast.AST]],
+                     source: Union[str, SourceText, None] = None) -> List[List[List[CodeIssue]]]:
+        """
+        Traverse only the given groups of nodes of ``tree``.
+
+        Hooks still receive the whole tree. Returns, for each segment, the
+        issues each rule reported while that segment was walked.
+        """
+        if isinstance(source, str):
+            source = SourceText(source)
+        results = []
+        with optional_phase(self.stats, "traverse"):
+            for rule in self.rules:
+                self._hook(rule, rule.begin)(tree, source)
+            for nodes in segments:
+                counts = [len(rule.issues) for rule in self.rules]
+                for node in nodes:
+                    self._walk(node)
+                results.append([rule.issues[count:] for rule, count in zip(self.rules, counts)])
+            for rule in self.rules:
+                self._hook(rule, rule.finish)(tree)
+        return results
+
+    def _hook(self, rule: Rule, method: Callable) -> Callable:
+        return method if self.stats is None else self.stats.timed(type(rule).__name__, method)
+
+    def _walk(self, root: ast.AST):
+        """
+        Depth-first traversal with an explicit stack.
+
+        Visits nodes in the same order as recursing over ast.iter_child_nodes,
+        but without a Python call per node and without a recursion limit.
+        A pending leave is pushed as a ``(handlers, node)`` tuple below the
+        node's children, so it fires once all of them have been visited.
+        """
+        enter = self._enter.get
+        leave = self._leave.get
+        fields_of = _REVERSED_FIELDS
+        AST = ast.AST
+        stack = [root]
+        pop = stack.pop
+        push = stack.append
+        extend = stack.extend
+
+        while stack:
+            node = pop()
+            node_type = type(node)
+            if node_type is tuple:
+                handlers, node = node
+                for handler in handlers:
+                    handler(node)
+                continue
+
+            fields = fields_of.get(node_type)
+            if fields is None:
+                if not isinstance(node, AST):
+                    continue  # e.g. the names of ast.Global
+                fields = fields_of[node_type] = tuple(reversed(node_type._fields))
+
+            handlers = enter(node_type)
+            if handlers is not None:
+                for handler in handlers:
+                    handler(node)
+            handlers = leave(node_type)
+            if handlers is not None:
+                push((handlers, node))
+
+            for name in fields:
+                value = getattr(node, name, None)
+                if type(value) is list:
+                    extend(reversed(value))
+                elif isinstance(value, AST):
+                    push(value)
+
+    @property
+    def issues(self) -> List[CodeIssue]:
+        """All issues reported by the rules, in rule order."""
+        return [issue for rule in self.rules for issue in rule.issues]
+
+
+def rules_signature(rules: Iterable[Rule]) -> str:
+    """Stable description of a rule set and its configuration."""
+    return json.dumps(
+        [[f"{type(rule).__module__}.{type(rule).__qualname__}", rule.config()] for rule in rules],
+        sort_keys=True,
+    )
@@ -1,93 +1,468 @@
+import asyncio
+import heapq
 import os
-from dataclasses import dataclass
+import time
+import tracemalloc
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from functools import partial
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import AsyncIterator, Dict, Generator, Iterable, Iterator, List, Optional, Set, Tuple, Union
 
-from .analyzer import analyze_code
-from .models import CodeIssue
+from .analyzer import CodeAnalyzer, default_rules
+from .cache import ResultCache
+from .changes import MtimeIndex, git_changed_files
+from .discovery import FileDiscovery
+from .engine import rules_signature
+from .models import CodeIssue, FileAnalysis
+from .profiling import AnalysisStats, optional_phase
+from .reader import prefetch, read_source
+from .sharding import partition, write_shard
+from .table import IssueTable
 
+# Generator of ProjectAnalyzer._schedule(): yields results or the futures to
+# wait for, and is sent the futures that finished
+_Schedule = Generator[Union[FileAnalysis, Set[Future]], Optional[Set[Future]], None]
 
-@dataclass
-class FileAnalysis:
-    """Results of analyzing a single Python file."""
-    filepath: Path
-    issues: List[CodeIssue]
-    error: Optional[str] = None
+
+def _analyze_file(filepath: Path, stats: Optional[AnalysisStats] = None,
+                  pending_read: Optional["Future[bytes]"] = None) -> FileAnalysis:
+    """
+    Read and analyze a single file, capturing any error in the result.
+
+    The source is parsed from bytes so PEP 263 encoding declarations are
+    honoured. If the file is already being read by prefetch(), the "read"
+    phase only measures the time spent waiting for it.
+    """
+    start = time.perf_counter()
+    try:
+        with optional_phase(stats, "read"):
+            source_code = pending_read.result() if pending_read is not None else read_source(filepath)
+
+        analyzer = CodeAnalyzer(source_code, filepath=filepath, stats=stats)
+        issues = analyzer.analyze()
+        # Issues reference the source lazily; let reports re-read the file
+        # instead of keeping every analyzed module in memory.
+        analyzer.source.release()
+        analysis = FileAnalysis(filepath=filepath, issues=issues)
+
+    except Exception as e:
+        analysis = FileAnalysis(filepath=filepath, issues=[], error=f"{type(e).__name__}: {str(e)}")
+
+    if stats is not None:
+        stats.files[str(filepath)] = time.perf_counter() - start
+        analysis.stats = stats
+    return analysis
+
+
+def _analyze_chunk(filepaths: List[Path], profile: bool = False, trace_memory: bool = False) -> List[FileAnalysis]:
+    """
+    Analyze a batch of files inside a worker process.
+
+    The next files of the batch are read on background threads while the
+    current one is parsed and analyzed.
+    """
+    started_tracing = profile and trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    try:
+        if len(filepaths) == 1:
+            return [_analyze_file(filepaths[0], AnalysisStats(trace_memory) if profile else None)]
+        return [
+            _analyze_file(filepath, AnalysisStats(trace_memory) if profile else None, pending_read)
+            for filepath, pending_read in prefetch(filepaths)
+        ]
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+
+
+def _file_size(filepath: Path) -> int:
+    try:
+        return filepath.stat().st_size
+    except OSError:
+        return 0
+
+
+def _balanced_chunks(filepaths: List[Path], n_chunks: int) -> List[List[Path]]:
+    """
+    Split files into at most ``n_chunks`` chunks of roughly equal total size.
+
+    Files are assigned largest-first to the currently lightest chunk, so a
+    few huge modules do not end up serialized behind each other.
+    """
+    n_chunks = max(1, min(n_chunks, len(filepaths)))
+    heap = [(0, index) for index in range(n_chunks)]
+    chunks: List[List[Path]] = [[] for _ in range(n_chunks)]
+
+    for size, filepath in sorted(((_file_size(p), p) for p in filepaths), key=lambda item: -item[0]):
+        total, index = heapq.heappop(heap)
+        chunks[index].append(filepath)
+        heapq.heappush(heap, (total + size, index))
+
+    return [chunk for chunk in chunks if chunk]
 
 
 class ProjectAnalyzer:
     """Analyzes Python files in a directory structure."""
 
-    def __init__(self, root_path: str, exclude_dirs: List[str] = None, exclude_files: List[str] = None):
+    # Chunks handed out per worker; more than one keeps workers busy when
+    # file sizes are a poor predictor of analysis time.
+    CHUNKS_PER_JOB = 4
+    # Files per work item when streaming results with iter_project().
+    STREAM_BATCH_SIZE = 8
+    # Rough peak memory of parsing and analyzing one byte of source; used to
+    # estimate the cost of in-flight work against ``memory_budget``.
+    MEMORY_PER_SOURCE_BYTE = 100
+
+    def __init__(self, root_path: str, exclude_dirs: List[str] = None, exclude_files: List[str] = None,
+                 jobs: Optional[int] = None, cache: Optional[ResultCache] = None,
+                 profile: bool = False, trace_memory: bool = False, respect_gitignore: bool = True,
+                 memory_budget: Optional[int] = None, shard: Optional[Tuple[int, int]] = None):
         self.root_path = Path(root_path)
         self.exclude_dirs = set(exclude_dirs or ['venv', '.git', '__pycache__', 'build', 'dist'])
         self.exclude_files = set(exclude_files or [])
+        self.respect_gitignore = respect_gitignore
+        self.jobs = jobs or os.cpu_count() or 1
+        self.cache = cache
+        # Estimated bytes that in-flight work may use before no more is submitted
+        self.memory_budget = memory_budget
+        # (index, count), 1-based: only analyze this part of the discovered files
+        self.shard = shard
+        self._shard_positions: Dict[str, int] = {}
+        # Aggregated AnalysisStats of every file analyzed so far, if profiling
+        self.stats = AnalysisStats(trace_memory) if profile else None
+        self._analyze_chunk = (
+            partial(_analyze_chunk, profile=True, trace_memory=trace_memory) if profile else _analyze_chunk
+        )
 
-    def analyze_project(self) -> Dict[str, FileAnalysis]:
+    def analyze_project(self, changed_since: Optional[str] = None, index_file: Optional[str] = None,
+                        previous: Optional[Dict[str, FileAnalysis]] = None) -> Dict[str, FileAnalysis]:
         """
         Analyze all Python files in the project directory.
-        
+
+        Files are analyzed in a pool of ``self.jobs`` worker processes; the
+        result order matches the order in which the files were discovered.
+        When a cache is configured, files whose contents were analyzed
+        before are served from it and only the misses are analyzed.
+
+        Args:
+            changed_since: Only analyze files that differ from this git ref
+                (plus untracked files).
+            index_file: Only analyze files whose size or mtime differ from
+                the index stored in this file; the index is updated afterwards.
+            previous: Results of an earlier run. Unchanged files keep their
+                previous analysis, files that no longer exist are dropped.
+                Without it, only the changed files are returned.
+
         Returns:
             Dict mapping file paths to their analysis results
         """
-        results = {}
+        python_files = self._find_python_files()
 
-        for filepath in self._find_python_files():
-            try:
-                with open(filepath, 'r', encoding='utf-8') as file:
-                    source_code = file.read()
+        if changed_since is None and index_file is None:
+            return self.analyze_files(python_files)
+
+        if changed_since is not None:
+            changed = git_changed_files(self.root_path, changed_since)
+            to_analyze = [filepath for filepath in python_files if filepath.resolve() in changed]
+        else:
+            index = MtimeIndex(index_file)
+            to_analyze = index.changed(python_files)
 
-                issues = analyze_code(source_code)
-                results[str(filepath)] = FileAnalysis(filepath=filepath, issues=issues)
+        if previous is not None:
+            selected = set(to_analyze)
+            to_analyze = [
+                filepath for filepath in python_files
+                if filepath in selected or str(filepath) not in previous
+            ]
 
-            except Exception as e:
-                results[str(filepath)] = FileAnalysis(filepath=filepath, issues=[], error=f"{type(e).__name__}: {str(e)}")
+        analyzed = self.analyze_files(to_analyze)
 
+        if index_file is not None:
+            index.update(python_files)
+            index.save()
+
+        if previous is None:
+            return analyzed
+
+        return {
+            str(filepath): analyzed.get(str(filepath)) or previous[str(filepath)]
+            for filepath in python_files
+        }
+
+    def cached_results(self) -> Dict[str, FileAnalysis]:
+        """
+        Cached analyses of the project's files, e.g. as ``previous`` for analyze_project().
+
+        Only files whose current contents are in the cache are included;
+        without a cache the result is empty.
+        """
+        if not self.cache:
+            return {}
+        results = {}
+        for filepath in self._find_python_files():
+            cached = self._lookup(filepath)
+            if cached is not None:
+                results[str(filepath)] = cached
         return results
 
-    def _find_python_files(self) -> List[Path]:
-        """Recursively find all Python files in the project."""
-        python_files = []
+    def analyze_project_table(self, max_in_flight: Optional[int] = None) -> IssueTable:
+        """
+        Analyze the project into a compact column-oriented IssueTable.
 
-        for root, dirs, files in os.walk(self.root_path):
-            # Remove excluded directories
-            dirs[:] = [d for d in dirs if d not in self.exclude_dirs]
+        Results are streamed from iter_project() straight into the table, so
+        no per-issue CodeIssue objects are kept alive for the whole project.
+        """
+        return IssueTable.from_results(self.iter_project(max_in_flight))
 
-            for file in files:
-                if file.endswith('.py') and file not in self.exclude_files:
-                    python_files.append(Path(root) / file)
+    def iter_project(self, max_in_flight: Optional[int] = None) -> Iterator[FileAnalysis]:
+        """
+        Analyze the project, yielding each FileAnalysis as soon as it is done.
 
-        return python_files
+        Results arrive in completion order. At most ``max_in_flight`` batches
+        of files (default: twice the number of jobs) are being analyzed at
+        any time, so memory use does not grow with the size of the project.
+        """
+        try:
+            yield from self._run_work(self._stream_work(self._iter_python_files()), max_in_flight)
+        finally:
+            if self.cache:
+                self.cache.save()
 
-    def generate_report(self, results: Dict[str, FileAnalysis], output_file: str = None):
-        """Generate a markdown report from analysis results."""
-        report = ["# Code Analysis Report\n"]
+    async def aiter_project(self, max_in_flight: Optional[int] = None) -> AsyncIterator[FileAnalysis]:
+        """
+        Asynchronous variant of iter_project().
 
-        total_issues = sum(len(analysis.issues) for analysis in results.values())
-        report.append(f"Total files analyzed: {len(results)}")
-        report.append(f"Total issues found: {total_issues}\n")
+        Batches are scheduled exactly as by iter_project(), but waiting for
+        them is awaited, so the event loop keeps running meanwhile.
+        """
+        try:
+            with self._executor() as executor:
+                scheduler = self._schedule(executor, self._stream_work(self._iter_python_files()), max_in_flight)
+                done = None
+                while True:
+                    try:
+                        item = scheduler.send(done)
+                    except StopIteration:
+                        break
+                    if isinstance(item, FileAnalysis):
+                        done = None
+                        yield item
+                    else:
+                        waiting = {asyncio.wrap_future(future): future for future in item}
+                        finished, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+                        done = {waiting[future] for future in finished}
+        finally:
+            if self.cache:
+                self.cache.save()
+
+    def analyze_files(self, python_files: List[Path]) -> Dict[str, FileAnalysis]:
+        """
+        Analyze the given files, using the cache and the worker pool.
+
+        Unlike analyze_project(), no discovery is done: the files are taken
+        as given, which is what incremental callers such as the watcher need.
+        """
+        work: List[Union[FileAnalysis, List[Path]]] = []
+        misses = []
+
+        for filepath in python_files:
+            cached = self._lookup(filepath)
+            if cached is not None:
+                work.append(cached)
+            else:
+                misses.append(filepath)
+
+        work.extend(_balanced_chunks(misses, self.jobs * self.CHUNKS_PER_JOB) if misses else [])
 
-        for filepath, analysis in sorted(results.items()):
-            report.append(f"## {filepath}")
+        try:
+            analyses = self._run_work(work, serial=len(misses) <= 1)
+            by_path = {str(analysis.filepath): analysis for analysis in analyses}
+        finally:
+            if self.cache:
+                self.cache.save()
 
-            if analysis.error:
-                report.append(f"\n⚠️ Error: {analysis.error}\n")
+        return {str(filepath): by_path[str(filepath)] for filepath in python_files}
+
+    def _stream_work(self, python_files: Iterable[Path]) -> Iterator[Union[FileAnalysis, List[Path]]]:
+        """Turn files into cached results and fixed-size batches of files to analyze."""
+        batch = []
+        for filepath in python_files:
+            cached = self._lookup(filepath)
+            if cached is not None:
+                yield cached
                 continue
+            batch.append(filepath)
+            if len(batch) >= self.STREAM_BATCH_SIZE:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _executor(self) -> Executor:
+        if self.jobs <= 1:
+            return ThreadPoolExecutor(max_workers=1)
+        return ProcessPoolExecutor(max_workers=self.jobs)
+
+    def _run_work(self, work: Iterable[Union[FileAnalysis, List[Path]]],
+                  max_in_flight: Optional[int] = None, serial: bool = False) -> Iterator[FileAnalysis]:
+        """
+        Execute a stream of work items, yielding results as they complete.
+
+        Items are either ready results (passed through unchanged) or batches
+        of files. Batches are analyzed in-process when ``serial`` is set or
+        ``self.jobs`` is 1, and in the worker pool otherwise with at most
+        ``max_in_flight`` batches submitted at once. With a ``memory_budget``,
+        a batch is also held back until the estimated memory of the batches
+        in flight leaves room for it; a batch larger than the whole budget
+        runs on its own.
+        """
+        if serial or self.jobs <= 1:
+            for item in work:
+                if isinstance(item, FileAnalysis):
+                    yield item
+                    continue
+                for analysis in self._analyze_chunk(item):
+                    self._collect(analysis)
+                    yield analysis
+            return
+
+        with self._executor() as executor:
+            scheduler = self._schedule(executor, work, max_in_flight)
+            done = None
+            while True:
+                try:
+                    item = scheduler.send(done)
+                except StopIteration:
+                    return
+                if isinstance(item, FileAnalysis):
+                    done = None
+                    yield item
+                else:
+                    done, _ = wait(item, return_when=FIRST_COMPLETED)
+
+    def _schedule(self, executor: Executor, work: Iterable[Union[FileAnalysis, List[Path]]],
+                  max_in_flight: Optional[int] = None) -> _Schedule:
+        """
+        Submit the batches of ``work`` to ``executor``, yielding results as they complete.
+
+        This is the scheduling shared by _run_work() and aiter_project(), and
+        it never blocks: when it has to wait, it yields the set of futures in
+        flight instead of a result, and the caller sends back those that
+        finished after waiting for at least one (blocking or in an event loop).
+        """
+        max_in_flight = max_in_flight or self.jobs * 2
+        budget = self.memory_budget
+        pending = set()
+        costs: Dict[Future, int] = {}
+        in_flight = 0
 
-            if not analysis.issues:
-                report.append("\n✅ No issues found\n")
+        def drain() -> _Schedule:
+            nonlocal in_flight
+            done = yield set(pending)
+            for future in done:
+                pending.discard(future)
+                in_flight -= costs.pop(future, 0)
+                for analysis in future.result():
+                    self._collect(analysis)
+                    yield analysis
+
+        for item in work:
+            if isinstance(item, FileAnalysis):
+                yield item
                 continue
+            cost = self._estimate_memory(item) if budget is not None else 0
+            while len(pending) >= max_in_flight or (pending and budget is not None and in_flight + cost > budget):
+                yield from drain()
+            future = executor.submit(self._analyze_chunk, item)
+            pending.add(future)
+            costs[future] = cost
+            in_flight += cost
+
+        while pending:
+            yield from drain()
+
+    def _estimate_memory(self, filepaths: List[Path]) -> int:
+        """
+        Estimated peak memory of analyzing a batch in one worker.
+
+        Files of a batch are analyzed one after another, so only the largest
+        one is parsed at a time, but all of them may be read ahead.
+        """
+        sizes = [_file_size(filepath) for filepath in filepaths]
+        return max(sizes, default=0) * self.MEMORY_PER_SOURCE_BYTE + sum(sizes)
+
+    def _collect(self, analysis: FileAnalysis):
+        """Bookkeeping for a freshly analyzed file: cache it and merge its stats."""
+        if self.cache:
+            self.cache.store(analysis)
+        if self.stats is not None and analysis.stats is not None:
+            self.stats.merge(analysis.stats)
+
+    def _lookup(self, filepath: Path) -> Optional[FileAnalysis]:
+        if not self.cache:
+            return None
+        with optional_phase(self.stats, "cache_lookup"):
+            return self.cache.lookup(filepath)
 
-            for issue in analysis.issues:
-                report.append(f"\n### Line {issue.line_number}: {issue.issue_type}")
-                report.append(f"**Description:** {issue.description}")
-                report.append(f"**Suggestion:** {issue.suggestion}")
-                report.append("\n**Original Code:**")
-                report.append(f"```python\n{issue.original_code}\n```")
+    def _iter_python_files(self) -> Iterator[Path]:
+        """Lazily find Python files, skipping excluded and gitignored paths."""
+        discovery = FileDiscovery(self.root_path, self.exclude_dirs, self.exclude_files, self.respect_gitignore)
+        if self.shard is None:
+            return iter(discovery)
 
-                if issue.optimized_code:
-                    report.append("\n**Optimized Code:**")
-                    report.append(f"```python\n{issue.optimized_code}\n```")
+        # Balancing a shard needs every file up front, so this is not lazy.
+        python_files = list(discovery)
+        index, count = self.shard
+        positions = partition(python_files, self.root_path, count)[index - 1]
+        self._shard_positions = {str(python_files[position]): position for position in positions}
+        return iter([python_files[position] for position in positions])
+
+    def _find_python_files(self) -> List[Path]:
+        """Recursively find all Python files in the project."""
+        return list(self._iter_python_files())
+
+    def save_shard(self, results: Dict[str, FileAnalysis], output_file: str):
+        """Write the results of this shard to a file for merge_shards()."""
+        if self.shard is None:
+            raise ValueError("save_shard() needs an analyzer created with shard=(index, count)")
+        write_shard(output_file, self.root_path, self.shard, self._shard_positions, results,
+                    rules_signature(default_rules()))
+
+    def generate_report(self, results: Union[Dict[str, FileAnalysis], IssueTable], output_file: str = None,
+                        stats: Optional[AnalysisStats] = None):
+        """
+        Generate a markdown report from analysis results or an IssueTable.
+
+        If ``stats`` is given (e.g. ``self.stats`` after a profiled run), a
+        performance profile section is appended to the report.
+        """
+        report = ["# Code Analysis Report\n"]
+
+        if isinstance(results, IssueTable):
+            by_file = results.group_by("filepath")
+            total_files = len(results.filepaths)
+            total_issues = len(results)
+            sections = (
+                (filepath, results.error(filepath), by_file.get(filepath, ()))
+                for filepath in sorted(results.filepaths)
+            )
+        else:
+            total_files = len(results)
+            total_issues = sum(len(analysis.issues) for analysis in results.values())
+            sections = (
+                (filepath, analysis.error, analysis.issues)
+                for filepath, analysis in sorted(results.items())
+            )
+
+        report.append(f"Total files analyzed: {total_files}")
+        report.append(f"Total issues found: {total_issues}\n")
+
+        for filepath, error, issues in sections:
+            report.extend(self._format_section(filepath, error, issues))
+
+        if stats is not None:
+            report.append(stats.format_report())
 
         report_content = '\n'.join(report)
 
@@ -96,3 +471,35 @@ class ProjectAnalyzer:
                 f.write(report_content)
 
         return report_content
+
+    @classmethod
+    def _format_section(cls, filepath: str, error: Optional[str], issues: Iterable[CodeIssue]) -> List[str]:
+        lines = [f"## {filepath}"]
+
+        if error:
+            lines.append(f"\n⚠️ Error: {error}\n")
+            return lines
+
+        if not issues:
+            lines.append("\n✅ No issues found\n")
+            return lines
+
+        for issue in issues:
+            lines.extend(cls._format_issue(issue))
+        return lines
+
+    @staticmethod
+    def _format_issue(issue: CodeIssue) -> List[str]:
+        lines = [
+            f"\n### Line {issue.line_number}: {issue.issue_type}",
+            f"**Description:** {issue.description}",
+            f"**Suggestion:** {issue.suggestion}",
+            "\n**Original Code:**",
+            f"```python\n{issue.original_code}\n```",
+        ]
+
+        if issue.optimized_code:
+            lines.append("\n**Optimized Code:**")
+            lines.append(f"```python\n{issue.optimized_code}\n```")
+
+        return lines
@@ -0,0 +1,189 @@
+"""
+Function-level incremental analysis.
+
+A module is split into segments: each top-level function or class is one
+segment, and every run of other top-level statements is another. Findings of
+"definition"-scoped rules are cached per segment, keyed by the segment's
+text, the module's imports and the rule configuration, with line numbers
+stored relative to the segment. After an edit only the segments whose text
+changed are walked again; the findings of the others are shifted to their
+new position. "module"-scoped rules always run over the whole tree.
+"""
+import ast
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+from .engine import Rule, RuleEngine, rules_signature
+from .models import CodeIssue, SourceSpan, SourceText
+from .profiling import AnalysisStats
+
+_DEFINITIONS = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+
+class Segment(NamedTuple):
+    """A group of consecutive top-level statements and the lines they span."""
+    nodes: Tuple[ast.stmt, ...]
+    start_line: int
+    end_line: int
+
+
+class _CachedIssue(NamedTuple):
+    """A CodeIssue with line numbers relative to the start of its segment."""
+    line_offset: int
+    issue_type: str
+    description: str
+    suggestion: str
+    original_code: Optional[str]
+    optimized_code: Optional[str]
+    span: Optional[Tuple[int, int, int, int]]
+
+    @classmethod
+    def from_issue(cls, issue: CodeIssue, start_line: int) -> "_CachedIssue":
+        span = issue.span
+        return cls(
+            issue.line_number - start_line,
+            issue.issue_type,
+            issue.description,
+            issue.suggestion,
+            None if span is not None else issue.original_code,
+            issue.optimized_code,
+            None if span is None else (span.start_line - start_line, span.start_col,
+                                       span.end_line - start_line, span.end_col),
+        )
+
+    def to_issue(self, source: SourceText, start_line: int) -> CodeIssue:
+        if self.span is not None:
+            start, start_col, end, end_col = self.span
+            original_code = SourceSpan(source, start + start_line, start_col, end + start_line, end_col)
+        else:
+            original_code = self.original_code
+        return CodeIssue(
+            line_number=self.line_offset + start_line,
+            issue_type=self.issue_type,
+            description=self.description,
+            suggestion=self.suggestion,
+            original_code=original_code,
+            optimized_code=self.optimized_code,
+        )
+
+
+def _start_line(node: ast.stmt) -> int:
+    return min([node.lineno] + [decorator.lineno for decorator in getattr(node, "decorator_list", ())])
+
+
+def split_segments(tree: ast.Module) -> List[Segment]:
+    """Split a module into definition segments and runs of other statements."""
+    segments = []
+    run: List[ast.stmt] = []
+
+    def flush():
+        if run:
+            segments.append(Segment(tuple(run), _start_line(run[0]), run[-1].end_lineno))
+            run.clear()
+
+    for node in tree.body:
+        if isinstance(node, _DEFINITIONS):
+            flush()
+            segments.append(Segment((node,), _start_line(node), node.end_lineno))
+        else:
+            run.append(node)
+    flush()
+    return segments
+
+
+def imports_fingerprint(tree: ast.Module) -> str:
+    """Hash of the module's top-level imports, independent of their position."""
+    imports = (ast.dump(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+    return hashlib.sha256("\n".join(imports).encode("utf-8")).hexdigest()
+
+
+class SegmentCache:
+    """
+    In-memory LRU cache of per-segment findings.
+
+    One cache can be shared by any number of modules and threads; identical
+    definitions in different modules share an entry.
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, List[List[_CachedIssue]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _get(self, key: str) -> Optional[List[List[_CachedIssue]]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def _put(self, key: str, entry: List[List[_CachedIssue]]):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def analyze(self, tree: ast.Module, source: SourceText, rules: Sequence[Rule],
+                stats: Optional[AnalysisStats] = None) -> List[CodeIssue]:
+        """
+        Run ``rules`` over ``tree``, reusing cached findings of unchanged segments.
+
+        Returns the same issues, in the same order, as a full RuleEngine run.
+        Only the re-analyzed segments are seen by the definition-scoped rule
+        instances, so their other state (e.g. complexities) covers just those.
+        """
+        definition_rules = [rule for rule in rules if rule.scope == "definition"]
+        module_rules = [rule for rule in rules if rule.scope != "definition"]
+
+        segments = split_segments(tree)
+        salt = f"{rules_signature(definition_rules)}\0{imports_fingerprint(tree)}\0".encode("utf-8")
+        keys = [
+            hashlib.sha256(salt + source.lines(segment.start_line, segment.end_line).encode("utf-8")).hexdigest()
+            for segment in segments
+        ]
+
+        # Per segment, per definition rule: issues positioned in this source.
+        found: List[Optional[List[List[CodeIssue]]]] = []
+        missed = []
+        for index, (segment, key) in enumerate(zip(segments, keys)):
+            entry = self._get(key) if definition_rules else []
+            if entry is None:
+                found.append(None)
+                missed.append(index)
+            else:
+                found.append([[cached.to_issue(source, segment.start_line) for cached in per_rule]
+                              for per_rule in entry])
+
+        if missed:
+            engine = RuleEngine(definition_rules, stats)
+            fresh = engine.run_segments(tree, [segments[index].nodes for index in missed], source)
+            for index, per_rule in zip(missed, fresh):
+                start_line = segments[index].start_line
+                self._put(keys[index], [[_CachedIssue.from_issue(issue, start_line) for issue in issues]
+                                        for issues in per_rule])
+                found[index] = per_rule
+
+        if module_rules:
+            RuleEngine(module_rules, stats).run(tree, source)
+
+        issues: List[CodeIssue] = []
+        position = {id(rule): index for index, rule in enumerate(definition_rules)}
+        for rule in rules:
+            if rule.scope != "definition":
+                issues.extend(rule.issues)
+                continue
+            index = position[id(rule)]
+            for per_rule in found:
+                issues.extend(per_rule[index])
+        return issues
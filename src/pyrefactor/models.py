@@ -1,12 +1,194 @@
-from dataclasses import dataclass
+import os
+import re
+import tokenize
+from array import array
+from dataclasses import dataclass, field
+from importlib.util import decode_source
+from itertools import accumulate, repeat
+from operator import add
+from pathlib import Path
+from typing import Dict, Hashable, List, NamedTuple, Optional, Tuple, Union
 
+_NEWLINE = re.compile(r"\r\n|\r|\n")
 
-@dataclass
+
+class SourceChangedError(ValueError):
+    """A released source file was modified, so recorded spans no longer match it."""
+
+
+class SourceText:
+    """
+    Source code of one module plus a lazily built line-offset index.
+
+    The source may be given as raw bytes, in which case it is only decoded
+    (honouring its encoding declaration) when the text is first needed. When
+    the source came from a file, the text itself is not pickled and can be
+    released; it is re-read from ``path`` the next time it is needed. The
+    file's size and modification time are recorded when the text is dropped,
+    and re-reading a file that has changed since raises SourceChangedError
+    rather than returning text that no longer matches the recorded spans.
+    """
+
+    __slots__ = ("path", "_text", "_line_offsets", "_stamp")
+
+    def __init__(self, text: Union[str, bytes, None] = None, path: Optional[Path] = None):
+        if text is None and path is None:
+            raise ValueError("SourceText needs either text or a path")
+        self.path = path
+        self._text = text
+        self._line_offsets: Optional[array] = None
+        # (size, mtime) of the file when the text was dropped
+        self._stamp: Optional[Tuple[int, int]] = None
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            if self.changed():
+                raise SourceChangedError(f"{self.path} has changed since it was analyzed")
+            with tokenize.open(self.path) as f:
+                self._text = f.read()
+        elif isinstance(self._text, bytes):
+            self._text = decode_source(self._text)
+        return self._text
+
+    def _file_stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    def changed(self) -> bool:
+        """Whether the file was modified (or removed) after the text was released."""
+        return self._text is None and self._stamp is not None and self._file_stamp() != self._stamp
+
+    def release(self):
+        """Drop the in-memory text and index if they can be re-read from disk."""
+        if self.path is not None:
+            if self._text is not None and self._stamp is None:
+                self._stamp = self._file_stamp()
+            self._text = None
+            self._line_offsets = None
+
+    def _offsets(self) -> array:
+        if self._line_offsets is None:
+            text = self.text
+            offsets = array("l", [0])
+            if "\r" in text:
+                offsets.extend(match.end() for match in _NEWLINE.finditer(text))
+            else:
+                # Running sum of line lengths plus newline, computed in C.
+                offsets.extend(accumulate(map(add, map(len, text.split("\n")[:-1]), repeat(1))))
+            self._line_offsets = offsets
+        return self._line_offsets
+
+    def lines(self, start_line: int, end_line: int) -> str:
+        """Text of the 1-based, inclusive line range, without the final newline."""
+        offsets = self._offsets()
+        start = offsets[min(start_line - 1, len(offsets) - 1)]
+        end = offsets[end_line] if end_line < len(offsets) else len(self.text)
+        segment = self.text[start:end].rstrip("\r\n")
+        return _NEWLINE.sub("\n", segment) if "\r" in segment else segment
+
+    def __getstate__(self):
+        if self.path is None:
+            return None, self._text, None
+        stamp = self._stamp if self._stamp is not None or self._text is None else self._file_stamp()
+        return self.path, None, stamp
+
+    def __setstate__(self, state):
+        self.path, self._text, self._stamp = state
+        self._line_offsets = None
+
+
+class SourceSpan(NamedTuple):
+    """Location of a piece of code; its text is only produced on demand."""
+    source: SourceText
+    start_line: int
+    start_col: int
+    end_line: int
+    end_col: int
+
+    def text(self) -> str:
+        return self.source.lines(self.start_line, self.end_line)
+
+
+class FunctionKey(NamedTuple):
+    """Lightweight identifier of a function that does not keep its AST alive."""
+    name: str
+    qualname: str
+    lineno: int
+    end_lineno: Optional[int]
+
+
+@dataclass(init=False)
 class CodeIssue:
-    """Represents a detected code issue with suggested improvements."""
+    """
+    Represents a detected code issue with suggested improvements.
+
+    ``original_code`` may be given as a SourceSpan instead of text. The span
+    is then kept in ``span`` and the text is only extracted from the source
+    when ``original_code`` is read. If the file was modified after it was
+    analyzed, a comment saying so is returned instead of the old code.
+    """
     line_number: int
     issue_type: str
     description: str
     suggestion: str
-    original_code: str
-    optimized_code: str = None
+    optimized_code: Optional[str]
+    span: Optional[SourceSpan] = field(repr=False)
+    _code: Optional[str] = field(repr=False)
+
+    def __init__(self, line_number: int, issue_type: str, description: str, suggestion: str,
+                 original_code: Union[str, SourceSpan, None], optimized_code: Optional[str] = None):
+        self.line_number = line_number
+        self.issue_type = issue_type
+        self.description = description
+        self.suggestion = suggestion
+        self.original_code = original_code
+        self.optimized_code = optimized_code
+
+    @property
+    def original_code(self) -> Optional[str]:
+        if self.span is None:
+            return self._code
+        try:
+            return self.span.text()
+        except SourceChangedError:
+            return f"# {self.span.source.path} has changed since it was analyzed"
+
+    @original_code.setter
+    def original_code(self, code: Union[str, SourceSpan, None]):
+        if isinstance(code, SourceSpan):
+            self.span, self._code = code, None
+        else:
+            self.span, self._code = None, code
+
+    def to_dict(self) -> Dict[str, object]:
+        """The issue as plain data (with the original code as text), e.g. for JSON."""
+        return {
+            "line_number": self.line_number,
+            "issue_type": self.issue_type,
+            "description": self.description,
+            "suggestion": self.suggestion,
+            "original_code": self.original_code,
+            "optimized_code": self.optimized_code,
+        }
+
+
+@dataclass
+class FileAnalysis:
+    """Results of analyzing a single Python file."""
+    filepath: Path
+    issues: List[CodeIssue]
+    error: Optional[str] = None
+    # Per-file AnalysisStats when profiling is enabled
+    stats: Optional[object] = field(default=None, compare=False, repr=False)
+
+
+@dataclass
+class SourceAnalysis:
+    """Results of analyzing one in-memory source passed to analyze_many()."""
+    source_id: Hashable
+    issues: List[CodeIssue]
+    error: Optional[str] = None
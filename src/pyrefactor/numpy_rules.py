@@ -0,0 +1,327 @@
+"""
+NumPy vectorization rules.
+
+Finds loops over array indices (``for i in range(len(a))``, possibly nested)
+whose body does the same thing to every element, and suggests the NumPy
+expression that does it over whole arrays in compiled code:
+
+- element-wise assignment: ``out[i] = a[i] * b[i] + c`` -> ``out[:] = a * b + c``
+- reductions: ``total += a[i] * b[i]`` -> ``total += np.sum(a * b)``, and
+  ``best = max(best, a[i])`` -> ``best = np.max(a, initial=best)``
+- masked assignment and reductions: ``if a[i] > 0: out[i] = a[i]`` ->
+  ``out[:] = np.where(a > 0, a, out)``
+- element-wise appends: ``result.append(m[i][j])`` -> ``result.extend(np.ravel(m).tolist())``
+
+Rules only fire in modules that import numpy, or for loops over arrays that
+are clearly NumPy arrays (parameters annotated as ``np.ndarray`` or locals
+created by a numpy call).
+"""
+import ast
+from typing import List, Optional, Set
+
+from .dataflow import dotted_name, module_imports
+from .engine import Rule
+from .models import CodeIssue
+from .vectorize import Vectorizer, unparse_statement, uses_names
+
+# Conventional aliases, for annotations in modules that import numpy only
+# under ``if TYPE_CHECKING:``
+_CONVENTIONAL_ALIASES = {"np": "numpy", "npt": "numpy.typing"}
+
+
+def _is_ndarray_annotation(annotation: Optional[ast.AST], imports) -> bool:
+    if isinstance(annotation, ast.Constant) and isinstance(annotation.value, str):
+        try:
+            annotation = ast.parse(annotation.value, mode="eval").body
+        except SyntaxError:
+            return False
+    if isinstance(annotation, ast.Subscript):
+        annotation = annotation.value
+    path = dotted_name(annotation) if annotation is not None else None
+    if path is None:
+        return False
+    root, _, rest = path.partition(".")
+    module = imports.get(root, _CONVENTIONAL_ALIASES.get(root, root))
+    return module + ("." + rest if rest else "") in ("numpy.ndarray", "numpy.typing.NDArray")
+
+
+def _range_extent(node: ast.AST) -> bool:
+    """Whether ``node`` is ``range(len(x))`` or ``range(x.shape[k])`` (optionally from 0)."""
+    if not (isinstance(node, ast.Call) and dotted_name(node.func) == "range" and not node.keywords):
+        return False
+    args = node.args
+    if len(args) == 2 and isinstance(args[0], ast.Constant) and args[0].value == 0:
+        args = args[1:]
+    if len(args) != 1:
+        return False
+    extent = args[0]
+    if isinstance(extent, ast.Call) and dotted_name(extent.func) == "len" and len(extent.args) == 1:
+        return True
+    return (isinstance(extent, ast.Subscript) and isinstance(extent.value, ast.Attribute)
+            and extent.value.attr == "shape")
+
+
+def _index_loop(node: ast.AST) -> Optional[str]:
+    """Index variable of ``for i in range(len(x))`` with no ``else``, else None."""
+    if (isinstance(node, ast.For) and isinstance(node.target, ast.Name) and not node.orelse
+            and _range_extent(node.iter)):
+        return node.target.id
+    return None
+
+
+class NumpyVectorizationVisitor(Rule):
+    """
+    Rule to find index loops that can be replaced with one NumPy expression.
+
+    See the module docstring for the recognized loop bodies. A nest of index
+    loops is reported once, at its outermost loop that can be vectorized.
+    The suggested code assumes the indexed sequences are NumPy arrays of
+    the looped shape.
+    """
+
+    scope = "definition"
+
+    def __init__(self):
+        super().__init__()
+        self.imports = {}
+        self.np_name = "np"
+        self.imports_numpy = False
+        # Per function: names known to hold NumPy arrays
+        self._arrays: List[Set[str]] = [set()]
+        self._covered = set()
+
+    def begin(self, tree, source=None):
+        super().begin(tree, source)
+        self.imports = module_imports(tree)
+        aliases = [name for name, module in self.imports.items() if module == "numpy"]
+        self.np_name = aliases[0] if aliases else "np"
+        self.imports_numpy = any(module == "numpy" or module.startswith("numpy.")
+                                 for module in self.imports.values())
+
+    def _enter_function(self, node):
+        args = node.args
+        self._arrays.append({
+            arg.arg for arg in args.posonlyargs + args.args + args.kwonlyargs
+            if _is_ndarray_annotation(arg.annotation, self.imports)
+        })
+
+    def _leave_function(self, node):
+        self._arrays.pop()
+
+    enter_FunctionDef = enter_AsyncFunctionDef = _enter_function
+    leave_FunctionDef = leave_AsyncFunctionDef = _leave_function
+
+    def _creates_array(self, value: Optional[ast.AST]) -> bool:
+        if not isinstance(value, ast.Call):
+            return False
+        func = dotted_name(value.func)
+        root = func.split(".")[0] if func else None
+        return root is not None and self.imports.get(root, "").split(".")[0] == "numpy"
+
+    def enter_Assign(self, node):
+        # Only inside functions, so findings do not depend on other top-level statements
+        if len(self._arrays) > 1 and self._creates_array(node.value):
+            self._arrays[-1].update(target.id for target in node.targets if isinstance(target, ast.Name))
+
+    def enter_AnnAssign(self, node):
+        if len(self._arrays) > 1 and isinstance(node.target, ast.Name) and (
+                _is_ndarray_annotation(node.annotation, self.imports) or self._creates_array(node.value)):
+            self._arrays[-1].add(node.target.id)
+
+    def enter_For(self, node):
+        if id(node) in self._covered or _index_loop(node) is None:
+            return
+
+        loops = [node]
+        while len(loops[-1].body) == 1 and _index_loop(loops[-1].body[0]) is not None:
+            loops.append(loops[-1].body[0])
+        indices = [_index_loop(loop) for loop in loops]
+        if len(loops[-1].body) != 1:
+            return
+
+        vectorizer = Vectorizer(indices, self.np_name, self.imports)
+        found = self._vectorize(loops[-1].body[0], vectorizer)
+        if found is None:
+            return
+        if not (self.imports_numpy or vectorizer.arrays & self._arrays[-1]):
+            return
+        self._covered.update(id(loop) for loop in loops)
+
+        kind, statement = found
+        suggestion = "Replace the loop with the NumPy expression, which runs over whole arrays in compiled code"
+        if not self.imports_numpy:
+            suggestion += f" (add 'import numpy as {self.np_name}')"
+        self.issues.append(CodeIssue(
+            line_number=node.lineno,
+            issue_type="numpy_vectorization",
+            description=f"{kind} over {', '.join(indices)} can be vectorized with NumPy",
+            suggestion=suggestion,
+            original_code=self.node_source(node),
+            optimized_code=statement
+        ))
+
+    def _vectorize(self, statement: ast.stmt, vectorizer: Vectorizer):
+        """``(kind, replacement code)`` for the body of an index loop nest, or None."""
+        if isinstance(statement, ast.If):
+            return self._vectorize_masked(statement, vectorizer)
+
+        if isinstance(statement, ast.Assign) and len(statement.targets) == 1:
+            target = statement.targets[0]
+            if isinstance(target, ast.Subscript):
+                array, value = vectorizer.indexed(target), vectorizer.value(statement.value)
+                if array is None or value is None:
+                    return None
+                return "Element-wise loop", unparse_statement(ast.Assign(targets=[_whole(array)], value=value))
+            if isinstance(target, ast.Name):
+                return self._vectorize_extremum(target.id, statement.value, vectorizer)
+            return None
+
+        if isinstance(statement, ast.AugAssign):
+            target = statement.target
+            if isinstance(target, ast.Subscript):
+                array, value = vectorizer.indexed(target), vectorizer.value(statement.value)
+                if array is None or value is None:
+                    return None
+                return "Element-wise loop", unparse_statement(ast.AugAssign(target=array, op=statement.op, value=value))
+            if isinstance(target, ast.Name):
+                return self._vectorize_sum(target.id, statement.op, statement.value, None, vectorizer)
+            return None
+
+        if isinstance(statement, ast.Expr):
+            return self._vectorize_append(statement.value, None, vectorizer)
+        return None
+
+    def _vectorize_sum(self, name: str, op: ast.operator, element: ast.expr, mask: Optional[ast.expr],
+                       vectorizer: Vectorizer):
+        """``total += element`` (or ``*=``), optionally only where ``mask`` holds."""
+        if name in vectorizer.indices or uses_names(element, {name}) or not isinstance(op, (ast.Add, ast.Mult)):
+            return None
+        value = vectorizer.value(element)
+        if value is None or not vectorizer.arrays:
+            return None
+        if mask is not None:
+            if isinstance(op, ast.Add) and isinstance(element, ast.Constant) and element.value == 1:
+                reduced = vectorizer.call("count_nonzero", mask)
+                return "Masked count", unparse_statement(ast.AugAssign(target=_name(name), op=op, value=reduced))
+            value = vectorizer.call("where", mask, value, ast.Constant(value=0 if isinstance(op, ast.Add) else 1))
+        reduced = vectorizer.call("sum" if isinstance(op, ast.Add) else "prod", value)
+        kind = "Masked reduction" if mask is not None else "Reduction"
+        return kind, unparse_statement(ast.AugAssign(target=_name(name), op=op, value=reduced))
+
+    def _vectorize_extremum(self, name: str, value: ast.expr, vectorizer: Vectorizer):
+        """``total = total + element`` and ``best = max(best, element)``."""
+        if isinstance(value, ast.BinOp) and isinstance(value.left, ast.Name) and value.left.id == name:
+            return self._vectorize_sum(name, value.op, value.right, None, vectorizer)
+        if not (isinstance(value, ast.Call) and dotted_name(value.func) in ("max", "min")
+                and len(value.args) == 2 and not value.keywords):
+            return None
+        names = [isinstance(arg, ast.Name) and arg.id == name for arg in value.args]
+        if names.count(True) != 1:
+            return None
+        element = value.args[names.index(False)]
+        return self._reduce_extremum(name, value.func.id, element, vectorizer)
+
+    def _reduce_extremum(self, name: str, func: str, element: ast.expr, vectorizer: Vectorizer):
+        if name in vectorizer.indices or uses_names(element, {name}):
+            return None
+        array = vectorizer.value(element)
+        if array is None or not vectorizer.arrays:
+            return None
+        # initial= keeps the running value and, unlike max(best, np.max(a)), works on empty arrays
+        reduced = vectorizer.call(func, array)
+        reduced.keywords = [ast.keyword(arg="initial", value=_name(name))]
+        return "Reduction", unparse_statement(ast.Assign(targets=[_name(name, ast.Store())], value=reduced))
+
+    def _vectorize_append(self, call: ast.expr, mask: Optional[ast.expr], vectorizer: Vectorizer):
+        """``result.append(element)``, optionally only where ``mask`` holds."""
+        if not (isinstance(call, ast.Call) and isinstance(call.func, ast.Attribute) and call.func.attr == "append"
+                and len(call.args) == 1 and not call.keywords):
+            return None
+        result = call.func.value
+        if dotted_name(result) is None or uses_names(result, set(vectorizer.indices)):
+            return None
+        value = vectorizer.value(call.args[0])
+        if value is None or not vectorizer.arrays:
+            return None
+        kind = "Masked append loop" if mask is not None else "Element-wise append loop"
+        if mask is not None and not uses_names(value, vectorizer.arrays):
+            # The same value for every selected element
+            values = ast.BinOp(left=ast.List(elts=[value], ctx=ast.Load()), op=ast.Mult(),
+                               right=vectorizer.call("count_nonzero", mask))
+        elif uses_names(value, vectorizer.arrays):
+            selected = (ast.Subscript(value=value, slice=mask, ctx=ast.Load()) if mask is not None
+                        else vectorizer.call("ravel", value))
+            values = ast.Call(func=ast.Attribute(value=selected, attr="tolist", ctx=ast.Load()), args=[], keywords=[])
+        else:
+            return None
+        extend = ast.Call(func=ast.Attribute(value=result, attr="extend", ctx=ast.Load()), args=[values], keywords=[])
+        return kind, unparse_statement(ast.Expr(value=extend))
+
+    def _vectorize_masked(self, statement: ast.If, vectorizer: Vectorizer):
+        """A loop body that is a single ``if`` (with an optional ``else``) on an element-wise condition."""
+        if len(statement.body) != 1 or len(statement.orelse) > 1:
+            return None
+        mask = vectorizer.condition(statement.test)
+        if mask is None:
+            return None
+        body, orelse = statement.body[0], statement.orelse[0] if statement.orelse else None
+
+        if isinstance(body, ast.Assign) and len(body.targets) == 1 and isinstance(body.targets[0], ast.Subscript):
+            array, value = vectorizer.indexed(body.targets[0]), vectorizer.value(body.value)
+            if array is None or value is None:
+                return None
+            if orelse is None:
+                if not uses_names(value, vectorizer.arrays):
+                    # A scalar written where the mask holds
+                    target = ast.Subscript(value=array, slice=mask, ctx=ast.Store())
+                    return "Masked assignment", unparse_statement(ast.Assign(targets=[target], value=value))
+                otherwise = array
+            else:
+                if not (isinstance(orelse, ast.Assign) and len(orelse.targets) == 1
+                        and ast.dump(orelse.targets[0]) == ast.dump(body.targets[0])):
+                    return None
+                otherwise = vectorizer.value(orelse.value)
+                if otherwise is None:
+                    return None
+            where = vectorizer.call("where", mask, value, otherwise)
+            return "Masked assignment", unparse_statement(ast.Assign(targets=[_whole(array)], value=where))
+
+        if orelse is not None:
+            return None
+        if isinstance(body, ast.AugAssign) and isinstance(body.target, ast.Name):
+            return self._vectorize_sum(body.target.id, body.op, body.value, mask, vectorizer)
+        if isinstance(body, ast.Expr):
+            return self._vectorize_append(body.value, mask, vectorizer)
+        if isinstance(body, ast.Assign) and len(body.targets) == 1 and isinstance(body.targets[0], ast.Name):
+            return self._vectorize_running_extremum(statement.test, body, vectorizer)
+        return None
+
+    def _vectorize_running_extremum(self, test: ast.expr, body: ast.Assign, vectorizer: Vectorizer):
+        """``if a[i] > best: best = a[i]`` (a running maximum, or minimum with ``<``)."""
+        name = body.targets[0].id
+        if not (isinstance(test, ast.Compare) and len(test.ops) == 1):
+            return None
+        left, op, right = test.left, test.ops[0], test.comparators[0]
+        element = ast.dump(body.value)
+        if ast.dump(left) == element and isinstance(right, ast.Name) and right.id == name:
+            larger = isinstance(op, (ast.Gt, ast.GtE))
+            smaller = isinstance(op, (ast.Lt, ast.LtE))
+        elif ast.dump(right) == element and isinstance(left, ast.Name) and left.id == name:
+            larger = isinstance(op, (ast.Lt, ast.LtE))
+            smaller = isinstance(op, (ast.Gt, ast.GtE))
+        else:
+            return None
+        if not (larger or smaller):
+            return None
+        return self._reduce_extremum(name, "max" if larger else "min", body.value, vectorizer)
+
+
+def _name(name: str, ctx: Optional[ast.expr_context] = None) -> ast.Name:
+    return ast.Name(id=name, ctx=ctx or ast.Load())
+
+
+def _whole(array: ast.expr) -> ast.expr:
+    """Assignment target covering all of ``array``: ``array[:]``, unless it already is a slice."""
+    if isinstance(array, ast.Subscript) and isinstance(array.slice, ast.Tuple):
+        return array
+    return ast.Subscript(value=array, slice=ast.Slice(), ctx=ast.Store())
@@ -0,0 +1,516 @@
+"""
+pandas anti-pattern rules.
+
+Reports the usual causes of slow pandas code, in modules that import pandas:
+
+- loops over ``df.iterrows()`` / ``df.itertuples()``
+- row-wise ``df.apply(func, axis=1)``
+- growing a frame with ``df.append()`` or ``pd.concat()`` inside a loop
+- chained indexing assignments such as ``df["a"][mask] = value``
+
+The last two are only reported where ``df`` is known to be a frame (see
+_known_frames()).
+
+Where the row logic is simple element-wise arithmetic or a condition, the
+suggested code is the vectorized column expression (``np.where`` for
+conditions); frames grown in a loop are collected in a list and
+concatenated once; chained assignments become one ``.loc`` assignment.
+"""
+import ast
+import copy
+from typing import List, Optional, Set
+
+from .dataflow import dotted_name, module_imports
+from .engine import Rule
+from .models import CodeIssue
+from .vectorize import Vectorizer, unparse_statement
+
+_ROW_ITERATORS = ("iterrows", "itertuples")
+# Attributes whose receiver is taken to be a DataFrame (or Series)
+_FRAME_ACCESSORS = frozenset(_ROW_ITERATORS + ("apply", "loc", "iloc", "at", "iat"))
+
+
+class _ColumnVectorizer(Vectorizer):
+    """
+    Turns expressions over one row (``row["a"]``, ``row.a``) into column expressions.
+
+    ``frame`` is the DataFrame the row comes from; ``names`` are the loop
+    or lambda variables that stand for the row and its index.
+    """
+
+    def __init__(self, frame: ast.expr, row: str, names: List[str], np_name: str, imports):
+        super().__init__(names, np_name, imports)
+        self.frame = frame
+        self.row = row
+
+    def _column(self, label: str) -> ast.expr:
+        self.arrays.add(label)
+        return ast.Subscript(value=self.frame, slice=ast.Constant(value=label), ctx=ast.Load())
+
+    def indexed(self, node):
+        if (isinstance(node.value, ast.Name) and node.value.id == self.row
+                and isinstance(node.slice, ast.Constant) and isinstance(node.slice.value, str)):
+            return self._column(node.slice.value)
+        return None
+
+    def value(self, node):
+        # row.Index / row.name are the row's label, not a column
+        if (isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id == self.row
+                and node.attr not in ("Index", "name")):
+            return self._column(node.attr)
+        return super().value(node)
+
+
+def _row_loop(node: ast.AST):
+    """``(frame, row name, index name or None, method)`` of a loop over df.iterrows()/itertuples()."""
+    if not isinstance(node, (ast.For, ast.AsyncFor)):
+        return None
+    iterator = node.iter
+    if not (isinstance(iterator, ast.Call) and isinstance(iterator.func, ast.Attribute)
+            and iterator.func.attr in _ROW_ITERATORS):
+        return None
+    target = node.target
+    if iterator.func.attr == "iterrows":
+        if not (isinstance(target, ast.Tuple) and len(target.elts) == 2
+                and all(isinstance(element, ast.Name) for element in target.elts)):
+            return iterator.func.value, None, None, "iterrows"
+        index, row = target.elts
+        return iterator.func.value, row.id, index.id, "iterrows"
+    if not isinstance(target, ast.Name):
+        return iterator.func.value, None, None, "itertuples"
+    return iterator.func.value, target.id, None, "itertuples"
+
+
+def _is_frame_annotation(annotation: Optional[ast.AST]) -> bool:
+    """``DataFrame``, ``pd.DataFrame`` or the same as a string annotation."""
+    if isinstance(annotation, ast.Constant) and isinstance(annotation.value, str):
+        return annotation.value.split(".")[-1] == "DataFrame"
+    path = dotted_name(annotation) if annotation is not None else None
+    return path is not None and path.split(".")[-1] == "DataFrame"
+
+
+def _known_frames(function: ast.AST, resolve) -> Set[str]:
+    """
+    Names and attribute chains that hold a DataFrame in ``function``.
+
+    Those are parameters and variables annotated as DataFrame, variables
+    assigned the result of a pandas call (``pd.read_csv(...)``) and the
+    receivers of iterrows(), apply(), ``.loc`` and the like.
+    """
+    args = function.args
+    frames = {arg.arg for arg in args.posonlyargs + args.args + args.kwonlyargs
+              if _is_frame_annotation(arg.annotation)}
+    for child in ast.walk(function):
+        if isinstance(child, ast.AnnAssign) and _is_frame_annotation(child.annotation):
+            targets = [child.target]
+        elif isinstance(child, (ast.Assign, ast.AnnAssign)) and isinstance(child.value, ast.Call):
+            func = dotted_name(child.value.func)
+            is_pandas = func is not None and resolve(func).startswith("pandas.")
+            targets = (child.targets if isinstance(child, ast.Assign) else [child.target]) if is_pandas else []
+        elif isinstance(child, ast.Attribute) and child.attr in _FRAME_ACCESSORS:
+            targets = [child.value]
+        else:
+            continue
+        frames.update(path for path in map(dotted_name, targets) if path is not None)
+    return frames
+
+
+def _accumulated_frame(node: ast.stmt, resolve) -> Optional[ast.Call]:
+    """The ``df.append(x)`` / ``pd.concat([df, x])`` call of ``df = ...``, else None."""
+    if not (isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name)
+            and isinstance(node.value, ast.Call)):
+        return None
+    name, call = node.targets[0].id, node.value
+    if (isinstance(call.func, ast.Attribute) and call.func.attr == "append"
+            and isinstance(call.func.value, ast.Name) and call.func.value.id == name and len(call.args) == 1):
+        return call
+    func = dotted_name(call.func)
+    if (func is not None and resolve(func) == "pandas.concat" and len(call.args) == 1
+            and isinstance(call.args[0], (ast.List, ast.Tuple)) and len(call.args[0].elts) == 2
+            and isinstance(call.args[0].elts[0], ast.Name) and call.args[0].elts[0].id == name):
+        return call
+    return None
+
+
+def _growth_parts(call: ast.Call):
+    """``(frame name node, piece)`` of an accumulation call found by _accumulated_frame()."""
+    if isinstance(call.func, ast.Attribute) and call.func.attr == "append" and isinstance(call.func.value, ast.Name):
+        return call.func.value, call.args[0]
+    return call.args[0].elts[0], call.args[0].elts[1]
+
+
+class PandasVisitor(Rule):
+    """
+    Rule to find slow pandas patterns; see the module docstring.
+
+    Does nothing unless the module imports pandas. Suggested vectorized code
+    uses the module's numpy alias (``np`` if numpy is not imported).
+    """
+
+    scope = "definition"
+
+    def __init__(self):
+        super().__init__()
+        self.imports = {}
+        self.enabled = False
+        self.pd_name = "pd"
+        self.np_name = "np"
+        # Per function (or class/module body): enclosing loops
+        self._loops = [[]]
+        # Per function: names known to hold a DataFrame (none outside functions, so findings
+        # do not depend on other top-level statements)
+        self._frames: List[Set[str]] = [set()]
+        self._reported = set()
+
+    def begin(self, tree, source=None):
+        super().begin(tree, source)
+        self.imports = module_imports(tree)
+        self.enabled = any(module == "pandas" or module.startswith("pandas.") for module in self.imports.values())
+        self.pd_name = next((name for name, module in self.imports.items() if module == "pandas"), "pd")
+        self.np_name = next((name for name, module in self.imports.items() if module == "numpy"), "np")
+
+    def _resolve(self, path: str) -> str:
+        root, _, rest = path.partition(".")
+        return self.imports.get(root, root) + ("." + rest if rest else "")
+
+    def _enter_scope(self, node):
+        self._loops.append([])
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            self._frames.append(_known_frames(node, self._resolve) if self.enabled else set())
+        else:
+            # A lambda sees the frames of its function; a class body sees none
+            self._frames.append(self._frames[-1] if isinstance(node, ast.Lambda) else set())
+
+    def _leave_scope(self, node):
+        self._loops.pop()
+        self._frames.pop()
+
+    enter_FunctionDef = enter_AsyncFunctionDef = enter_Lambda = enter_ClassDef = _enter_scope
+    leave_FunctionDef = leave_AsyncFunctionDef = leave_Lambda = leave_ClassDef = _leave_scope
+
+    def _enter_loop(self, node):
+        self._loops[-1].append(node)
+
+    def _leave_loop(self, node):
+        self._loops[-1].pop()
+
+    enter_AsyncFor = enter_While = _enter_loop
+    leave_For = leave_AsyncFor = leave_While = _leave_loop
+
+    def _report(self, node: ast.AST, issue_type: str, description: str, suggestion: str,
+                original: ast.AST, optimized_code: Optional[str]):
+        self.issues.append(CodeIssue(
+            line_number=node.lineno,
+            issue_type=issue_type,
+            description=description,
+            suggestion=suggestion,
+            original_code=self.node_source(original),
+            optimized_code=optimized_code
+        ))
+
+    # Row iteration
+
+    def enter_For(self, node):
+        self._enter_loop(node)
+        if not self.enabled:
+            return
+        found = _row_loop(node)
+        if found is None:
+            return
+        frame, row, index, method = found
+        cost = "builds a Series for every row" if method == "iterrows" else "builds a tuple for every row"
+        self._report(
+            node, "pandas_row_iteration",
+            f"Looping over {method}() {cost} and runs the loop body in Python, once per row",
+            "Use vectorized column operations (np.where for conditions) instead of a row loop",
+            node, self._vectorize_row_loop(node, frame, row, index, method)
+        )
+
+    def _vectorize_row_loop(self, node: ast.For, frame: ast.expr, row: Optional[str], index: Optional[str],
+                            method: str) -> Optional[str]:
+        if row is None or len(node.body) != 1 or node.orelse:
+            return None
+        names = [row] + ([index] if index else [])
+        vectorizer = _ColumnVectorizer(frame, row, names, self.np_name, self.imports)
+        statement = node.body[0]
+        mask = None
+        if isinstance(statement, ast.If):
+            mask = vectorizer.condition(statement.test)
+            if mask is None or len(statement.body) != 1 or len(statement.orelse) > 1:
+                return self._itertuples_fallback(node, row, index, method)
+            orelse = statement.orelse[0] if statement.orelse else None
+            statement = statement.body[0]
+        else:
+            orelse = None
+
+        rewritten = None
+        if isinstance(statement, ast.Assign) and len(statement.targets) == 1:
+            rewritten = self._vectorize_cell_assignment(statement, orelse, mask, frame, row, index, vectorizer)
+        elif orelse is None and isinstance(statement, ast.AugAssign) and isinstance(statement.target, ast.Name):
+            value = vectorizer.value(statement.value)
+            if (value is not None and vectorizer.arrays and isinstance(statement.op, ast.Add)
+                    and statement.target.id not in names):
+                if mask is not None:
+                    value = vectorizer.call("where", mask, value, ast.Constant(value=0))
+                total = ast.Call(func=ast.Attribute(value=value, attr="sum", ctx=ast.Load()), args=[], keywords=[])
+                rewritten = unparse_statement(ast.AugAssign(target=statement.target, op=statement.op, value=total))
+        elif orelse is None and isinstance(statement, ast.Expr):
+            call = statement.value
+            if (isinstance(call, ast.Call) and isinstance(call.func, ast.Attribute) and call.func.attr == "append"
+                    and len(call.args) == 1 and not call.keywords and dotted_name(call.func.value) is not None):
+                value = vectorizer.value(call.args[0])
+                if value is not None and vectorizer.arrays and _uses_column(value, frame):
+                    if mask is not None:
+                        value = ast.Subscript(value=value, slice=mask, ctx=ast.Load())
+                    values = ast.Call(func=ast.Attribute(value=value, attr="tolist", ctx=ast.Load()),
+                                      args=[], keywords=[])
+                    extend = ast.Call(func=ast.Attribute(value=call.func.value, attr="extend", ctx=ast.Load()),
+                                      args=[values], keywords=[])
+                    rewritten = unparse_statement(ast.Expr(value=extend))
+        return rewritten or self._itertuples_fallback(node, row, index, method)
+
+    def _vectorize_cell_assignment(self, statement: ast.Assign, orelse: Optional[ast.stmt], mask,
+                                   frame: ast.expr, row: str, index: Optional[str],
+                                   vectorizer: _ColumnVectorizer) -> Optional[str]:
+        """``df.at[index, "c"] = value`` (or ``.loc``) in the loop body, as one column assignment."""
+        column = self._cell_column(statement.targets[0], frame, row, index)
+        value = vectorizer.value(statement.value)
+        if column is None or value is None:
+            return None
+        target = ast.Subscript(value=frame, slice=ast.Constant(value=column), ctx=ast.Store())
+        if orelse is not None:
+            if not (isinstance(orelse, ast.Assign) and len(orelse.targets) == 1
+                    and self._cell_column(orelse.targets[0], frame, row, index) == column):
+                return None
+            otherwise = vectorizer.value(orelse.value)
+            if otherwise is None:
+                return None
+            value = vectorizer.call("where", mask, value, otherwise)
+        elif mask is not None:
+            target = ast.Subscript(
+                value=ast.Attribute(value=frame, attr="loc", ctx=ast.Load()),
+                slice=ast.Tuple(elts=[mask, ast.Constant(value=column)], ctx=ast.Load()),
+                ctx=ast.Store(),
+            )
+        return unparse_statement(ast.Assign(targets=[target], value=value))
+
+    @staticmethod
+    def _cell_column(target: ast.AST, frame: ast.expr, row: str, index: Optional[str]) -> Optional[str]:
+        """Column label of a ``frame.at[index, "c"]`` / ``frame.loc[index, "c"]`` target."""
+        if not (isinstance(target, ast.Subscript) and isinstance(target.value, ast.Attribute)
+                and target.value.attr in ("at", "loc") and ast.dump(target.value.value) == ast.dump(frame)
+                and isinstance(target.slice, ast.Tuple) and len(target.slice.elts) == 2):
+            return None
+        position, label = target.slice.elts
+        if isinstance(position, ast.Name) and position.id == index:
+            pass
+        elif not (isinstance(position, ast.Attribute) and position.attr == "Index"
+                  and isinstance(position.value, ast.Name) and position.value.id == row):
+            return None
+        if isinstance(label, ast.Constant) and isinstance(label.value, str):
+            return label.value
+        return None
+
+    @staticmethod
+    def _itertuples_fallback(node: ast.For, row: str, index: Optional[str], method: str) -> Optional[str]:
+        """The loop over itertuples(), if iterrows() rows are only read as ``row["identifier"]``."""
+        if method != "iterrows":
+            return None
+        body = [child for statement in node.body for child in ast.walk(statement)]
+        reads = [child for child in body
+                 if isinstance(child, ast.Subscript) and isinstance(child.value, ast.Name) and child.value.id == row]
+        uses = [child for child in body if isinstance(child, ast.Name) and child.id == row]
+        if len(reads) != len(uses) or not all(
+                isinstance(read.ctx, ast.Load) and isinstance(read.slice, ast.Constant)
+                and isinstance(read.slice.value, str) and read.slice.value.isidentifier()
+                and not read.slice.value.startswith("_") for read in reads):
+            return None
+
+        class ToAttributes(ast.NodeTransformer):
+            def visit_Subscript(self, child):
+                if isinstance(child.value, ast.Name) and child.value.id == row:
+                    return ast.copy_location(ast.Attribute(value=child.value, attr=child.slice.value,
+                                                           ctx=ast.Load()), child)
+                return self.generic_visit(child)
+
+        rewritten = ToAttributes().visit(copy.deepcopy(node))
+        rewritten.target = ast.Name(id=row, ctx=ast.Store())
+        rewritten.iter.func.attr = "itertuples"
+        if index is not None and index != "_":
+            rewritten.body.insert(0, ast.Assign(
+                targets=[ast.Name(id=index, ctx=ast.Store())],
+                value=ast.Attribute(value=ast.Name(id=row, ctx=ast.Load()), attr="Index", ctx=ast.Load()),
+                lineno=node.lineno,
+            ))
+        return unparse_statement(rewritten)
+
+    # Row-wise apply
+
+    def enter_Call(self, node):
+        if not (self.enabled and isinstance(node.func, ast.Attribute) and node.func.attr == "apply"):
+            return
+        axis = next((keyword.value for keyword in node.keywords if keyword.arg == "axis"), None)
+        if not (isinstance(axis, ast.Constant) and axis.value in (1, "columns")):
+            return
+        self._report(
+            node, "pandas_row_apply",
+            "apply(..., axis=1) calls a Python function once per row, building a Series for each",
+            "Express the function with vectorized column operations (np.where for conditions)",
+            node, self._vectorize_apply(node)
+        )
+
+    def _vectorize_apply(self, node: ast.Call) -> Optional[str]:
+        if len(node.args) != 1 or not isinstance(node.args[0], ast.Lambda):
+            return None
+        function = node.args[0]
+        arguments = function.args
+        if len(arguments.args) != 1 or arguments.posonlyargs or arguments.vararg or arguments.kwonlyargs:
+            return None
+        row = arguments.args[0].arg
+        vectorizer = _ColumnVectorizer(node.func.value, row, [row], self.np_name, self.imports)
+        value = vectorizer.value(function.body)
+        if value is None or not vectorizer.arrays:
+            return None
+        return unparse_statement(ast.Expr(value=value))
+
+    # Growing a frame in a loop
+
+    def enter_Assign(self, node):
+        if not self.enabled:
+            return
+        if len(node.targets) == 1:
+            self._check_chained_assignment(node, node.targets[0])
+        loops = self._loops[-1]
+        call = _accumulated_frame(node, self._resolve) if loops else None
+        # e.g. items = items.append(x) on some other object with an append()
+        if call is None or node.targets[0].id not in self._frames[-1]:
+            return
+        name = node.targets[0].id
+
+        # Rewrite the outermost loop in which the frame is only grown.
+        target = next((loop for loop in loops if not _reads_besides_growth(loop, name, self._resolve)), None)
+        key = (id(target if target is not None else loops[-1]), name)
+        if key in self._reported:
+            return
+        self._reported.add(key)
+
+        method = "append()" if isinstance(call.func, ast.Attribute) and call.func.attr == "append" else "concat()"
+        self._report(
+            node, "pandas_concat_in_loop",
+            f"DataFrame '{name}' is grown with {method} inside a loop, which copies all of it on every "
+            f"iteration: O(n²) in the final size",
+            "Collect the pieces in a list and concatenate them once after the loop"
+            + (" (DataFrame.append was removed in pandas 2.0)" if method == "append()" else ""),
+            target if target is not None else loops[-1],
+            self._generate_single_concat(target, name, call) if target is not None else None
+        )
+
+    def _generate_single_concat(self, loop: ast.AST, name: str, call: ast.Call) -> str:
+        """Generate the loop collecting the pieces of ``name`` and one concat after it."""
+        _, piece = _growth_parts(call)
+        keywords = call.keywords
+        if isinstance(piece, ast.Dict):
+            # Rows given as dicts: build one frame from all of them
+            collected = f"{name}_rows"
+            start = f"{collected} = []"
+            pieces = f"[{name}, {self.pd_name}.DataFrame({collected})]"
+        else:
+            collected = f"{name}_frames"
+            start = f"{collected} = [{name}]"
+            pieces = collected
+        if isinstance(call.func, ast.Attribute) and call.func.attr == "append":
+            func = ast.Attribute(value=ast.Name(id=self.pd_name, ctx=ast.Load()), attr="concat", ctx=ast.Load())
+        else:
+            func = call.func
+        concat = ast.Call(
+            func=func,
+            args=[ast.parse(pieces, mode="eval").body],
+            keywords=keywords,
+        )
+
+        resolve = self._resolve
+
+        class ToAppend(ast.NodeTransformer):
+            def visit_Assign(self, child):
+                if _accumulated_frame(child, resolve) is not None and child.targets[0].id == name:
+                    _, item = _growth_parts(child.value)
+                    append = ast.Call(
+                        func=ast.Attribute(value=ast.Name(id=collected, ctx=ast.Load()), attr="append",
+                                           ctx=ast.Load()),
+                        args=[item], keywords=[],
+                    )
+                    return ast.copy_location(ast.Expr(value=append), child)
+                return child
+
+        rewritten = ToAppend().visit(copy.deepcopy(loop))
+        assignment = ast.Assign(targets=[ast.Name(id=name, ctx=ast.Store())], value=concat)
+        return f"{start}\n{ast.unparse(rewritten)}\n{unparse_statement(assignment)}"
+
+    # Chained indexing
+
+    def enter_AugAssign(self, node):
+        if self.enabled:
+            self._check_chained_assignment(node, node.target)
+
+    def _check_chained_assignment(self, node: ast.stmt, target: ast.AST):
+        """``df["a"][rows] = value`` or ``df[rows]["a"] = value`` (also via ``.loc``) on a known frame."""
+        if not (isinstance(target, ast.Subscript) and isinstance(target.value, ast.Subscript)):
+            return
+        inner = target.value
+        frame = inner.value
+        if isinstance(frame, ast.Attribute) and frame.attr == "loc":
+            frame = frame.value
+            rows, column = inner.slice, target.slice
+        elif _is_label(inner.slice):
+            column, rows = inner.slice, target.slice
+        elif _is_label(target.slice):
+            rows, column = inner.slice, target.slice
+        else:
+            return
+        if (dotted_name(frame) not in self._frames[-1] or isinstance(rows, ast.Tuple)
+                or isinstance(column, ast.Tuple)):
+            # e.g. stats[name]["count"] = n on a dict of dicts
+            return
+
+        loc = ast.Subscript(
+            value=ast.Attribute(value=frame, attr="loc", ctx=ast.Load()),
+            slice=ast.Tuple(elts=[rows, column], ctx=ast.Load()),
+            ctx=ast.Store(),
+        )
+        optimized = copy.copy(node)
+        if isinstance(node, ast.Assign):
+            optimized.targets = [loc]
+        else:
+            optimized.target = loc
+        self._report(
+            node, "pandas_chained_assignment",
+            "Chained indexing assignment writes to an intermediate object that may be a copy, so the "
+            "frame may not change (SettingWithCopyWarning) and the selection is made twice",
+            "Select rows and column in a single .loc assignment",
+            node, unparse_statement(optimized)
+        )
+
+
+def _is_label(node: ast.AST) -> bool:
+    """A column label or list of labels: a str constant, or a list of them."""
+    if isinstance(node, ast.List):
+        return bool(node.elts) and all(_is_label(element) for element in node.elts)
+    return isinstance(node, ast.Constant) and isinstance(node.value, str)
+
+
+def _uses_column(value: ast.expr, frame: ast.expr) -> bool:
+    """Whether a vectorized expression reads a column of ``frame`` (rather than being a scalar)."""
+    return any(isinstance(child, ast.Subscript) and child.value is frame for child in ast.walk(value))
+
+
+def _reads_besides_growth(loop: ast.AST, name: str, resolve) -> bool:
+    """Whether ``loop`` uses ``name`` other than in ``name = name.append(x)`` / ``pd.concat([name, x])``."""
+    growths = [child for child in ast.walk(loop)
+               if isinstance(child, ast.Assign) and _accumulated_frame(child, resolve) is not None
+               and child.targets[0].id == name]
+    allowed = set()
+    for growth in growths:
+        allowed.add(id(growth.targets[0]))
+        allowed.add(id(_growth_parts(growth.value)[0]))
+    return any(isinstance(child, ast.Name) and child.id == name and id(child) not in allowed
+               for child in ast.walk(loop))
@@ -0,0 +1,112 @@
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+
+@dataclass
+class PhaseStats:
+    """Accumulated cost of one phase or rule."""
+    seconds: float = 0.0
+    calls: int = 0
+    allocated: int = 0  # net bytes allocated, only tracked with trace_memory
+
+    def add(self, other: "PhaseStats"):
+        self.seconds += other.seconds
+        self.calls += other.calls
+        self.allocated += other.allocated
+
+
+class AnalysisStats:
+    """
+    Opt-in instrumentation of an analysis run.
+
+    Records wall time, call counts and (with ``trace_memory``) net allocation
+    deltas for each phase (read, parse, traverse, ...) and each rule, plus the
+    total time spent per file. Stats from worker processes are merged into
+    the parent's instance with merge().
+    """
+
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.phases: Dict[str, PhaseStats] = {}
+        self.rules: Dict[str, PhaseStats] = {}
+        self.files: Dict[str, float] = {}
+
+    def _memory(self) -> int:
+        return tracemalloc.get_traced_memory()[0] if self.trace_memory and tracemalloc.is_tracing() else 0
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[PhaseStats]:
+        """Time the enclosed block as one call of phase ``name``."""
+        stats = self.phases.setdefault(name, PhaseStats())
+        memory = self._memory()
+        start = time.perf_counter()
+        try:
+            yield stats
+        finally:
+            stats.seconds += time.perf_counter() - start
+            stats.calls += 1
+            stats.allocated += self._memory() - memory
+
+    def timed(self, rule_name: str, handler: Callable) -> Callable:
+        """Wrap a rule handler so each call is charged to ``rule_name``."""
+        stats = self.rules.setdefault(rule_name, PhaseStats())
+        perf_counter = time.perf_counter
+        memory = self._memory
+
+        def timed_handler(*args):
+            before = memory()
+            start = perf_counter()
+            try:
+                return handler(*args)
+            finally:
+                stats.seconds += perf_counter() - start
+                stats.calls += 1
+                stats.allocated += memory() - before
+
+        return timed_handler
+
+    def merge(self, other: "AnalysisStats"):
+        """Add the measurements of ``other`` to this instance."""
+        for name, stats in other.phases.items():
+            self.phases.setdefault(name, PhaseStats()).add(stats)
+        for name, stats in other.rules.items():
+            self.rules.setdefault(name, PhaseStats()).add(stats)
+        for filepath, seconds in other.files.items():
+            self.files[filepath] = self.files.get(filepath, 0.0) + seconds
+
+    def slowest_files(self, count: int = 10) -> List[Tuple[str, float]]:
+        return sorted(self.files.items(), key=lambda item: item[1], reverse=True)[:count]
+
+    def format_report(self, slowest: int = 10) -> str:
+        """Markdown summary suitable for appending to the analysis report."""
+        lines = ["## Performance Profile\n"]
+
+        for title, table in (("Phase", self.phases), ("Rule", self.rules)):
+            if not table:
+                continue
+            lines.append(f"| {title} | Time (s) | Calls | Allocated (KiB) |")
+            lines.append("|---|---:|---:|---:|")
+            for name, stats in sorted(table.items(), key=lambda item: item[1].seconds, reverse=True):
+                allocated = f"{stats.allocated / 1024:.1f}" if self.trace_memory else "-"
+                lines.append(f"| {name} | {stats.seconds:.4f} | {stats.calls} | {allocated} |")
+            lines.append("")
+
+        if self.files:
+            lines.append("**Slowest files:**\n")
+            for filepath, seconds in self.slowest_files(slowest):
+                lines.append(f"- {filepath}: {seconds:.4f}s")
+
+        return "\n".join(lines)
+
+
+@contextmanager
+def optional_phase(stats: Optional[AnalysisStats], name: str) -> Iterator[None]:
+    """Like AnalysisStats.phase(), but a no-op when profiling is off."""
+    if stats is None:
+        yield
+    else:
+        with stats.phase(name):
+            yield
@@ -0,0 +1,132 @@
+"""
+Splitting a scan across machines and merging the per-shard results.
+
+Every runner discovers the same files and computes the same partition: files
+are assigned largest first to the shard with the smallest total size, with
+ties broken by relative path and shard number, so the outcome depends only
+on the tree and not on the machine, checkout location or file timestamps.
+Each runner saves its results to a shard file; merge_shards() combines the
+files of all shards into the result set a single-node run would produce.
+"""
+import heapq
+import json
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from .models import CodeIssue, FileAnalysis
+
+SHARD_FORMAT_VERSION = 1
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """Parse an ``"i/n"`` shard specification (1-based) into ``(i, n)``."""
+    try:
+        index, count = (int(part) for part in spec.split("/"))
+    except ValueError:
+        raise ValueError(f"Invalid shard {spec!r}, expected INDEX/COUNT such as 1/4") from None
+    if not 1 <= index <= count:
+        raise ValueError(f"Invalid shard {spec!r}, INDEX must be between 1 and COUNT")
+    return index, count
+
+
+def partition(filepaths: Sequence[Path], root_path: Path, count: int) -> List[List[int]]:
+    """
+    Deterministically split files into ``count`` shards of similar total size.
+
+    Returns, for each shard, the positions in ``filepaths`` of its files in
+    ascending order, so every shard keeps the discovery order.
+    """
+    def size(filepath: Path) -> int:
+        try:
+            return filepath.stat().st_size
+        except OSError:
+            return 0
+
+    order = sorted(
+        range(len(filepaths)),
+        key=lambda position: (-size(filepaths[position]), filepaths[position].relative_to(root_path).as_posix()),
+    )
+    heap = [(0, shard) for shard in range(count)]
+    shards: List[List[int]] = [[] for _ in range(count)]
+    for position in order:
+        total, shard = heapq.heappop(heap)
+        shards[shard].append(position)
+        heapq.heappush(heap, (total + size(filepaths[position]), shard))
+
+    return [sorted(positions) for positions in shards]
+
+
+def write_shard(output_file: Union[str, Path], root_path: Path, shard: Tuple[int, int],
+                positions: Dict[str, int], results: Dict[str, FileAnalysis], config: str):
+    """Save the results of one shard, with paths relative to ``root_path``."""
+    from . import __version__
+
+    files = []
+    for filepath, analysis in results.items():
+        files.append({
+            "position": positions[filepath],
+            "filepath": Path(filepath).relative_to(root_path).as_posix(),
+            "error": analysis.error,
+            "issues": [issue.to_dict() for issue in analysis.issues],
+        })
+
+    document = {
+        "format": SHARD_FORMAT_VERSION,
+        "version": __version__,
+        "config": config,
+        "root": str(root_path),
+        "shard": list(shard),
+        "files": files,
+    }
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(document, f)
+
+
+def merge_shards(shard_files: Iterable[Union[str, Path]],
+                 root_path: Optional[Path] = None) -> Tuple[Path, Dict[str, FileAnalysis]]:
+    """
+    Combine the shard files of one sharded scan.
+
+    Checks that exactly one file per shard is present and that all shards
+    were produced by the same pyrefactor version and rule configuration.
+    Paths are rebuilt below ``root_path``; without it, all shards must
+    record the same root, which is used. Shards run in different checkouts
+    can be merged by passing ``root_path``. Returns the root and the results
+    in discovery order.
+    """
+    documents = []
+    for shard_file in shard_files:
+        with open(shard_file, 'r', encoding='utf-8') as f:
+            documents.append(json.load(f))
+    if not documents:
+        raise ValueError("No shard files to merge")
+
+    first = documents[0]
+    count = first["shard"][1]
+    for document in documents:
+        if document.get("format") != SHARD_FORMAT_VERSION:
+            raise ValueError(f"Unsupported shard file format: {document.get('format')!r}")
+        # Paths are stored relative to the root, so it only matters if none is given
+        for key in ("version", "config") + (("root",) if root_path is None else ()):
+            if document[key] != first[key]:
+                raise ValueError(f"Shards disagree on {key}: {first[key]!r} != {document[key]!r}")
+        if document["shard"][1] != count:
+            raise ValueError(f"Shards disagree on the shard count: {count} != {document['shard'][1]}")
+
+    indexes = sorted(document["shard"][0] for document in documents)
+    if indexes != list(range(1, count + 1)):
+        raise ValueError(f"Expected shards 1..{count} exactly once, got {indexes}")
+
+    root = Path(root_path) if root_path is not None else Path(first["root"])
+    entries = sorted((entry for document in documents for entry in document["files"]),
+                     key=lambda entry: entry["position"])
+
+    results = {}
+    for entry in entries:
+        filepath = root / entry["filepath"]
+        results[str(filepath)] = FileAnalysis(
+            filepath=filepath,
+            issues=[CodeIssue(**issue) for issue in entry["issues"]],
+            error=entry["error"],
+        )
+    return root, results
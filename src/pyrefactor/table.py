@@ -0,0 +1,226 @@
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+from .models import CodeIssue, FileAnalysis, SourceSpan, SourceText
+
+_NONE = -1
+
+
+class _StringTable:
+    """Interns strings into small integer codes."""
+
+    __slots__ = ("codes", "values")
+
+    def __init__(self):
+        self.codes: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def code(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def __getitem__(self, code: int) -> str:
+        return self.values[code]
+
+
+class _Columns:
+    """Shared column storage behind one or more IssueTable views."""
+
+    def __init__(self):
+        self.filepaths = _StringTable()
+        self.issue_types = _StringTable()
+        self.texts = _StringTable()
+        self.errors: Dict[int, str] = {}
+        self.sources: Dict[int, SourceText] = {}
+
+        self.file = array("l")
+        self.line = array("l")
+        self.issue_type = array("l")
+        self.description = array("l")
+        self.suggestion = array("l")
+        self.optimized = array("l")
+        # original_code is either an interned text or a span into the file's source
+        self.original = array("l")
+        self.span = array("l")  # start_line, start_col, end_line, end_col per row
+
+    def __len__(self) -> int:
+        return len(self.line)
+
+
+class IssueTable:
+    """
+    Compact, column-oriented collection of issues from many files.
+
+    Line numbers and span coordinates live in typed arrays, while file paths,
+    issue types, descriptions and suggestions are interned into string
+    tables, so a row costs a handful of machine integers instead of a full
+    CodeIssue object. Filtering, sorting and grouping return views that share
+    the columns and only hold an array of row numbers; CodeIssue objects are
+    created on demand when rows are read.
+    """
+
+    SORT_COLUMNS = ("filepath", "line_number", "issue_type")
+
+    def __init__(self, _columns: Optional[_Columns] = None, _rows: Optional[array] = None):
+        self._columns = _columns if _columns is not None else _Columns()
+        self._rows = _rows
+
+    @classmethod
+    def from_results(cls, results: Union[Dict[str, FileAnalysis], Iterable[FileAnalysis]]) -> "IssueTable":
+        """Build a table from analyze_project() results or a stream of FileAnalysis."""
+        table = cls()
+        for analysis in (results.values() if isinstance(results, dict) else results):
+            table.add(analysis)
+        return table
+
+    def add(self, analysis: FileAnalysis):
+        """Append all issues of one analyzed file."""
+        if self._rows is not None:
+            raise ValueError("Cannot add rows to a filtered or sorted view")
+
+        columns = self._columns
+        file_code = columns.filepaths.code(str(analysis.filepath))
+        if analysis.error:
+            columns.errors[file_code] = analysis.error
+
+        for issue in analysis.issues:
+            columns.file.append(file_code)
+            columns.line.append(issue.line_number)
+            columns.issue_type.append(columns.issue_types.code(issue.issue_type))
+            columns.description.append(columns.texts.code(issue.description))
+            columns.suggestion.append(columns.texts.code(issue.suggestion))
+            columns.optimized.append(
+                _NONE if issue.optimized_code is None else columns.texts.code(issue.optimized_code)
+            )
+
+            span = issue.span
+            if span is not None:
+                columns.sources.setdefault(file_code, span.source)
+                columns.original.append(_NONE)
+                columns.span.extend((span.start_line, span.start_col, span.end_line, span.end_col))
+            else:
+                columns.original.append(columns.texts.code(issue.original_code))
+                columns.span.extend((0, 0, 0, 0))
+
+    def _row_ids(self) -> Union[range, array]:
+        return range(len(self._columns)) if self._rows is None else self._rows
+
+    def _view(self, rows: Iterable[int]) -> "IssueTable":
+        return IssueTable(self._columns, array("l", rows))
+
+    def __len__(self) -> int:
+        return len(self._columns) if self._rows is None else len(self._rows)
+
+    def __iter__(self) -> Iterator[CodeIssue]:
+        for row in self._row_ids():
+            yield self._make_issue(row)
+
+    def __getitem__(self, index: int) -> CodeIssue:
+        return self._make_issue(self._row_ids()[index])
+
+    def _make_issue(self, row: int) -> CodeIssue:
+        columns = self._columns
+        if columns.original[row] == _NONE:
+            start_line, start_col, end_line, end_col = columns.span[row * 4:row * 4 + 4]
+            original = SourceSpan(columns.sources[columns.file[row]], start_line, start_col, end_line, end_col)
+        else:
+            original = columns.texts[columns.original[row]]
+        optimized = columns.optimized[row]
+
+        return CodeIssue(
+            line_number=columns.line[row],
+            issue_type=columns.issue_types[columns.issue_type[row]],
+            description=columns.texts[columns.description[row]],
+            suggestion=columns.texts[columns.suggestion[row]],
+            original_code=original,
+            optimized_code=None if optimized == _NONE else columns.texts[optimized],
+        )
+
+    @property
+    def filepaths(self) -> List[str]:
+        """Every file added to the table, including files without issues."""
+        return list(self._columns.filepaths.values)
+
+    def filepath(self, index: int) -> str:
+        """File path of the ``index``-th row of this view."""
+        return self._columns.filepaths[self._columns.file[self._row_ids()[index]]]
+
+    def error(self, filepath: Union[str, Path]) -> Optional[str]:
+        """Analysis error recorded for ``filepath``, if any."""
+        code = self._columns.filepaths.codes.get(str(filepath))
+        return self._columns.errors.get(code)
+
+    def line_numbers(self) -> array:
+        """Line numbers of the rows in this view."""
+        line = self._columns.line
+        return array("l", (line[row] for row in self._row_ids()))
+
+    def filter(self, issue_type: Optional[str] = None, filepath: Union[str, Path, None] = None,
+               min_line: Optional[int] = None, max_line: Optional[int] = None) -> "IssueTable":
+        """Rows matching all of the given criteria."""
+        columns = self._columns
+        type_code = columns.issue_types.codes.get(issue_type, _NONE - 1) if issue_type is not None else None
+        file_code = columns.filepaths.codes.get(str(filepath), _NONE - 1) if filepath is not None else None
+
+        return self._view(
+            row for row in self._row_ids()
+            if (type_code is None or columns.issue_type[row] == type_code)
+            and (file_code is None or columns.file[row] == file_code)
+            and (min_line is None or columns.line[row] >= min_line)
+            and (max_line is None or columns.line[row] <= max_line)
+        )
+
+    def _sort_key(self, column: str):
+        columns = self._columns
+        if column == "line_number":
+            return columns.line.__getitem__
+        if column == "filepath":
+            rank = self._ranks(columns.filepaths.values)
+            return lambda row: rank[columns.file[row]]
+        if column == "issue_type":
+            rank = self._ranks(columns.issue_types.values)
+            return lambda row: rank[columns.issue_type[row]]
+        raise ValueError(f"Cannot sort by {column!r}; expected one of {self.SORT_COLUMNS}")
+
+    @staticmethod
+    def _ranks(values: List[str]) -> array:
+        ranks = array("l", [0]) * len(values)
+        for rank, code in enumerate(sorted(range(len(values)), key=values.__getitem__)):
+            ranks[code] = rank
+        return ranks
+
+    def sort(self, *by: str, reverse: bool = False) -> "IssueTable":
+        """Rows ordered by the given columns (default: file path, then line)."""
+        keys = [self._sort_key(column) for column in (by or ("filepath", "line_number"))]
+        if len(keys) == 1:
+            key = keys[0]
+        else:
+            key = lambda row: tuple(column_key(row) for column_key in keys)  # noqa: E731
+        return self._view(sorted(self._row_ids(), key=key, reverse=reverse))
+
+    def group_by(self, column: str = "filepath") -> Dict[str, "IssueTable"]:
+        """Split the rows into views keyed by file path or issue type."""
+        columns = self._columns
+        if column == "filepath":
+            codes, strings = columns.file, columns.filepaths
+        elif column == "issue_type":
+            codes, strings = columns.issue_type, columns.issue_types
+        else:
+            raise ValueError(f"Cannot group by {column!r}; expected 'filepath' or 'issue_type'")
+
+        groups: Dict[int, array] = {}
+        for row in self._row_ids():
+            code = codes[row]
+            group = groups.get(code)
+            if group is None:
+                group = groups[code] = array("l")
+            group.append(row)
+        return {strings[code]: IssueTable(columns, rows) for code, rows in groups.items()}
+
+    def count_by(self, column: str = "issue_type") -> Dict[str, int]:
+        """Number of rows per file path or issue type."""
+        return {key: len(view) for key, view in self.group_by(column).items()}
@@ -0,0 +1,176 @@
+"""
+Whole-array rewriting of element-wise expressions.
+
+Shared by the NumPy and pandas rules: a Vectorizer turns an expression over
+one element (``a[i] * b[i] + c``) into the same expression over whole arrays
+(``a * b + c``), or gives up with None when that would change its meaning.
+"""
+import ast
+from typing import Optional, Sequence, Set
+
+from .dataflow import dotted_name
+
+# Scalar functions with a NumPy ufunc of the same meaning
+_UFUNCS = {
+    "abs": "abs",
+    "math.sqrt": "sqrt", "math.exp": "exp", "math.log": "log", "math.log10": "log10",
+    "math.sin": "sin", "math.cos": "cos", "math.tan": "tan", "math.fabs": "fabs",
+    "math.floor": "floor", "math.ceil": "ceil",
+    "min": "minimum", "max": "maximum",
+}
+
+# NumPy ufuncs, which apply element by element. Other numpy functions (sum,
+# mean, linalg.norm, ...) reduce or reshape their argument and are not
+# accepted inside a vectorized expression.
+_NUMPY_UFUNCS = frozenset({
+    "abs", "absolute", "fabs", "negative", "positive", "sign", "sqrt", "cbrt", "square", "reciprocal",
+    "exp", "exp2", "expm1", "log", "log2", "log10", "log1p",
+    "sin", "cos", "tan", "arcsin", "arccos", "arctan", "arctan2", "hypot",
+    "sinh", "cosh", "tanh", "arcsinh", "arccosh", "arctanh", "deg2rad", "rad2deg", "degrees", "radians",
+    "floor", "ceil", "trunc", "rint",
+    "add", "subtract", "multiply", "divide", "true_divide", "floor_divide", "power", "mod", "remainder",
+    "minimum", "maximum", "fmin", "fmax", "isnan", "isinf", "isfinite",
+})
+
+_ARITHMETIC = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow)
+_COMPARISONS = (ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.Eq, ast.NotEq)
+
+
+def uses_names(node: ast.AST, names: Set[str]) -> bool:
+    """Whether any of ``names`` is read or bound anywhere below ``node``."""
+    return any(isinstance(child, ast.Name) and child.id in names for child in ast.walk(node))
+
+
+class Vectorizer:
+    """
+    Turns per-element expressions over loop indices into whole-array expressions.
+
+    ``indices`` are the loop variables, innermost last; ``np_name`` is the
+    numpy alias used in the generated calls. Subclasses can map other
+    element accesses (e.g. DataFrame row fields) by overriding indexed()
+    and value().
+    """
+
+    def __init__(self, indices: Sequence[str], np_name: str, imports):
+        self.indices = list(indices)
+        self.np_name = np_name
+        self.imports = imports
+        # Root names of the arrays indexed by the loop indices
+        self.arrays: Set[str] = set()
+
+    def _np(self, attr: str) -> ast.expr:
+        return ast.Attribute(value=ast.Name(id=self.np_name, ctx=ast.Load()), attr=attr, ctx=ast.Load())
+
+    def call(self, attr: str, *args: ast.expr) -> ast.expr:
+        return ast.Call(func=self._np(attr), args=list(args), keywords=[])
+
+    def indexed(self, node: ast.AST) -> Optional[ast.expr]:
+        """
+        The array behind ``a[i][j]`` / ``a[i, j]`` indexed by the trailing loop indices.
+
+        Outer indices that are not vectorized stay, e.g. ``a[i][j]`` over
+        ``j`` gives ``a[i]``. Returns None for anything else.
+        """
+        indices = []
+        base = node
+        while isinstance(base, ast.Subscript) and len(indices) < len(self.indices):
+            index = base.slice
+            if isinstance(index, ast.Tuple):
+                indices[:0] = index.elts
+            else:
+                indices.insert(0, index)
+            base = base.value
+        if len(indices) < len(self.indices):
+            return None
+        leading, trailing = indices[:-len(self.indices)], indices[-len(self.indices):]
+        if [getattr(index, "id", None) for index in trailing] != self.indices:
+            return None
+        if leading:
+            # a[i, j] over j only: keep the leading part of the tuple
+            if not isinstance(node.slice, ast.Tuple) or len(node.slice.elts) != len(indices):
+                return None
+            base = ast.Subscript(
+                value=base,
+                slice=ast.Tuple(elts=leading + [ast.Slice()] * len(trailing), ctx=ast.Load()),
+                ctx=ast.Load(),
+            )
+        if uses_names(base, set(self.indices)):
+            return None
+        root = base
+        while isinstance(root, (ast.Subscript, ast.Attribute)):
+            root = root.value
+        if isinstance(root, ast.Name):
+            self.arrays.add(root.id)
+        return base
+
+    def value(self, node: ast.AST) -> Optional[ast.expr]:
+        """Whole-array form of an element-wise value expression, or None."""
+        if isinstance(node, ast.Constant):
+            return node
+        if isinstance(node, (ast.Name, ast.Attribute)):
+            return None if uses_names(node, set(self.indices)) else node
+        if isinstance(node, ast.Subscript):
+            return self.indexed(node)
+        if isinstance(node, ast.BinOp) and isinstance(node.op, _ARITHMETIC):
+            left, right = self.value(node.left), self.value(node.right)
+            if left is None or right is None:
+                return None
+            return ast.BinOp(left=left, op=node.op, right=right)
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+            operand = self.value(node.operand)
+            return None if operand is None else ast.UnaryOp(op=node.op, operand=operand)
+        if isinstance(node, ast.IfExp):
+            parts = [self.condition(node.test), self.value(node.body), self.value(node.orelse)]
+            return None if None in parts else self.call("where", *parts)
+        if isinstance(node, ast.Call) and not node.keywords:
+            return self._call(node)
+        return None
+
+    def _call(self, node: ast.Call) -> Optional[ast.expr]:
+        func = dotted_name(node.func)
+        if func is None:
+            return None
+        root, _, rest = func.partition(".")
+        resolved = self.imports.get(root, root) + ("." + rest if rest else "")
+        args = [self.value(arg) for arg in node.args]
+        if None in args:
+            return None
+        if resolved.startswith("numpy."):
+            if resolved[len("numpy."):] not in _NUMPY_UFUNCS:
+                return None
+            return ast.Call(func=node.func, args=args, keywords=[])
+        ufunc = _UFUNCS.get(resolved)
+        if ufunc is None or (ufunc in ("minimum", "maximum") and len(args) != 2):
+            return None
+        return self.call(ufunc, *args)
+
+    def condition(self, node: ast.AST) -> Optional[ast.expr]:
+        """Whole-array boolean mask for an element-wise condition, or None."""
+        if isinstance(node, ast.Compare) and all(isinstance(op, _COMPARISONS) for op in node.ops):
+            operands = [self.value(operand) for operand in [node.left] + node.comparators]
+            if None in operands:
+                return None
+            masks = [ast.Compare(left=left, ops=[op], comparators=[right])
+                     for left, op, right in zip(operands, node.ops, operands[1:])]
+            mask = masks[0]
+            for other in masks[1:]:
+                mask = ast.BinOp(left=mask, op=ast.BitAnd(), right=other)
+            return mask
+        if isinstance(node, ast.BoolOp):
+            masks = [self.condition(value) for value in node.values]
+            if None in masks:
+                return None
+            op = ast.BitAnd() if isinstance(node.op, ast.And) else ast.BitOr()
+            mask = masks[0]
+            for other in masks[1:]:
+                mask = ast.BinOp(left=mask, op=op, right=other)
+            return mask
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            mask = self.condition(node.operand)
+            return None if mask is None else ast.UnaryOp(op=ast.Invert(), operand=mask)
+        return None
+
+
+def unparse_statement(statement: ast.stmt) -> str:
+    """Source of a statement built from new nodes (which have no positions yet)."""
+    return ast.unparse(ast.fix_missing_locations(statement))
@@ -1,73 +1,103 @@
 import ast
+import builtins
+import copy
+import textwrap
+from typing import List, Optional, Tuple
 
-from .models import CodeIssue
+from .dataflow import (
+    MUTATING_METHODS, PARAMETER, LocalKinds, annotation_kind, depends_on, dotted_name, module_imports,
+    mutated_names, mutated_paths, rebound_paths, value_kind,
+)
+from .engine import Rule
+from .models import CodeIssue, FunctionKey
 
 
-class ComplexityVisitor(ast.NodeVisitor):
-    """AST visitor to calculate cyclomatic complexity."""
+class ComplexityVisitor(Rule):
+    """
+    Rule to calculate cyclomatic complexity.
 
-    def __init__(self):
+    ``complexities`` maps a FunctionKey (name, qualname and line range) to
+    the complexity of each function, so it stays valid after the tree is freed.
+    """
+
+    scope = "definition"
+
+    def __init__(self, threshold: int = 10):
+        super().__init__()
+        self.threshold = threshold  # McCabe complexity threshold
         self.complexities = {}
         self.current_complexity = 0
+        self._outer_complexities = []
+        self._qualname_parts = []
 
-    def visit_FunctionDef(self, node):
-        previous_complexity = self.current_complexity
-        self.current_complexity = 1  # Base complexity
+    def config(self):
+        return {"threshold": self.threshold}
 
-        # Visit all children
-        self.generic_visit(node)
+    def enter_ClassDef(self, node):
+        self._qualname_parts.append(node.name)
+
+    def leave_ClassDef(self, node):
+        self._qualname_parts.pop()
 
-        self.complexities[node] = self.current_complexity
-        self.current_complexity = previous_complexity
+    def enter_FunctionDef(self, node):
+        self._outer_complexities.append(self.current_complexity)
+        self.current_complexity = 1  # Base complexity
+        self._qualname_parts.extend((node.name, "<locals>"))
 
-    def visit_If(self, node):
+    def leave_FunctionDef(self, node):
+        del self._qualname_parts[-2:]
+        key = FunctionKey(node.name, ".".join(self._qualname_parts + [node.name]), node.lineno, node.end_lineno)
+        self.complexities[key] = self.current_complexity
+        if self.current_complexity > self.threshold:
+            self.issues.append(CodeIssue(
+                line_number=node.lineno,
+                issue_type="high_complexity",
+                description=f"Function '{node.name}' has high cyclomatic complexity ({self.current_complexity})",
+                suggestion="Consider breaking down this function into smaller, more focused functions",
+                original_code=self.node_source(node)
+            ))
+        self.current_complexity = self._outer_complexities.pop()
+
+    def enter_If(self, node):
         # Count the initial 'if'
         self.current_complexity += 1
-        
+
         # Count elif branches
         current = node
-        while (isinstance(current.orelse, list) and 
-            len(current.orelse) == 1 and 
+        while (isinstance(current.orelse, list) and
+            len(current.orelse) == 1 and
             isinstance(current.orelse[0], ast.If)):
             # Each elif branch adds to complexity
             self.current_complexity += 1
             current = current.orelse[0]
-        
+
         # Count the final else branch if it exists (non-empty orelse)
         if current.orelse and not (len(current.orelse) == 1 and isinstance(current.orelse[0], ast.If)):
             self.current_complexity += 1
-        
-        # Visit all child nodes to handle nested conditions
-        self.generic_visit(node)
 
-    def visit_While(self, node):
+    def enter_While(self, node):
         self.current_complexity += 1
-        self.generic_visit(node)
 
-    def visit_For(self, node):
+    def enter_For(self, node):
         self.current_complexity += 1
-        self.generic_visit(node)
 
-    def visit_Return(self, node):
-        self.generic_visit(node)
-
-    def visit_Break(self, node):
+    def enter_Break(self, node):
         self.current_complexity += 1
-        self.generic_visit(node)
 
-    def visit_Continue(self, node):
+    def enter_Continue(self, node):
         self.current_complexity += 1
-        self.generic_visit(node)
 
 
-class CodeSmellVisitor(ast.NodeVisitor):
-    """AST visitor to detect code smells."""
+class CodeSmellVisitor(Rule):
+    """Rule to detect code smells."""
+
+    scope = "definition"
 
     def __init__(self):
-        self.issues = []
+        super().__init__()
         self.loop_depth = 0
 
-    def visit_For(self, node):
+    def enter_For(self, node):
         self.loop_depth += 1
         if self.loop_depth > 2:
             self.issues.append(CodeIssue(
@@ -75,19 +105,42 @@ class CodeSmellVisitor(ast.NodeVisitor):
                 issue_type="nested_loops",
                 description="Deeply nested loops detected",
                 suggestion="Consider restructuring the code to reduce nesting depth",
-                original_code=ast.unparse(node)
+                original_code=self.node_source(node)
             ))
-        self.generic_visit(node)
+
+    def leave_For(self, node):
         self.loop_depth -= 1
 
 
-class OptimizationVisitor(ast.NodeVisitor):
-    """AST visitor to identify optimization opportunities."""
+class OptimizationVisitor(Rule):
+    """Rule to identify optimization opportunities."""
+
+    scope = "definition"
 
     def __init__(self):
-        self.issues = []
+        super().__init__()
+        self.locals = LocalKinds()
+        # Enclosing loops of the current function (or class/module body)
+        self._loops = [[]]
+        self._reported = set()
+
+    def _enter_function(self, node):
+        self.locals.enter_function(node)
+        self._loops.append([])
 
-    def visit_For(self, node):
+    def _leave_scope(self, node):
+        self.locals.leave()
+        self._loops.pop()
+
+    enter_FunctionDef = enter_AsyncFunctionDef = enter_Lambda = _enter_function
+    leave_FunctionDef = leave_AsyncFunctionDef = leave_Lambda = leave_ClassDef = _leave_scope
+
+    def enter_ClassDef(self, node):
+        self.locals.enter_class()
+        self._loops.append([])
+
+    def enter_For(self, node):
+        self._enter_loop(node)
         # Check for list comprehension opportunities
         if isinstance(node.body, list) and len(node.body) == 1:
             if (isinstance(node.body[0], ast.Expr) and
@@ -99,10 +152,59 @@ class OptimizationVisitor(ast.NodeVisitor):
                     issue_type="list_comprehension",
                     description="Loop could be replaced with list comprehension",
                     suggestion="Use a list comprehension for better readability and performance",
-                    original_code=ast.unparse(node),
+                    original_code=self.node_source(node),
                     optimized_code=self._generate_list_comprehension(node)
                 ))
-        self.generic_visit(node)
+
+    def _enter_loop(self, node):
+        if isinstance(node, (ast.For, ast.AsyncFor)):
+            self.locals.bind(node.target, None)
+        self._loops[-1].append(node)
+
+    def _leave_loop(self, node):
+        self._loops[-1].pop()
+
+    enter_AsyncFor = enter_While = _enter_loop
+    leave_For = leave_AsyncFor = leave_While = _leave_loop
+
+    def enter_Assign(self, node):
+        target = node.targets[0]
+        if (len(node.targets) == 1 and isinstance(target, ast.Name)
+                and isinstance(node.value, ast.BinOp) and isinstance(node.value.op, ast.Add)
+                and isinstance(node.value.left, ast.Name) and node.value.left.id == target.id):
+            # s = s + piece
+            self._check_string_concatenation(node, target.id)
+        for target in node.targets:
+            self.locals.bind(target, node.value)
+
+    def enter_AnnAssign(self, node):
+        self.locals.bind(node.target, node.value)
+
+    def enter_AugAssign(self, node):
+        if isinstance(node.op, ast.Add) and isinstance(node.target, ast.Name):
+            self._check_string_concatenation(node, node.target.id)
+
+    def _check_string_concatenation(self, node: ast.stmt, name: str):
+        """Report ``name += piece`` on a str local inside a loop."""
+        loops = self._loops[-1]
+        if not loops or self.locals.kind(name) != "str":
+            return
+
+        # Rewrite the outermost loop in which the string is only accumulated.
+        target = next((loop for loop in loops if not _reads_besides_accumulation(loop, name)), None)
+        if target is None or (id(target), name) in self._reported:
+            return
+        self._reported.add((id(target), name))
+
+        self.issues.append(CodeIssue(
+            line_number=node.lineno,
+            issue_type="string_concatenation",
+            description=(f"String '{name}' is built with += inside a loop, which copies it on every "
+                         f"iteration: O(n²) in the final length"),
+            suggestion="Collect the pieces in a list and ''.join() them once after the loop",
+            original_code=self.node_source(target),
+            optimized_code=self._generate_string_join(target, name)
+        ))
 
     def _generate_list_comprehension(self, node: ast.For) -> str:
         """Generate a list comprehension from a for loop."""
@@ -111,13 +213,1001 @@ class OptimizationVisitor(ast.NodeVisitor):
         body_expr = ast.unparse(node.body[0].value)
         return f"[{body_expr} for {target} in {iter_expr}]"
 
+    def _generate_string_join(self, loop: ast.AST, name: str) -> str:
+        """Generate the loop with ``name`` accumulated in a list and joined afterwards."""
+        parts = f"{name}_parts"
+        rewritten = _AppendInsteadOfConcat(name, parts).visit(copy.deepcopy(loop))
+        return f"{parts} = [{name}]\n{ast.unparse(rewritten)}\n{name} = ''.join({parts})"
+
+
+def _is_accumulation(node: ast.AST, name: str) -> bool:
+    """Whether ``node`` is ``name += piece`` or ``name = name + piece``."""
+    if isinstance(node, ast.AugAssign):
+        return isinstance(node.op, ast.Add) and isinstance(node.target, ast.Name) and node.target.id == name
+    return (isinstance(node, ast.Assign) and len(node.targets) == 1
+            and isinstance(node.targets[0], ast.Name) and node.targets[0].id == name
+            and isinstance(node.value, ast.BinOp) and isinstance(node.value.op, ast.Add)
+            and isinstance(node.value.left, ast.Name) and node.value.left.id == name)
+
+
+def _reads_besides_accumulation(loop: ast.AST, name: str) -> bool:
+    """Whether ``loop`` uses or rebinds ``name`` other than by accumulating into it."""
+    accumulations = [node for node in ast.walk(loop) if _is_accumulation(node, name)]
+    allowed = {id(node.target if isinstance(node, ast.AugAssign) else node.targets[0]) for node in accumulations}
+    allowed.update(id(node.value.left) for node in accumulations if isinstance(node, ast.Assign))
+    return any(
+        isinstance(node, ast.Name) and node.id == name and id(node) not in allowed
+        for node in ast.walk(loop)
+    )
+
+
+class _AppendInsteadOfConcat(ast.NodeTransformer):
+    """Turn ``name += piece`` / ``name = name + piece`` into ``parts.append(piece)``."""
+
+    def __init__(self, name: str, parts: str):
+        self.name = name
+        self.parts = parts
+
+    def _append(self, node: ast.stmt, piece: ast.expr) -> ast.stmt:
+        call = ast.Call(
+            func=ast.Attribute(value=ast.Name(id=self.parts, ctx=ast.Load()), attr="append", ctx=ast.Load()),
+            args=[piece],
+            keywords=[],
+        )
+        return ast.copy_location(ast.Expr(value=call), node)
+
+    def visit_AugAssign(self, node):
+        if _is_accumulation(node, self.name):
+            return self._append(node, node.value)
+        return node
+
+    def visit_Assign(self, node):
+        if _is_accumulation(node, self.name):
+            return self._append(node, node.value.right)
+        return node
+
+
+def _iterations(depth: int) -> str:
+    """Big-O iteration count of ``depth`` nested loops, e.g. n² for 2."""
+    return {1: "n", 2: "n²", 3: "n³"}.get(depth, f"n^{depth}")
+
+
+class _ReplaceMembership(ast.NodeTransformer):
+    """Point ``x in name`` / ``x not in name`` tests at another name."""
+
+    def __init__(self, name: str, replacement: str):
+        self.name = name
+        self.replacement = replacement
+
+    def visit_Compare(self, node):
+        self.generic_visit(node)
+        node.comparators = [
+            ast.Name(id=self.replacement, ctx=ast.Load())
+            if isinstance(op, (ast.In, ast.NotIn)) and isinstance(comparator, ast.Name) and comparator.id == self.name
+            else comparator
+            for op, comparator in zip(node.ops, node.comparators)
+        ]
+        return node
+
+
+class MembershipTestVisitor(Rule):
+    """
+    Rule to find ``in`` tests against lists or tuples inside loops.
+
+    Each such test scans the whole sequence, once per iteration. Reported
+    haystacks are constant list/tuple literals of at least
+    ``min_literal_size`` elements, and locals that were last bound to a list
+    or tuple, or are parameters not annotated as a set or mapping, provided
+    the loop does not rebind or mutate them.
+    """
+
+    scope = "definition"
+
+    def __init__(self, min_literal_size: int = 4):
+        super().__init__()
+        self.min_literal_size = min_literal_size
+        self.locals = LocalKinds()
+        # Per function (or class/module body): enclosing loops
+        self._loops = [[]]
+        # id(loop) -> names it rebinds or mutates, for open loops with a membership test
+        self._mutated = {}
+        self._reported = set()
+
+    def config(self):
+        return {"min_literal_size": self.min_literal_size}
+
+    def _enter_function(self, node):
+        self.locals.enter_function(node)
+        self._loops.append([])
+
+    def _leave_scope(self, node):
+        self.locals.leave()
+        self._loops.pop()
+
+    enter_FunctionDef = enter_AsyncFunctionDef = enter_Lambda = _enter_function
+    leave_FunctionDef = leave_AsyncFunctionDef = leave_Lambda = leave_ClassDef = _leave_scope
+
+    def enter_ClassDef(self, node):
+        self.locals.enter_class()
+        self._loops.append([])
+
+    def enter_Assign(self, node):
+        for target in node.targets:
+            self.locals.bind(target, node.value)
+
+    def enter_AnnAssign(self, node):
+        self.locals.bind(node.target, node.value)
+
+    def enter_NamedExpr(self, node):
+        self.locals.bind(node.target, node.value)
+
+    def _enter_loop(self, node):
+        if isinstance(node, (ast.For, ast.AsyncFor)):
+            self.locals.bind(node.target, None)
+        self._loops[-1].append(node)
+
+    def _leave_loop(self, node):
+        self._loops[-1].pop()
+        self._mutated.pop(id(node), None)
+
+    enter_For = enter_AsyncFor = enter_While = _enter_loop
+    enter_ListComp = enter_SetComp = enter_DictComp = enter_GeneratorExp = _enter_loop
+    leave_For = leave_AsyncFor = leave_While = _leave_loop
+    leave_ListComp = leave_SetComp = leave_DictComp = leave_GeneratorExp = _leave_loop
+
+    def enter_Compare(self, node):
+        loops = self._loops[-1]
+        if not loops:
+            return
+        for op, haystack in zip(node.ops, node.comparators):
+            if not isinstance(op, (ast.In, ast.NotIn)):
+                continue
+            if isinstance(haystack, (ast.List, ast.Tuple)):
+                self._check_literal(node, haystack, len(loops))
+            elif isinstance(haystack, ast.Name):
+                self._check_name(node, haystack.id, loops)
+
+    def _check_literal(self, node: ast.Compare, haystack: ast.AST, depth: int):
+        elements = haystack.elts
+        if len(elements) < self.min_literal_size or not all(isinstance(e, ast.Constant) for e in elements):
+            return
+        optimized = copy.copy(node)
+        optimized.comparators = [
+            ast.Set(elts=comparator.elts) if comparator is haystack else comparator
+            for comparator in node.comparators
+        ]
+        kind = "list" if isinstance(haystack, ast.List) else "tuple"
+        self.issues.append(CodeIssue(
+            line_number=node.lineno,
+            issue_type="membership_test_in_loop",
+            description=(f"Membership test against a {kind} literal of {len(elements)} elements inside a loop "
+                         f"scans it on every iteration: O({_iterations(depth)}·m) for m elements"),
+            suggestion="Use a set literal, which Python stores as a constant frozenset with O(1) lookups",
+            original_code=self.node_source(node),
+            optimized_code=ast.unparse(optimized)
+        ))
+
+    def _check_name(self, node: ast.Compare, name: str, loops):
+        kind = self.locals.kind(name)
+        if kind not in ("list", "tuple", PARAMETER):
+            return
+
+        # Hoist above the outermost enclosing loop that leaves the name alone.
+        target = None
+        for loop in reversed(loops):
+            if name in self._mutated_names(loop):
+                break
+            target = loop
+        if target is None or (id(target), name) in self._reported:
+            return
+        self._reported.add((id(target), name))
+
+        depth = len(loops) - loops.index(target)
+        what = f"parameter '{name}'" if kind == PARAMETER else f"{kind} '{name}'"
+        suggestion = "Convert it to a set once, before the loop, for O(1) average lookups"
+        if kind == PARAMETER:
+            suggestion += " (if it is a list or tuple of hashable elements)"
+        self.issues.append(CodeIssue(
+            line_number=node.lineno,
+            issue_type="membership_test_in_loop",
+            description=(f"Membership test against {what} inside a loop scans it on every iteration: "
+                         f"O({_iterations(depth)}·m) for m elements instead of O({_iterations(depth)})"),
+            suggestion=suggestion,
+            original_code=self.node_source(target),
+            optimized_code=self._generate_hoisted_set(target, name)
+        ))
+
+    def _mutated_names(self, loop: ast.AST):
+        """Names ``loop`` rebinds or mutates; walking it is deferred until a test needs them."""
+        names = self._mutated.get(id(loop))
+        if names is None:
+            names = self._mutated[id(loop)] = mutated_names(loop)
+        return names
+
+    @staticmethod
+    def _generate_hoisted_set(loop: ast.AST, name: str) -> str:
+        """Build a set of ``name`` before ``loop`` and test membership against it."""
+        alias = f"{name}_set"
+        rewritten = _ReplaceMembership(name, alias).visit(copy.deepcopy(loop))
+        return f"{alias} = set({name})\n{ast.unparse(rewritten)}"
+
+
+class _ReplaceExpression(ast.NodeTransformer):
+    """Replace every occurrence of an expression with a name."""
+
+    def __init__(self, expression: ast.expr, replacement: str):
+        self.dump = ast.dump(expression)
+        self.replacement = replacement
+
+    def visit(self, node):
+        if isinstance(node, ast.expr) and ast.dump(node) == self.dump:
+            return ast.copy_location(ast.Name(id=self.replacement, ctx=ast.Load()), node)
+        return super().visit(node)
+
+
+class _OpenLoop:
+    """
+    A loop LoopInvariantVisitor is inside of, with the paths it rebinds and mutates.
+
+    Both walk the whole loop, so they are only computed once an expression
+    that might be hoisted out of it is found; otherwise every level of a
+    deep nest of loops would walk all the levels inside it.
+    """
+
+    def __init__(self, node: ast.AST):
+        self.node = node
+        self._rebound = None
+        self._mutated = None
+        # Whether a break, continue, return or raise was seen in its body so
+        # far; the rest of the body may then be skipped
+        self.jumped = False
+
+    @property
+    def rebound(self):
+        if self._rebound is None:
+            self._rebound = rebound_paths(self.node)
+        return self._rebound
+
+    @property
+    def mutated(self):
+        if self._mutated is None:
+            self._mutated = mutated_paths(self.node)
+        return self._mutated
+
+
+class LoopInvariantVisitor(Rule):
+    """
+    Rule to find work repeated on every iteration of a loop for the same result.
+
+    Reported inside functions: ``len(x)``, lookups of attribute chains such
+    as ``self.items.append`` or of attributes of imported modules such as
+    ``math.sqrt``, and calls in ``CONSTANT_CALLS`` with constant arguments,
+    provided the loop does not rebind (or, for ``len()``, mutate) anything
+    they depend on. Calls made in the loop are assumed to leave them alone.
+    Only expressions evaluated on every iteration are hoisted: not those
+    under an ``if``, a conditional expression, a later operand of ``and`` /
+    ``or``, a comprehension, a ``match`` case, the body, handlers or else
+    block of a ``try``, or after a ``break``, ``continue``, ``return`` or
+    ``raise``. Evaluating them before the loop could raise where the loop
+    does not, or change which exceptions a handler catches.
+    """
+
+    scope = "definition"
+
+    # Calls that give the same result for the same constant arguments, and
+    # the name suggested for the hoisted value
+    CONSTANT_CALLS = {
+        "re.compile": "pattern",
+        "datetime.datetime.strptime": "parsed_time",
+        "time.strptime": "parsed_time",
+    }
+
+    def __init__(self, min_chain_length: int = 2):
+        super().__init__()
+        self.min_chain_length = min_chain_length
+        self.locals = LocalKinds()
+        self.imports = {}
+        # Per function (or class/module body): enclosing loops, enclosing
+        # conditionally evaluated nodes (see _is_guarded) with the number of
+        # loops open when they were entered, and the names used in the
+        # function (which hoisted aliases must not shadow)
+        self._loops = [[]]
+        self._guards = [[]]
+        self._names = [set()]
+        self._reported = set()
+        self._covered = set()
+        # id(loop) -> invariant expressions to hoist above it, reported when the loop is left
+        self._pending = {}
+
+    def config(self):
+        return {"min_chain_length": self.min_chain_length}
+
+    def begin(self, tree, source=None):
+        super().begin(tree, source)
+        self.imports = module_imports(tree)
+
+    def _enter_function(self, node):
+        self.locals.enter_function(node)
+        self._loops.append([])
+        self._guards.append([])
+        self._names.append(_names_in(node))
 
-class CaseVisitor(ast.NodeVisitor):
+    def _leave_scope(self, node):
+        self.locals.leave()
+        self._loops.pop()
+        self._guards.pop()
+        self._names.pop()
+
+    enter_FunctionDef = enter_AsyncFunctionDef = enter_Lambda = _enter_function
+    leave_FunctionDef = leave_AsyncFunctionDef = leave_Lambda = leave_ClassDef = _leave_scope
+
+    def enter_ClassDef(self, node):
+        self.locals.enter_class()
+        self._loops.append([])
+        self._guards.append([])
+        self._names.append(set())
+
+    def enter_Assign(self, node):
+        for target in node.targets:
+            self.locals.bind(target, node.value)
+
+    def enter_AnnAssign(self, node):
+        self.locals.bind(node.target, node.value)
+
+    def enter_NamedExpr(self, node):
+        self.locals.bind(node.target, node.value)
+
+    def _enter_loop(self, node):
+        if isinstance(node, (ast.For, ast.AsyncFor)):
+            self.locals.bind(node.target, None)
+        self._loops[-1].append(_OpenLoop(node))
+
+    def _leave_loop(self, node):
+        self._loops[-1].pop()
+        self._report(node)
+
+    enter_For = enter_AsyncFor = enter_While = _enter_loop
+    leave_For = leave_AsyncFor = leave_While = _leave_loop
+
+    def _enter_guard(self, node):
+        self._guards[-1].append((node, len(self._loops[-1])))
+
+    def _leave_guard(self, node):
+        self._guards[-1].pop()
+
+    enter_If = enter_IfExp = enter_BoolOp = enter_Try = enter_match_case = _enter_guard
+    enter_ListComp = enter_SetComp = enter_DictComp = enter_GeneratorExp = _enter_guard
+    leave_If = leave_IfExp = leave_BoolOp = leave_Try = leave_match_case = _leave_guard
+    leave_ListComp = leave_SetComp = leave_DictComp = leave_GeneratorExp = _leave_guard
+
+    def _enter_jump(self, node):
+        if isinstance(node, (ast.Return, ast.Raise)):
+            left = self._loops[-1]
+        else:
+            # The innermost loop with the break or continue in its body
+            left = [loop for loop in self._loops[-1] if not _in_orelse(node, loop.node)][-1:]
+        for loop in left:
+            loop.jumped = True
+
+    enter_Break = enter_Continue = enter_Return = enter_Raise = _enter_jump
+
+    def _enclosing_loops(self, node: ast.expr):
+        """Loops that evaluate ``node`` on every iteration and it can be hoisted out of."""
+        loops = self._loops[-1]
+        inner = 0
+        for guard, open_loops in self._guards[-1]:
+            # Only the loops inside the guard evaluate node on every iteration
+            if _is_guarded(node, guard):
+                inner = max(inner, open_loops)
+        for index, loop in enumerate(loops):
+            if loop.jumped or _in_orelse(node, loop.node):
+                inner = max(inner, index + 1)
+        loops = loops[inner:]
+        # The iterable of a for loop is evaluated once, before the loop
+        if loops and isinstance(loops[-1].node, (ast.For, ast.AsyncFor)) and _within(node, loops[-1].node.iter):
+            return loops[:-1]
+        return loops
+
+    def _resolve(self, path: str) -> str:
+        """Qualified name of ``path`` if it starts with an imported (non-local) name."""
+        root, _, rest = path.partition(".")
+        if root in self.imports and not self.locals.is_local(root):
+            return self.imports[root] + ("." + rest if rest else "")
+        return path
+
+    def enter_Call(self, node):
+        if id(node) in self._covered or not self.locals.in_function:
+            return
+        func = dotted_name(node.func)
+        if func is None or self.locals.is_local(func.split(".")[0]):
+            return
+        arguments = node.args + [keyword.value for keyword in node.keywords]
+
+        if func == "len" and len(node.args) == 1 and not node.keywords:
+            path = dotted_name(node.args[0])
+            if path is not None:
+                self._check(node, [path], "mutated", f"{path.split('.')[-1]}_len")
+        elif self._resolve(func) in self.CONSTANT_CALLS and all(isinstance(a, ast.Constant) for a in arguments):
+            self._check(node, [func], "rebound", self.CONSTANT_CALLS[self._resolve(func)])
+
+    def enter_Attribute(self, node):
+        if id(node) in self._covered or not self.locals.in_function or not isinstance(node.ctx, ast.Load):
+            return
+        path = dotted_name(node)
+        if path is None:
+            return
+        root = path.split(".")[0]
+        if path.count(".") < self.min_chain_length and (root not in self.imports or self.locals.is_local(root)):
+            return
+        self._check(node, [path], "rebound", path.split(".")[-1])
+
+    def _check(self, node: ast.expr, paths, changes: str, alias: str):
+        """Record ``node`` if the loops leave ``paths`` alone, to be hoisted above the outermost such loop."""
+        loops = self._enclosing_loops(node)
+        if not loops:
+            return
+        self._covered.update(id(child) for child in ast.walk(node))
+
+        target = None
+        for loop in reversed(loops):
+            changed = loop.mutated if changes == "mutated" else loop.rebound
+            if any(depends_on(path, changed) for path in paths):
+                break
+            target = loop.node
+        if target is None:
+            return
+        expression = ast.unparse(node)
+        if (id(target), expression) in self._reported:
+            return
+        self._reported.add((id(target), expression))
+
+        depth = len(loops) - [loop.node for loop in loops].index(target)
+        self._pending.setdefault(id(target), []).append((node, expression, depth, alias))
+
+    def _report(self, loop: ast.AST):
+        """Report the invariant expressions found for ``loop``, all hoisted in one rewrite."""
+        found = self._pending.pop(id(loop), None)
+        if not found:
+            return
+        evaluated = ", ".join(f"'{expression}' (O({_iterations(depth)}) times)" for _, expression, depth, _ in found)
+        if len(found) == 1:
+            description = f"{evaluated} does not change inside the loop but is evaluated on every iteration"
+        else:
+            description = f"{len(found)} expressions do not change inside the loop but are evaluated on every iteration: {evaluated}"
+        self.issues.append(CodeIssue(
+            line_number=found[0][0].lineno,
+            issue_type="loop_invariant",
+            description=description,
+            suggestion=("Evaluate once before the loop and use local names inside it; "
+                        "local lookups are also cheaper than attribute and global lookups"),
+            original_code=self.node_source(loop),
+            optimized_code=self._generate_hoisted(loop, [(node, alias) for node, _, _, alias in found],
+                                                  self._names[-1])
+        ))
+
+    @staticmethod
+    def _generate_hoisted(loop: ast.AST, expressions, names=frozenset()) -> str:
+        """
+        Evaluate each ``(expression, alias)`` once before ``loop`` and use the alias inside it.
+
+        Aliases avoid the names used in ``loop``, ``names`` (those of the
+        enclosing function) and builtins, so they shadow nothing.
+        """
+        used = {child.id for child in ast.walk(loop) if isinstance(child, ast.Name)}
+        used.update(names, dir(builtins))
+        rewritten = copy.deepcopy(loop)
+        assignments = []
+        for expression, alias in expressions:
+            if alias in used:
+                alias = "".join(c if c.isalnum() else "_" for c in ast.unparse(expression)).strip("_")
+            while alias in used:
+                alias += "_"
+            used.add(alias)
+            rewritten = _ReplaceExpression(expression, alias).visit(rewritten)
+            assignments.append(f"{alias} = {ast.unparse(expression)}")
+        return "\n".join(assignments + [ast.unparse(rewritten)])
+
+
+def _at_or_after(node: ast.AST, other: ast.AST) -> bool:
+    return (node.lineno, node.col_offset) >= (other.lineno, other.col_offset)
+
+
+def _within(node: ast.AST, other: ast.AST) -> bool:
+    return (_at_or_after(node, other)
+            and (node.end_lineno, node.end_col_offset) <= (other.end_lineno, other.end_col_offset))
+
+
+def _in_orelse(node: ast.AST, loop: ast.AST) -> bool:
+    """Whether ``node``, somewhere inside ``loop``, is in its else block."""
+    return bool(loop.orelse) and _at_or_after(node, loop.orelse[0])
+
+
+def _is_guarded(node: ast.AST, guard: ast.AST) -> bool:
+    """Whether ``node``, somewhere inside ``guard``, is only evaluated depending on a condition."""
+    if isinstance(guard, ast.If):
+        return _at_or_after(node, guard.body[0])
+    if isinstance(guard, ast.IfExp):
+        return not _within(node, guard.test)
+    if isinstance(guard, ast.BoolOp):
+        return _at_or_after(node, guard.values[1])
+    if isinstance(guard, ast.Try):
+        # Everything but the finally block
+        return not guard.finalbody or not _at_or_after(node, guard.finalbody[0])
+    if isinstance(guard, (ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)):
+        # Everything but the first iterable, which is evaluated once up front
+        return not _within(node, guard.generators[0].iter)
+    # A case of a match statement
+    return True
+
+
+# Match patterns that bind a name (Python 3.10+)
+_MATCH_CAPTURES = tuple(getattr(ast, name) for name in ("MatchAs", "MatchStar") if hasattr(ast, name))
+
+
+def _names_in(function: ast.AST):
+    """Every name used, bound or imported anywhere in ``function``, including its parameters."""
+    names = set()
+    for child in ast.walk(function):
+        if isinstance(child, ast.Name):
+            names.add(child.id)
+        elif isinstance(child, ast.arg):
+            names.add(child.arg)
+        elif isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(child.name)
+        elif isinstance(child, ast.alias):
+            names.add((child.asname or child.name).split(".")[0])
+        elif isinstance(child, (ast.Global, ast.Nonlocal)):
+            names.update(child.names)
+        elif isinstance(child, (ast.ExceptHandler,) + _MATCH_CAPTURES) and child.name:
+            names.add(child.name)
+    return names
+
+
+# Calls that do I/O or return something different on every call
+_IMPURE_BUILTINS = frozenset({"print", "open", "input", "exec", "eval", "breakpoint"})
+_IMPURE_MODULES = frozenset({
+    "os", "sys", "io", "subprocess", "socket", "shutil", "logging", "random", "secrets", "time", "uuid",
+    "requests", "urllib", "http", "sqlite3", "pathlib", "tempfile", "asyncio", "threading",
+})
+_IMPURE_CALLS = frozenset({
+    "datetime.datetime.now", "datetime.datetime.utcnow", "datetime.datetime.today", "datetime.date.today",
+})
+_IO_METHODS = frozenset({
+    "write", "writelines", "read", "readline", "readlines", "send", "sendall", "recv", "flush", "close",
+    "execute", "commit",
+})
+_CACHE_DECORATORS = frozenset({"functools.cache", "functools.lru_cache", "functools.cached_property"})
+# Builtins that return immutable values
+_IMMUTABLE_BUILTINS = frozenset({
+    "abs", "all", "any", "bool", "bytes", "chr", "divmod", "float", "frozenset", "hash", "int", "len", "max",
+    "min", "ord", "pow", "repr", "round", "str", "sum", "tuple",
+})
+_UNHASHABLE_KINDS = ("list", "dict", "set")
+
+
+class _FunctionInfo:
+    """What MemoizationVisitor learned about one function while walking it."""
+
+    def __init__(self, node: ast.FunctionDef, is_method: bool):
+        self.node = node
+        self.is_method = is_method
+        self.arguments = {arg.arg for arg in node.args.posonlyargs + node.args.args + node.args.kwonlyargs}
+        self.locals = set()
+        self.impure: Optional[str] = None
+        self.cacheable = isinstance(node, ast.FunctionDef)
+        self.callees = set()
+        self.self_calls: List[ast.Call] = []
+        self.loops = 0
+        self.returns: List[ast.expr] = []
+        # Per local name: how often it is bound, and how often to an immutable value
+        self.bindings = {}
+        self.immutable_bindings = {}
+
+    def mark_impure(self, reason: str):
+        if self.impure is None:
+            self.impure = reason
+
+
+def _self_calls_per_path(node, name: str) -> int:
+    """Most calls of ``name`` that one execution of ``node`` can make (loops count as two)."""
+    # Post-order over an explicit stack, since deeply nested expressions exceed the recursion limit
+    counts = []
+    stack = [(node, False)]
+    while stack:
+        item, combine = stack.pop()
+        if combine:
+            children, total = item
+            counts[len(counts) - len(children):] = [total(counts[len(counts) - len(children):])]
+            continue
+        children, total = _path_parts(item, name)
+        stack.append(((children, total), True))
+        stack.extend((child, False) for child in reversed(children))
+    return counts[0]
+
+
+def _path_parts(node, name: str):
+    """Children of ``node`` for _self_calls_per_path(), and how to combine their counts."""
+    if isinstance(node, list):
+        return node, sum
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda, ast.ClassDef)):
+        return [], lambda counts: 0
+    if isinstance(node, (ast.If, ast.IfExp)):
+        return [node.test, node.body, node.orelse], lambda counts: counts[0] + max(counts[1], counts[2])
+    if isinstance(node, (ast.For, ast.AsyncFor, ast.While)):
+        header = node.test if isinstance(node, ast.While) else node.iter
+        return [header, node.body, node.orelse], lambda counts: counts[0] + 2 * counts[1] + counts[2]
+    if isinstance(node, ast.Try):
+        children = [node.body, node.orelse, node.finalbody] + [handler.body for handler in node.handlers]
+        return children, lambda counts: sum(counts[:3]) + max(counts[3:], default=0)
+    if type(node).__name__ == "Match":  # ast.Match is Python 3.10+
+        children = [node.subject] + [case.body for case in node.cases]
+        return children, lambda counts: counts[0] + max(counts[1:], default=0)
+    calls = int(isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == name)
+    return list(ast.iter_child_nodes(node)), lambda counts: calls + sum(counts)
+
+
+def _shrinks_arguments(call: ast.Call, arguments) -> bool:
+    """
+    Whether a recursive call computes an argument from a parameter (``n - 1``, ``s[1:]``).
+
+    Such calls repeat the same subproblems, unlike recursion over distinct
+    parts of a structure (``node.left``, ``child``), which caching does not help.
+    """
+    for argument in call.args + [keyword.value for keyword in call.keywords]:
+        if isinstance(argument, ast.BinOp) or (isinstance(argument, ast.Subscript)
+                                               and isinstance(argument.slice, ast.Slice)):
+            if any(isinstance(child, ast.Name) and child.id in arguments for child in ast.walk(argument)):
+                return True
+    return False
+
+
+def _constant_key(node: ast.AST) -> Optional[tuple]:
+    """
+    Hashable form of a short constant argument (``3``, ``-1``, ``("a", 2)``),
+    or None for other expressions.
+    """
+    key = []
+    stack = [node]
+    while stack:
+        if len(key) > 32:
+            # Too long to quote in a report (and to unparse without recursing)
+            return None
+        node = stack.pop()
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+            key.append(type(node.op).__name__)
+            stack.append(node.operand)
+        elif isinstance(node, ast.Tuple):
+            key.append(("tuple", len(node.elts)))
+            stack.extend(reversed(node.elts))
+        elif isinstance(node, ast.Constant):
+            key.append((type(node.value).__name__, node.value))
+        else:
+            return None
+    return tuple(key)
+
+
+def _returns_immutable(value: ast.expr, info: _FunctionInfo, functions, imports) -> bool:
+    """
+    Whether ``value`` is obviously an immutable value (a number, str, tuple, ...).
+
+    Calls count when they are to the function itself, to other functions of
+    the module, to math or to builtins like len(); anything else (e.g. a
+    class, which builds a new object on every call) does not.
+    """
+    stack = [value]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, (ast.Constant, ast.JoinedStr)):
+            continue
+        if isinstance(node, ast.Name):
+            bound = info.bindings.get(node.id, 0)
+            if node.id not in info.arguments and bound == 0 or bound != info.immutable_bindings.get(node.id, 0):
+                return False
+        elif isinstance(node, (ast.Tuple, ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare, ast.IfExp)):
+            stack.extend(child for child in ast.iter_child_nodes(node) if isinstance(child, ast.expr))
+        elif isinstance(node, (ast.Call, ast.Attribute)):
+            path = dotted_name(node.func if isinstance(node, ast.Call) else node)
+            if path is None:
+                return False
+            root, _, rest = path.partition(".")
+            if root in info.locals or root in info.arguments:
+                return False
+            resolved = imports.get(root, root) + ("." + rest if rest else "")
+            if not (path == info.node.name or path in functions or resolved in _IMMUTABLE_BUILTINS
+                    or resolved.startswith("math.")):
+                return False
+        else:
+            return False
+    return True
+
+
+class MemoizationVisitor(Rule):
+    """
+    Rule to find functions worth caching with ``functools.lru_cache``.
+
+    A candidate is a function that is probably pure: it does not declare
+    ``global``/``nonlocal``, assign to attributes or items of its arguments
+    or of globals, call mutating methods on them, do I/O or call anything
+    nondeterministic, directly or through other functions of the module.
+    It is reported when it calls itself more than once per call with
+    arguments computed from its parameters (tree recursion such as fib),
+    or when it is called with the same constant arguments inside a loop or
+    at several call sites (with at least one argument). Methods, generators,
+    coroutines, functions that create functions or classes, and functions
+    that may return a mutable object (anything but numbers, strings, tuples
+    and results of known functions) are not considered, since every caller
+    would share the cached object.
+
+    Call sites and callees can be anywhere in the module, so this is a
+    "module" rule: it reports from finish().
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.imports = {}
+        # Innermost last: _FunctionInfo, or None for a class body
+        self._scopes: List[Optional[_FunctionInfo]] = []
+        self._functions: List[_FunctionInfo] = []
+        self._module_functions = set()
+        self._module_loops = 0
+        # (callee name, arguments) -> call sites, and whether one is in a loop
+        self._constant_calls = {}
+
+    def begin(self, tree, source=None):
+        super().begin(tree, source)
+        self.imports = module_imports(tree)
+        self._module_functions = {node.name for node in getattr(tree, "body", ())
+                                  if isinstance(node, ast.FunctionDef)}
+
+    @property
+    def _function(self) -> Optional[_FunctionInfo]:
+        return self._scopes[-1] if self._scopes else None
+
+    def _enter_function(self, node):
+        info = _FunctionInfo(node, is_method=bool(self._scopes) and self._scopes[-1] is None)
+        if self._function is not None:
+            self._function.locals.add(node.name)
+            self._function.cacheable = False
+        self._scopes.append(info)
+        self._functions.append(info)
+
+    def _leave_scope(self, node):
+        self._scopes.pop()
+
+    enter_FunctionDef = enter_AsyncFunctionDef = _enter_function
+    leave_FunctionDef = leave_AsyncFunctionDef = leave_ClassDef = _leave_scope
+
+    def enter_ClassDef(self, node):
+        self._not_cacheable(node)
+        self._scopes.append(None)
+
+    def _enter_loop(self, node):
+        if self._function is not None:
+            self._function.loops += 1
+        else:
+            self._module_loops += 1
+
+    def _leave_loop(self, node):
+        if self._function is not None:
+            self._function.loops -= 1
+        else:
+            self._module_loops -= 1
+
+    enter_For = enter_AsyncFor = enter_While = _enter_loop
+    enter_ListComp = enter_SetComp = enter_DictComp = enter_GeneratorExp = _enter_loop
+    leave_For = leave_AsyncFor = leave_While = _leave_loop
+    leave_ListComp = leave_SetComp = leave_DictComp = leave_GeneratorExp = _leave_loop
+
+    def _not_cacheable(self, node):
+        if self._function is not None:
+            self._function.cacheable = False
+
+    # Generators and coroutines, and functions creating new functions or classes
+    enter_Yield = enter_YieldFrom = enter_Await = enter_Lambda = _not_cacheable
+
+    def enter_Return(self, node):
+        if self._function is not None and node.value is not None:
+            self._function.returns.append(node.value)
+
+    def _count_bindings(self, targets, value):
+        info = self._function
+        if info is None:
+            return
+        immutable = value is not None and _returns_immutable(value, info, self._module_functions, self.imports)
+        for target in targets:
+            if isinstance(target, ast.Name) and immutable:
+                info.immutable_bindings[target.id] = info.immutable_bindings.get(target.id, 0) + 1
+
+    def enter_Assign(self, node):
+        self._count_bindings(node.targets, node.value)
+
+    def enter_AugAssign(self, node):
+        self._count_bindings([node.target], node.value)
+
+    def enter_AnnAssign(self, node):
+        self._count_bindings([node.target], node.value)
+
+    def _writes_shared_state(self, node):
+        if self._function is not None:
+            self._function.mark_impure(f"'{type(node).__name__.lower()}' declaration")
+
+    enter_Global = enter_Nonlocal = _writes_shared_state
+
+    def enter_Name(self, node):
+        if self._function is not None and not isinstance(node.ctx, ast.Load):
+            self._function.locals.add(node.id)
+            self._function.bindings[node.id] = self._function.bindings.get(node.id, 0) + 1
+
+    def _check_store(self, node):
+        """``x.attr = ...`` / ``x[key] = ...`` on an argument or a global."""
+        info = self._function
+        if info is None or isinstance(node.ctx, ast.Load):
+            return
+        root = node.value
+        while isinstance(root, (ast.Attribute, ast.Subscript)):
+            root = root.value
+        if not isinstance(root, ast.Name) or root.id in info.arguments or root.id not in info.locals:
+            info.mark_impure("writes to its arguments or shared state")
+
+    enter_Attribute = enter_Subscript = _check_store
+
+    def enter_Call(self, node):
+        info = self._function
+        func = dotted_name(node.func)
+
+        if func is not None and "." not in func and (info is None or func not in info.locals):
+            args = tuple(_constant_key(argument) for argument in node.args)
+            keywords = tuple(sorted((keyword.arg or "", _constant_key(keyword.value)) for keyword in node.keywords))
+            if None not in args and all(value is not None for _, value in keywords):
+                key = (func, args, keywords)
+                in_loop = info.loops > 0 if info is not None else self._module_loops > 0
+                sites, looped = self._constant_calls.get(key, ([], False))
+                self._constant_calls[key] = (sites + [node], looped or in_loop)
+
+        if info is None:
+            return
+        if func == info.node.name and func not in info.locals:
+            info.self_calls.append(node)
+        if func is None:
+            if isinstance(node.func, ast.Attribute) and node.func.attr in _IO_METHODS:
+                info.mark_impure(f"calls .{node.func.attr}()")
+            return
+
+        root, _, rest = func.partition(".")
+        if root in info.locals or root in info.arguments:
+            if isinstance(node.func, ast.Attribute) and node.func.attr in _IO_METHODS:
+                info.mark_impure(f"calls .{node.func.attr}()")
+            elif (isinstance(node.func, ast.Attribute) and node.func.attr in MUTATING_METHODS
+                    and (root in info.arguments or root not in info.locals)):
+                info.mark_impure("mutates an argument")
+            return
+        resolved = self.imports.get(root, root) + ("." + rest if rest else "")
+        if resolved in _IMPURE_BUILTINS or resolved in _IMPURE_CALLS or resolved.split(".")[0] in _IMPURE_MODULES:
+            info.mark_impure(f"calls {func}()")
+        elif isinstance(node.func, ast.Attribute) and node.func.attr in MUTATING_METHODS | _IO_METHODS:
+            info.mark_impure(f"calls {func}()")
+        elif "." not in func:
+            info.callees.add(func)
+
+    def finish(self, tree):
+        top_level = {info.node.name: info for info in self._functions if info.node in tree.body}
+        # A function calling an impure function of the module is impure too.
+        changed = True
+        while changed:
+            changed = False
+            for info in self._functions:
+                if info.impure is None:
+                    for callee in info.callees:
+                        if callee in top_level and top_level[callee].impure is not None:
+                            info.mark_impure(f"calls {callee}(), which {top_level[callee].impure}")
+                            changed = True
+                            break
+
+        reasons = {}
+        for info in self._functions:
+            if info.self_calls and self._is_candidate(info) and any(
+                    _shrinks_arguments(call, info.arguments) for call in info.self_calls):
+                per_call = _self_calls_per_path(info.node.body, info.node.name)
+                if per_call >= 2:
+                    reasons.setdefault(id(info), (info, [], []))[1].append(
+                        f"calls itself up to {per_call} times per call, so uncached the number of calls "
+                        f"grows exponentially with the recursion depth"
+                    )
+                    reasons[id(info)][2].extend(info.self_calls)
+
+        for (name, _, _), (sites, in_loop) in self._constant_calls.items():
+            info = top_level.get(name)
+            if info is None or not self._is_candidate(info) or not (in_loop or len(sites) > 1):
+                continue
+            if not sites[0].args and not sites[0].keywords:
+                # Without arguments there is nothing to key the cache on; it would just keep one result
+                continue
+            where = "inside a loop" if in_loop else f"at {len(sites)} call sites"
+            reasons.setdefault(id(info), (info, [], []))[1].append(
+                f"is called with the same constant arguments {where} "
+                f"({ast.unparse(sites[0])}, line {sites[0].lineno})"
+            )
+            reasons[id(info)][2].extend(sites)
+
+        for info, found, calls in sorted(reasons.values(), key=lambda entry: entry[0].node.lineno):
+            self._report(info, found, calls)
+
+    def _is_candidate(self, info: _FunctionInfo) -> bool:
+        if info.impure is not None or info.is_method or not info.cacheable:
+            return False
+        if not all(_returns_immutable(value, info, self._module_functions, self.imports) for value in info.returns):
+            return False
+        for decorator in info.node.decorator_list:
+            path = dotted_name(decorator.func if isinstance(decorator, ast.Call) else decorator)
+            if path is not None:
+                root, _, rest = path.partition(".")
+                if self.imports.get(root, root) + ("." + rest if rest else "") in _CACHE_DECORATORS:
+                    return False
+        return True
+
+    def _decorator(self) -> Tuple[str, bool]:
+        """Cache decorator spelled with the module's imports, and whether functools is imported."""
+        for name, imported in self.imports.items():
+            if imported == "functools.cache":
+                return name, True
+            if imported == "functools.lru_cache":
+                return f"{name}(maxsize=None)", True
+        alias = next((name for name, imported in self.imports.items() if imported == "functools"), None)
+        return f"{alias or 'functools'}.lru_cache(maxsize=None)", alias is not None
+
+    def _report(self, info: _FunctionInfo, reasons: List[str], calls: List[ast.Call]):
+        node = info.node
+        args = node.args
+        unhashable = [
+            arg.arg for arg, default in zip(args.posonlyargs + args.args,
+                                            [None] * (len(args.posonlyargs + args.args) - len(args.defaults))
+                                            + args.defaults)
+            if annotation_kind(arg.annotation) in _UNHASHABLE_KINDS
+            or (default is not None and value_kind(default) in _UNHASHABLE_KINDS)
+        ]
+        unhashable += [arg.arg for arg, default in zip(args.kwonlyargs, args.kw_defaults)
+                       if annotation_kind(arg.annotation) in _UNHASHABLE_KINDS
+                       or (default is not None and value_kind(default) in _UNHASHABLE_KINDS)]
+        passes_unhashable = any(value_kind(argument) in _UNHASHABLE_KINDS
+                                for call in calls for argument in call.args + [k.value for k in call.keywords])
+
+        decorator, imported = self._decorator()
+        suggestion = f"Decorate it with @{decorator}"
+        if "lru_cache" in decorator:
+            suggestion += " (or @functools.cache on Python 3.9+)"
+        if not imported:
+            suggestion += " and import functools"
+        if unhashable or passes_unhashable:
+            what = f"'{', '.join(unhashable)}'" if unhashable else "some arguments"
+            suggestion += (f". Warning: {what} may be unhashable (list, dict or set); lru_cache raises "
+                           f"TypeError for those, so pass tuples or frozensets instead")
+
+        if self.source is not None:
+            # Insert the decorator into the source text; unparsing recurses and fails on deeply nested code
+            first_line = min([d.lineno for d in node.decorator_list] + [node.lineno])
+            lines = self.source.lines(first_line, node.end_lineno).split("\n")
+            lines.insert(node.lineno - first_line, " " * node.col_offset + "@" + decorator)
+            optimized_code = textwrap.dedent("\n".join(lines))
+        else:
+            optimized = copy.copy(node)
+            optimized.decorator_list = node.decorator_list + [ast.parse(decorator, mode="eval").body]
+            optimized_code = ast.unparse(optimized)
+        self.issues.append(CodeIssue(
+            line_number=node.lineno,
+            issue_type="memoization_candidate",
+            description=f"Function '{node.name}' looks pure and " + "; it ".join(reasons),
+            suggestion=suggestion,
+            original_code=self.node_source(node),
+            optimized_code=optimized_code
+        ))
+
+
+class CaseVisitor(Rule):
     """Collect information about functions for test generation."""
 
     def __init__(self):
+        super().__init__()
         self.functions = []
 
-    def visit_FunctionDef(self, node):
+    def enter_FunctionDef(self, node):
         self.functions.append(node)
-        self.generic_visit(node)
@@ -0,0 +1,350 @@
+"""
+Watch mode: keep analysis results up to date while files change on disk.
+
+On Linux the tree is watched with inotify (through ctypes, no extra
+dependency); elsewhere, or when inotify is unavailable, files are polled
+with ``os.scandir``/``stat``. Bursts of events, such as an editor writing a
+file in several steps or a branch checkout, are debounced into a single
+update, and only the files that were touched are re-analyzed.
+"""
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from .discovery import FileDiscovery
+from .file_analyzer import ProjectAnalyzer
+from .models import FileAnalysis
+
+# inotify(7) constants
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_IN_ISDIR = 0x40000000
+_IN_CLOEXEC = 0o2000000
+_IN_NONBLOCK = 0o4000
+
+_WATCH_MASK = (_IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+               | _IN_DELETE_SELF | _IN_ONLYDIR)
+_EVENT = struct.Struct("iIII")
+
+
+class WatchUpdate(NamedTuple):
+    """One debounced batch of changes and the files re-analyzed for it."""
+    analyzed: Dict[str, FileAnalysis]
+    removed: List[str]
+
+
+class PollingBackend:
+    """Detects changes by comparing size and mtime of the discovered files."""
+
+    def __init__(self, discovery: FileDiscovery, interval: float = 1.0):
+        self.discovery = discovery
+        self.interval = interval
+        self._snapshot: Dict[Path, Tuple[int, int]] = {}
+        self._next_poll = 0.0
+
+    def _scan(self) -> Dict[Path, Tuple[int, int]]:
+        snapshot = {}
+        for filepath in self.discovery:
+            try:
+                stat = filepath.stat()
+            except OSError:
+                continue
+            snapshot[filepath] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+
+    def start(self):
+        self._snapshot = self._scan()
+        self._next_poll = time.monotonic() + self.interval
+
+    def rescan(self):
+        pass
+
+    def read(self, timeout: float) -> Tuple[Set[Path], bool]:
+        """Changed paths seen within ``timeout`` seconds, and whether a rescan is needed."""
+        delay = self._next_poll - time.monotonic()
+        if delay > timeout:
+            time.sleep(timeout)
+            return set(), False
+        if delay > 0:
+            time.sleep(delay)
+
+        snapshot = self._scan()
+        self._next_poll = time.monotonic() + self.interval
+        changed = {path for path, state in snapshot.items() if self._snapshot.get(path) != state}
+        changed.update(path for path in self._snapshot if path not in snapshot)
+        self._snapshot = snapshot
+        return changed, False
+
+    def close(self):
+        self._snapshot = {}
+
+
+class InotifyBackend:
+    """
+    Receives change events from the kernel for every watched directory.
+
+    Raises OSError when inotify is not available, or from start() when the
+    per-user watch limit is too low for the tree.
+    """
+
+    def __init__(self, discovery: FileDiscovery):
+        if not sys.platform.startswith("linux"):
+            raise OSError(errno.ENOSYS, "inotify is only available on Linux")
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError(errno.ENOSYS, "libc has no inotify support")
+
+        self.discovery = discovery
+        self._libc = libc
+        self._directories: Dict[int, Path] = {}
+        self._fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self._fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+
+    def _add_watch(self, directory: Path, strict: bool = False):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), _WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            # Directories may vanish between discovery and the watch; running
+            # out of watches, however, would silently miss changes.
+            if strict or err == errno.ENOSPC:
+                raise OSError(err, f"Cannot watch {directory}: {os.strerror(err)}")
+            return
+        self._directories[wd] = directory
+
+    def start(self):
+        try:
+            for directory in self.discovery.directories():
+                self._add_watch(directory, strict=directory == self.discovery.root_path)
+        except OSError:
+            self.close()
+            raise
+
+    def rescan(self):
+        """Watch directories that appeared since the last scan."""
+        for directory in self.discovery.directories():
+            self._add_watch(directory)
+
+    def read(self, timeout: float) -> Tuple[Set[Path], bool]:
+        """Changed paths seen within ``timeout`` seconds, and whether a rescan is needed."""
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set(), False
+
+        changed: Set[Path] = set()
+        rescan = False
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if not data:
+                break
+
+            offset = 0
+            while offset < len(data):
+                wd, mask, _cookie, length = _EVENT.unpack_from(data, offset)
+                name = data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b"\0")
+                offset += _EVENT.size + length
+
+                if mask & _IN_Q_OVERFLOW:
+                    rescan = True
+                    continue
+                if mask & _IN_IGNORED:
+                    self._directories.pop(wd, None)
+                    continue
+                directory = self._directories.get(wd)
+                if directory is None:
+                    continue
+                if mask & _IN_DELETE_SELF:
+                    rescan = True
+                    continue
+                if mask & _IN_ISDIR:
+                    # A directory appeared, disappeared or moved: its files
+                    # were never reported individually.
+                    rescan = True
+                    continue
+                changed.add(directory / os.fsdecode(name))
+
+        return changed, rescan
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+        self._directories.clear()
+
+
+class ProjectWatcher:
+    """
+    Keeps the results and report of a ProjectAnalyzer current as files change.
+
+    The project is analyzed once on start(); afterwards each debounced burst
+    of changes re-analyzes only the touched files and updates ``results`` and
+    ``report`` in place. Rendered report sections are cached per file, so
+    unchanged files are not re-read to refresh the report.
+
+    Args:
+        analyzer: Analyzer whose root, exclusions, jobs and cache are used.
+        debounce: Seconds without further events before a burst is processed.
+        poll_interval: Seconds between scans when polling.
+        use_inotify: Try inotify before falling back to polling.
+        output_file: Rewrite the report to this file after every update.
+        on_update: Called with each WatchUpdate after it has been applied.
+    """
+
+    def __init__(self, analyzer: ProjectAnalyzer, debounce: float = 0.2, poll_interval: float = 1.0,
+                 use_inotify: bool = True, output_file: Optional[str] = None,
+                 on_update: Optional[Callable[[WatchUpdate], None]] = None):
+        self.analyzer = analyzer
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.output_file = output_file
+        self.on_update = on_update
+        self.discovery = FileDiscovery(analyzer.root_path, analyzer.exclude_dirs, analyzer.exclude_files,
+                                       analyzer.respect_gitignore)
+        self.results: Dict[str, FileAnalysis] = {}
+        self.report = ""
+        self.backend = None
+        self._sections: Dict[str, str] = {}
+
+    def start(self) -> Dict[str, FileAnalysis]:
+        """Start watching and run the initial full analysis."""
+        # Watch first, so changes made during the initial analysis are seen.
+        self.backend = self._start_backend()
+        self.results = self.analyzer.analyze_project()
+        self._sections = {}
+        self._refresh_report(self.results)
+        return self.results
+
+    def _start_backend(self):
+        if self.use_inotify:
+            try:
+                backend = InotifyBackend(self.discovery)
+                backend.start()
+                return backend
+            except OSError:
+                pass
+        backend = PollingBackend(self.discovery, self.poll_interval)
+        backend.start()
+        return backend
+
+    def poll(self, timeout: Optional[float] = None) -> Optional[WatchUpdate]:
+        """
+        Wait up to ``timeout`` seconds for changes and process one burst.
+
+        Returns the applied WatchUpdate, or None if nothing relevant changed.
+        """
+        if self.backend is None:
+            self.start()
+
+        wait = self.poll_interval if timeout is None else timeout
+        changed, rescan = self.backend.read(wait)
+        if not changed and not rescan:
+            return None
+
+        while True:
+            more, more_rescan = self.backend.read(self.debounce)
+            if not more and not more_rescan:
+                break
+            changed |= more
+            rescan = rescan or more_rescan
+
+        return self._apply(changed, rescan)
+
+    def run(self, stop: Optional[threading.Event] = None):
+        """Process changes until ``stop`` is set (or forever)."""
+        if self.backend is None:
+            self.start()
+        try:
+            while stop is None or not stop.is_set():
+                self.poll()
+        finally:
+            self.close()
+
+    def close(self):
+        if self.backend is not None:
+            self.backend.close()
+            self.backend = None
+
+    def __enter__(self) -> "ProjectWatcher":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _apply(self, changed: Set[Path], rescan: bool) -> Optional[WatchUpdate]:
+        if any(path.name == ".gitignore" for path in changed):
+            rescan = True
+
+        to_analyze: Set[Path] = set()
+        removed: Set[str] = set()
+
+        if rescan:
+            self.backend.rescan()
+            current = list(self.discovery)
+            present = {str(filepath) for filepath in current}
+            removed.update(filepath for filepath in self.results if filepath not in present)
+            to_analyze.update(filepath for filepath in current if str(filepath) not in self.results)
+            to_analyze.update(filepath for filepath in changed if str(filepath) in present)
+        else:
+            for filepath in changed:
+                if filepath.is_file() and self.discovery.includes(filepath):
+                    to_analyze.add(filepath)
+                elif str(filepath) in self.results:
+                    removed.add(str(filepath))
+
+        if not to_analyze and not removed:
+            return None
+
+        analyzed = self.analyzer.analyze_files(sorted(to_analyze))
+        for filepath in removed:
+            del self.results[filepath]
+            self._sections.pop(filepath, None)
+        self.results.update(analyzed)
+        self._refresh_report(analyzed)
+
+        update = WatchUpdate(analyzed, sorted(removed))
+        if self.on_update is not None:
+            self.on_update(update)
+        return update
+
+    def _refresh_report(self, analyzed: Dict[str, FileAnalysis]):
+        """Re-render the sections of ``analyzed`` and reassemble the report."""
+        for filepath, analysis in analyzed.items():
+            self._sections[filepath] = "\n".join(
+                ProjectAnalyzer._format_section(filepath, analysis.error, analysis.issues)
+            )
+
+        report = [
+            "# Code Analysis Report\n",
+            f"Total files analyzed: {len(self.results)}",
+            f"Total issues found: {sum(len(analysis.issues) for analysis in self.results.values())}\n",
+        ]
+        report.extend(self._sections[filepath] for filepath in sorted(self.results))
+        if self.analyzer.stats is not None:
+            report.append(self.analyzer.stats.format_report())
+        self.report = "\n".join(report)
+
+        if self.output_file:
+            with open(self.output_file, 'w', encoding='utf-8') as f:
+                f.write(self.report)
@@ -0,0 +1,198 @@
+"""
+Streaming machine-readable output.
+
+Writers take one FileAnalysis at a time and write it out immediately, so a
+scan streamed from ProjectAnalyzer.iter_project() can be written in constant
+memory regardless of the size of the project.
+"""
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, TextIO
+
+from .models import CodeIssue, FileAnalysis, SourceChangedError
+
+SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+SARIF_VERSION = "2.1.0"
+
+
+class JSONLinesWriter:
+    """
+    Writes one JSON object per analyzed file, one per line.
+
+    Each line has the keys ``filepath``, ``error`` and ``issues``, where
+    every issue is the dict form of a CodeIssue. Paths below ``root_path``
+    (when given) are written relative to it, with forward slashes.
+    """
+
+    def __init__(self, stream: TextIO, root_path: Optional[Path] = None):
+        self.stream = stream
+        self.root_path = Path(root_path).resolve() if root_path is not None else None
+
+    def _path(self, filepath: Path) -> str:
+        if self.root_path is not None:
+            try:
+                return Path(filepath).resolve().relative_to(self.root_path).as_posix()
+            except ValueError:
+                pass
+        return str(filepath)
+
+    def write(self, analysis: FileAnalysis):
+        record = {
+            "filepath": self._path(analysis.filepath),
+            "error": analysis.error,
+            "issues": [issue.to_dict() for issue in analysis.issues],
+        }
+        self.stream.write(json.dumps(record) + "\n")
+
+    def close(self):
+        self.stream.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class SARIFWriter:
+    """
+    Writes a SARIF 2.1.0 log with a single run.
+
+    The document skeleton is written up front and results are appended as
+    files are analyzed. Paths are made relative to ``root_path`` when given,
+    and files that failed to analyze are reported as tool execution
+    notifications once the stream is closed. Columns are counted in UTF-16
+    code units, as SARIF expects by default (and the run declares).
+    """
+
+    def __init__(self, stream: TextIO, root_path: Optional[Path] = None):
+        from . import __version__
+
+        self.stream = stream
+        self.root_path = Path(root_path).resolve() if root_path is not None else None
+        self._first = True
+        self._errors: List[Dict[str, Any]] = []
+
+        run: Dict[str, Any] = {
+            "tool": {"driver": {
+                "name": "pyrefactor",
+                "version": __version__,
+                "informationUri": "https://github.com/tdiprima/python-code-inspector",
+            }},
+            "columnKind": "utf16CodeUnits",
+        }
+        if self.root_path is not None:
+            run["originalUriBaseIds"] = {"%SRCROOT%": {"uri": self.root_path.as_uri() + "/"}}
+
+        # The document up to the run's results array, which write() fills and close() ends
+        self.stream.write(
+            f'{{"$schema": {json.dumps(SARIF_SCHEMA)}, "version": {json.dumps(SARIF_VERSION)}, "runs": [{{'
+            + "".join(f"{json.dumps(key)}: {json.dumps(value)}, " for key, value in run.items())
+            + '"results": ['
+        )
+
+    def _location(self, filepath: Path) -> Dict[str, Any]:
+        filepath = Path(filepath)
+        if self.root_path is not None:
+            try:
+                relpath = filepath.resolve().relative_to(self.root_path)
+            except ValueError:
+                pass
+            else:
+                return {"uri": relpath.as_posix(), "uriBaseId": "%SRCROOT%"}
+        return {"uri": filepath.resolve().as_uri()}
+
+    @staticmethod
+    def _region(issue: CodeIssue) -> Dict[str, int]:
+        span = issue.span
+        if span is None:
+            return {"startLine": issue.line_number}
+        try:
+            # Column offsets in the AST are UTF-8 byte offsets into the line
+            start_column = _utf16_column(span.source.lines(span.start_line, span.start_line), span.start_col)
+            end_column = _utf16_column(span.source.lines(span.end_line, span.end_line), span.end_col)
+        except SourceChangedError:
+            return {"startLine": span.start_line, "endLine": span.end_line}
+        return {
+            "startLine": span.start_line,
+            "startColumn": start_column,
+            "endLine": span.end_line,
+            "endColumn": end_column,
+        }
+
+    def _result(self, issue: CodeIssue, location: Dict[str, Any]) -> Dict[str, Any]:
+        properties = {"suggestion": issue.suggestion}
+        if issue.optimized_code:
+            properties["optimizedCode"] = issue.optimized_code
+        return {
+            "ruleId": issue.issue_type,
+            "level": "warning",
+            "message": {"text": f"{issue.description} {issue.suggestion}"},
+            "locations": [{"physicalLocation": {
+                "artifactLocation": location,
+                "region": self._region(issue),
+            }}],
+            "properties": properties,
+        }
+
+    def write(self, analysis: FileAnalysis):
+        location = self._location(analysis.filepath)
+        if analysis.error:
+            self._errors.append({
+                "level": "error",
+                "message": {"text": analysis.error},
+                "locations": [{"physicalLocation": {"artifactLocation": location}}],
+            })
+
+        for issue in analysis.issues:
+            self.stream.write(("\n" if self._first else ",\n") + json.dumps(self._result(issue, location)))
+            self._first = False
+
+    def close(self):
+        invocation = {
+            "executionSuccessful": True,
+            "toolExecutionNotifications": self._errors,
+        }
+        self.stream.write(f'], "invocations": [{json.dumps(invocation)}]}}]}}\n')
+        self.stream.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _utf16_column(line: str, byte_offset: int) -> int:
+    """1-based column, in UTF-16 code units, of a UTF-8 byte offset into ``line``."""
+    if line.isascii():
+        return byte_offset + 1
+    prefix = line.encode("utf-8")[:byte_offset].decode("utf-8", "replace")
+    return len(prefix.encode("utf-16-le")) // 2 + 1
+
+
+WRITERS = {
+    "jsonl": JSONLinesWriter,
+    "sarif": SARIFWriter,
+}
+
+
+def write_results(analyses: Iterable[FileAnalysis], stream: TextIO, format: str = "jsonl",
+                  root_path: Optional[Path] = None) -> int:
+    """
+    Stream analyses to ``stream`` in the given format.
+
+    Returns the number of files written. ``analyses`` is consumed lazily, so
+    pass ProjectAnalyzer.iter_project() to keep memory use flat.
+    """
+    try:
+        writer_class = WRITERS[format]
+    except KeyError:
+        raise ValueError(f"Unknown output format: {format!r}") from None
+
+    count = 0
+    with writer_class(stream, root_path) as writer:
+        for analysis in analyses:
+            writer.write(analysis)
+            count += 1
+    return count
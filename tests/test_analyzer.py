@@ -98,3 +98,105 @@ def test_syntax_error():
     source_code = "def invalid_syntax:"
     with pytest.raises(SyntaxError):
         analyze_code(source_code)
+
+
+def test_original_code_is_a_lazy_span():
+    source_code = """
+def process_matrix(matrix):
+    result = []
+    for i in range(len(matrix)):
+        for j in range(len(matrix[i])):
+            for k in range(len(matrix[i][j])):  # innermost
+                result.append(matrix[i][j][k])
+    return result
+"""
+    issues = analyze_code(source_code)
+    nested = [i for i in issues if i.issue_type == "nested_loops"][0]
+
+    assert nested.span is not None
+    assert (nested.span.start_line, nested.span.end_line) == (6, 7)
+    assert nested._code is None
+    assert nested.original_code == "\n".join(source_code.splitlines()[5:7])
+
+
+def test_file_backed_span_is_not_pickled_with_source(tmp_path):
+    import pickle
+    from pyrefactor.models import SourceText
+
+    module = tmp_path / "module.py"
+    module.write_text("x = 1\ny = 2\n")
+    source = SourceText(module.read_text(), path=module)
+
+    restored = pickle.loads(pickle.dumps(source))
+
+    assert restored._text is None
+    assert restored.lines(2, 2) == "y = 2"
+
+
+def test_released_span_detects_changed_file(tmp_path):
+    from pyrefactor.models import CodeIssue, SourceChangedError, SourceSpan, SourceText
+
+    module = tmp_path / "module.py"
+    module.write_text("x = 1\ny = 2\n")
+    source = SourceText(module.read_bytes(), path=module)
+    span = SourceSpan(source, 2, 0, 2, 5)
+    source.release()
+    assert span.text() == "y = 2"
+
+    source.release()
+    module.write_text("x = 1\ny = 22\n")
+    with pytest.raises(SourceChangedError):
+        span.text()
+
+    issue = CodeIssue(2, "example", "", "", span)
+    assert issue.original_code == f"# {module} has changed since it was analyzed"
+    assert issue.to_dict()["original_code"] == issue.original_code
+
+
+def test_tree_is_released_after_analysis():
+    from pyrefactor.analyzer import CodeAnalyzer
+
+    analyzer = CodeAnalyzer("def f():\n    return 1\n")
+    analyzer.analyze()
+
+    assert analyzer._tree is None
+    assert analyzer.rules[0].complexities == {("f", "f", 1, 2): 1}
+    # The tree is re-parsed on demand, e.g. for test generation.
+    assert "def test_f" in analyzer.generate_unit_tests("module")
+
+
+def test_long_string_concatenation_does_not_recurse():
+    from pyrefactor.analyzer import CodeAnalyzer
+
+    source = "def f():\n    s = " + " + ".join(['"a"'] * 1400) + "\n    return s\n"
+
+    assert CodeAnalyzer(source).analyze() == []
+
+
+def test_analyze_many_reports_errors_per_item():
+    from concurrent.futures import ThreadPoolExecutor
+    from pyrefactor import analyze_many
+
+    sources = [
+        ("loop", "for x in xs:\n    out.append(x)\n"),
+        ("broken", "def invalid_syntax:"),
+        ("empty", ""),
+    ] * 5
+
+    serial = list(analyze_many(iter(sources), batch_size=2))
+    assert [result.source_id for result in serial] == [source_id for source_id, _ in sources]
+    assert serial[0].issues[0].issue_type == "list_comprehension"
+    assert serial[1].error.startswith("SyntaxError")
+    assert serial[2].issues == [] and serial[2].error is None
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        pooled = list(analyze_many(sources, jobs=2, executor=executor, batch_size=2))
+    assert sorted(((r.source_id, r.error, len(r.issues)) for r in pooled), key=str) == \
+        sorted(((r.source_id, r.error, len(r.issues)) for r in serial), key=str)
+
+
+def test_analyze_many_in_worker_processes():
+    from pyrefactor import analyze_many
+
+    results = list(analyze_many(((i, "x = 1\n") for i in range(10)), jobs=2, batch_size=3))
+    assert sorted(result.source_id for result in results) == list(range(10))
@@ -0,0 +1,93 @@
+"""
+Unit tests for the persistent result cache.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+from pyrefactor.cache import ResultCache
+from pyrefactor.file_analyzer import ProjectAnalyzer
+
+LOOP_SOURCE = """
+def get_squares(numbers):
+    squares = []
+    for num in numbers:
+        squares.append(num * num)
+    return squares
+"""
+
+
+def _as_dicts(results):
+    """Results as plain data, comparing issues by their text rather than how it is held."""
+    return {path: ([issue.to_dict() for issue in analysis.issues], analysis.error) for path, analysis in results.items()}
+
+
+def test_warm_run_is_served_from_cache(monkeypatch):
+    with tempfile.TemporaryDirectory() as project_dir, tempfile.TemporaryDirectory() as cache_dir:
+        source_file = Path(project_dir) / "squares.py"
+        source_file.write_text(LOOP_SOURCE)
+
+        cold = ProjectAnalyzer(project_dir, jobs=1, cache=ResultCache(cache_dir)).analyze_project()
+
+        import pyrefactor.file_analyzer as file_analyzer
+        monkeypatch.setattr(file_analyzer, "CodeAnalyzer", None)
+        warm = ProjectAnalyzer(project_dir, jobs=1, cache=ResultCache(cache_dir)).analyze_project()
+
+        assert _as_dicts(warm) == _as_dicts(cold)
+        assert warm[str(source_file)].issues[0].issue_type == "list_comprehension"
+
+
+def test_changed_content_misses():
+    with tempfile.TemporaryDirectory() as project_dir, tempfile.TemporaryDirectory() as cache_dir:
+        source_file = Path(project_dir) / "squares.py"
+        source_file.write_text(LOOP_SOURCE)
+        ProjectAnalyzer(project_dir, jobs=1, cache=ResultCache(cache_dir)).analyze_project()
+
+        source_file.write_text("def invalid_syntax:")
+        results = ProjectAnalyzer(project_dir, jobs=1, cache=ResultCache(cache_dir)).analyze_project()
+
+        assert "SyntaxError" in results[str(source_file)].error
+
+
+def test_rule_configuration_is_part_of_the_key():
+    with tempfile.TemporaryDirectory() as project_dir, tempfile.TemporaryDirectory() as cache_dir:
+        source_file = Path(project_dir) / "squares.py"
+        source_file.write_text(LOOP_SOURCE)
+
+        cache = ResultCache(cache_dir, config="strict")
+        assert cache.lookup(source_file) is None
+        cache.store(ProjectAnalyzer(project_dir, jobs=1).analyze_project()[str(source_file)])
+        cache.save()
+
+        assert ResultCache(cache_dir, config="strict").lookup(source_file) is not None
+        assert ResultCache(cache_dir, config="lenient").lookup(source_file) is None
+
+
+def test_lru_eviction():
+    with tempfile.TemporaryDirectory() as project_dir, tempfile.TemporaryDirectory() as cache_dir:
+        for index in range(3):
+            (Path(project_dir) / f"mod_{index}.py").write_text(f"x = {index}\n")
+
+        ProjectAnalyzer(project_dir, jobs=1, cache=ResultCache(cache_dir, max_entries=2)).analyze_project()
+
+        entries = list(Path(cache_dir).glob("*/*.json"))
+        assert len(entries) == 2
+
+
+def test_file_edited_after_analysis_is_reported_but_not_cached():
+    with tempfile.TemporaryDirectory() as project_dir, tempfile.TemporaryDirectory() as cache_dir:
+        source_file = Path(project_dir) / "squares.py"
+        source_file.write_text(LOOP_SOURCE)
+        analyzer = ProjectAnalyzer(project_dir, jobs=1)
+        results = analyzer.analyze_project()
+
+        source_file.write_text(LOOP_SOURCE + "\nprint(get_squares([1]))\n")
+        report = analyzer.generate_report(results)
+        assert f"# {source_file} has changed since it was analyzed" in report
+
+        cache = ResultCache(cache_dir)
+        assert cache.lookup(source_file) is None
+        cache.store(results[str(source_file)])
+        assert cache._entries == {}
@@ -0,0 +1,85 @@
+"""
+Unit tests for changed-files-only analysis.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+from pyrefactor.file_analyzer import ProjectAnalyzer
+
+
+def _git(cwd, *args):
+    subprocess.run(["git", *args], cwd=cwd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def test_changed_since_git_ref():
+    with tempfile.TemporaryDirectory() as repo:
+        root = Path(repo)
+        (root / "stable.py").write_text("x = 1\n")
+        (root / "edited.py").write_text("y = 1\n")
+        _git(repo, "init", "-q")
+        _git(repo, "add", ".")
+        _git(repo, "-c", "user.name=t", "-c", "user.email=t@example.com", "commit", "-qm", "init")
+
+        (root / "edited.py").write_text("def invalid_syntax:")
+        (root / "new.py").write_text("z = 1\n")
+
+        analyzer = ProjectAnalyzer(repo, jobs=1)
+        delta = analyzer.analyze_project(changed_since="HEAD")
+        assert sorted(Path(path).name for path in delta) == ["edited.py", "new.py"]
+        assert "SyntaxError" in delta[str(root / "edited.py")].error
+
+        previous = ProjectAnalyzer(repo, jobs=1).analyze_project()
+        merged = analyzer.analyze_project(changed_since="HEAD", previous=previous)
+        assert list(merged) == list(previous)
+
+
+def test_mtime_index_mode():
+    with tempfile.TemporaryDirectory() as project_dir, tempfile.TemporaryDirectory() as state_dir:
+        root = Path(project_dir)
+        index_file = os.path.join(state_dir, "index.json")
+        (root / "a.py").write_text("a = 1\n")
+        (root / "b.py").write_text("b = 1\n")
+
+        analyzer = ProjectAnalyzer(project_dir, jobs=1)
+        first = analyzer.analyze_project(index_file=index_file)
+        assert len(first) == 2
+
+        assert analyzer.analyze_project(index_file=index_file) == {}
+
+        (root / "b.py").write_text("def invalid_syntax:")
+        merged = analyzer.analyze_project(index_file=index_file, previous=first)
+        assert set(merged) == set(first)
+        assert merged[str(root / "a.py")] is first[str(root / "a.py")]
+        assert "SyntaxError" in merged[str(root / "b.py")].error
+
+
+def test_cli_index_mode_reports_unchanged_files_from_cache():
+    import json
+    from pyrefactor.cli import main
+
+    with tempfile.TemporaryDirectory() as project_dir, tempfile.TemporaryDirectory() as state_dir:
+        root = Path(project_dir)
+        (root / "a.py").write_text("a = 1\n")
+        (root / "b.py").write_text("b = 1\n")
+        output = os.path.join(state_dir, "out.jsonl")
+
+        def run(*extra):
+            main(["analyze", project_dir, "-j", "1", "--format", "jsonl", "-o", output,
+                  "--index", os.path.join(state_dir, "mtimes.json"),
+                  "--cache-dir", os.path.join(state_dir, "cache"), *extra])
+            with open(output, encoding="utf-8") as f:
+                return {Path(json.loads(line)["filepath"]).name: json.loads(line)["error"] for line in f}
+
+        assert run() == {"a.py": None, "b.py": None}
+        (root / "b.py").write_text("def invalid_syntax:")
+        # a.py is unchanged but still reported
+        found = run()
+        assert set(found) == {"a.py", "b.py"} and "SyntaxError" in found["b.py"]
+
+        (root / "a.py").write_text("a = 2\n")
+        assert list(run("--no-cache")) == ["a.py"]
@@ -0,0 +1,116 @@
+"""
+Unit tests for the analysis daemon.
+"""
+
+import os
+import socketserver
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+from pyrefactor.daemon import AnalysisServer, DaemonClient
+
+pytestmark = pytest.mark.skipif(
+    not hasattr(socketserver, "ThreadingUnixStreamServer"), reason="requires Unix domain sockets"
+)
+
+SOURCE = """
+def get_squares(numbers):
+    squares = []
+    for num in numbers:
+        squares.append(num * num)
+    return squares
+"""
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    path = str(tmp_path / "pyrefactor.sock")
+    server = AnalysisServer(path)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield path
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def test_analyze_source_uses_warm_cache(socket_path):
+    with DaemonClient(socket_path) as client:
+        first = client.analyze_source(SOURCE)
+        second = client.analyze_source(SOURCE)
+        stats = client.request("stats")
+
+    assert first == second
+    assert first["issues"][0]["issue_type"] == "list_comprehension"
+    assert stats["hits"] == 1 and stats["misses"] == 1
+
+
+def test_analyze_path_and_generate_tests(socket_path, tmp_path):
+    module = tmp_path / "squares.py"
+    module.write_text(SOURCE)
+    (tmp_path / "broken.py").write_text("def invalid_syntax:")
+
+    with DaemonClient(socket_path) as client:
+        assert client.analyze_path(module)["issues"]
+        assert "SyntaxError" in client.analyze_path(tmp_path / "broken.py")["error"]
+        assert str(module) in client.analyze_path(tmp_path)
+        assert "def test_get_squares" in client.generate_tests(SOURCE, "squares")
+
+        with pytest.raises(RuntimeError):
+            client.request("no_such_op")
+
+
+def test_edited_buffer_reuses_unchanged_definitions(socket_path):
+    edited = "import os\n" + SOURCE + "\ndef other():\n    return 1\n"
+
+    with DaemonClient(socket_path) as client:
+        client.analyze_source(SOURCE)
+        result = client.analyze_source(edited)
+        stats = client.request("stats")
+
+    assert result["issues"][0]["line_number"] == 5
+    assert stats["segment_hits"] == 0  # the new import invalidates definitions
+    with DaemonClient(socket_path) as client:
+        client.analyze_source(edited + "\nx = 1\n")
+        assert client.request("stats")["segment_hits"] == 3
+
+
+def test_server_only_replaces_stale_sockets(socket_path, tmp_path):
+    import errno
+    import socket
+
+    # A daemon is listening on socket_path
+    with pytest.raises(OSError) as raised:
+        AnalysisServer(socket_path)
+    assert raised.value.errno == errno.EADDRINUSE
+
+    regular = tmp_path / "not-a-socket"
+    regular.write_text("keep me")
+    with pytest.raises(FileExistsError):
+        AnalysisServer(str(regular))
+    assert regular.read_text() == "keep me"
+
+    stale = str(tmp_path / "stale.sock")
+    leftover = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    leftover.bind(stale)
+    leftover.close()
+    server = AnalysisServer(stale)
+    server.server_close()
+
+
+def test_socket_is_private_to_its_user(tmp_path):
+    import stat
+
+    umask = os.umask(0)
+    try:
+        server = AnalysisServer(str(tmp_path / "private.sock"))
+    finally:
+        os.umask(umask)
+    try:
+        assert stat.S_IMODE(os.stat(server.socket_path).st_mode) == 0o600
+    finally:
+        server.server_close()
@@ -0,0 +1,98 @@
+"""
+Unit tests for scandir-based file discovery.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+from pyrefactor.discovery import FileDiscovery, IgnoreRules
+
+
+def _touch(root: Path, *relpaths: str):
+    for relpath in relpaths:
+        path = root / relpath
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("x = 1\n")
+
+
+def _discover(root: Path, **kwargs):
+    return sorted(str(path.relative_to(root)) for path in FileDiscovery(root, **kwargs))
+
+
+def test_ignore_rules():
+    rules = IgnoreRules([
+        "# comment",
+        "*.gen.py",
+        "/build/",
+        "docs/**/conf.py",
+        "!keep.gen.py",
+    ])
+
+    assert rules.match("a/b/module.gen.py", False) is True
+    assert rules.match("keep.gen.py", False) is False
+    assert rules.match("build", True) is True
+    assert rules.match("src/build", True) is None
+    assert rules.match("build", False) is None
+    assert rules.match("docs/a/b/conf.py", False) is True
+    assert rules.match("docs/conf.py", False) is True
+    assert rules.match("module.py", False) is None
+
+
+def test_gitignore_and_exclude_patterns(tmp_path):
+    _touch(
+        tmp_path,
+        "pkg/module.py",
+        "pkg/schema_pb2.py",
+        "pkg/sub/keep_pb2.py",
+        "vendor/lib.py",
+        "generated/out.py",
+        "project.egg-info/setup.py",
+        "notes.txt",
+    )
+    (tmp_path / ".gitignore").write_text("vendor/\n*_pb2.py\n")
+    (tmp_path / "pkg" / "sub" / ".gitignore").write_text("!keep_pb2.py\n")
+
+    found = _discover(tmp_path, exclude_dirs=["generated", "*.egg-info"])
+    assert found == ["pkg/module.py", "pkg/sub/keep_pb2.py"]
+
+    found = _discover(tmp_path, respect_gitignore=False)
+    assert "vendor/lib.py" in found and "pkg/schema_pb2.py" in found
+
+
+def test_ignored_directories_are_pruned(tmp_path, monkeypatch):
+    _touch(tmp_path, "src/app.py", "node_modules/deep/x.py")
+    (tmp_path / ".gitignore").write_text("node_modules/\n")
+
+    scanned = []
+    real_scandir = os.scandir
+
+    def recording_scandir(path):
+        scanned.append(Path(path).name)
+        return real_scandir(path)
+
+    monkeypatch.setattr(os, "scandir", recording_scandir)
+    assert _discover(tmp_path) == ["src/app.py"]
+    assert "node_modules" not in scanned and "deep" not in scanned
+
+
+def test_discovery_is_lazy(tmp_path):
+    _touch(tmp_path, "a.py", "b/c.py")
+
+    walker = iter(FileDiscovery(tmp_path))
+    assert next(walker).name == "a.py"
+    assert next(walker).name == "c.py"
+
+
+def test_includes_matches_walk(tmp_path):
+    _touch(tmp_path, "a.py", "gen/b.py", "pkg/c.py", "pkg/skip.py", "venv/d.py")
+    (tmp_path / ".gitignore").write_text("gen/\n")
+    (tmp_path / "pkg" / ".gitignore").write_text("skip.py\n")
+    discovery = FileDiscovery(tmp_path, exclude_dirs=["venv"])
+
+    walked = set(discovery)
+    for relpath in ("a.py", "gen/b.py", "pkg/c.py", "pkg/skip.py", "venv/d.py"):
+        assert discovery.includes(tmp_path / relpath) == ((tmp_path / relpath) in walked)
+    assert not discovery.includes(tmp_path / "notes.txt")
+    assert set(discovery.directories()) == {tmp_path, tmp_path / "pkg"}
@@ -0,0 +1,104 @@
+"""
+Unit tests for the single-pass rule engine.
+"""
+
+import ast
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+from pyrefactor.engine import Rule, RuleEngine
+from pyrefactor.visitors import ComplexityVisitor, CodeSmellVisitor, OptimizationVisitor
+
+
+class CountingRule(Rule):
+    def __init__(self):
+        super().__init__()
+        self.entered = []
+        self.left = []
+
+    def enter_For(self, node):
+        self.entered.append(node.lineno)
+
+    def leave_For(self, node):
+        self.left.append(node.lineno)
+
+
+def test_rules_share_one_traversal():
+    source = """
+for i in range(3):
+    for j in range(3):
+        pass
+"""
+    tree = ast.parse(source)
+    first, second = CountingRule(), CountingRule()
+    RuleEngine([first, second]).run(tree)
+
+    assert first.entered == second.entered == [2, 3]
+    assert first.left == [3, 2]
+
+
+def test_engine_collects_issues_in_rule_order():
+    source = """
+def build(matrix):
+    out = []
+    for row in matrix:
+        for col in row:
+            for cell in col:
+                out.append(cell)
+    return out
+"""
+    tree = ast.parse(source)
+    engine = RuleEngine([ComplexityVisitor(threshold=2), CodeSmellVisitor(), OptimizationVisitor()])
+    engine.run(tree, source)
+
+    issue_types = [issue.issue_type for issue in engine.issues]
+    assert issue_types == ["high_complexity", "nested_loops", "list_comprehension"]
+    assert engine.issues[0].original_code.startswith("def build(matrix):")
+
+
+def test_invalid_handler_name():
+    class BrokenRule(Rule):
+        def enter_NotANode(self, node):
+            pass
+
+    with pytest.raises(TypeError):
+        RuleEngine([BrokenRule()])
+
+
+def _recording_rule():
+    """A rule with enter/leave handlers for every concrete node type."""
+    events = []
+    namespace = {}
+    for name in dir(ast):
+        node_type = getattr(ast, name)
+        if isinstance(node_type, type) and issubclass(node_type, ast.AST) and node_type._fields is not None:
+            namespace[f"enter_{name}"] = lambda self, node: events.append(("enter", node))
+            namespace[f"leave_{name}"] = lambda self, node: events.append(("leave", node))
+    return type("Recorder", (Rule,), namespace)(), events
+
+
+def test_traversal_order_matches_recursive_walk():
+    def recursive(node, events):
+        events.append(("enter", node))
+        for child in ast.iter_child_nodes(node):
+            recursive(child, events)
+        events.append(("leave", node))
+
+    tree = ast.parse(Path(__file__).read_text())
+    expected = []
+    recursive(tree, expected)
+
+    rule, events = _recording_rule()
+    rule.visit(tree)
+
+    assert [(kind, id(node)) for kind, node in events] == [(kind, id(node)) for kind, node in expected]
+
+
+def test_deep_trees_do_not_hit_the_recursion_limit():
+    tree = ast.parse("x = " + " + ".join(["a"] * (sys.getrecursionlimit() + 500)))
+    rule, events = _recording_rule()
+    rule.visit(tree)
+    assert len(events) == 2 * sum(1 for _ in ast.walk(tree))
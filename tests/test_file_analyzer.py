@@ -11,6 +11,11 @@ sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
 from pyrefactor.file_analyzer import ProjectAnalyzer, FileAnalysis
 
 
+def _as_dicts(results):
+    """Results as plain data, comparing issues by their text rather than how it is held."""
+    return {path: ([issue.to_dict() for issue in analysis.issues], analysis.error) for path, analysis in results.items()}
+
+
 def create_temp_file(content: str) -> Path:
     """Helper function to create a temporary Python file with given content."""
     fd, path = tempfile.mkstemp(suffix='.py')
@@ -155,3 +160,152 @@ def simple_function():
         assert str(temp_file) in report
     finally:
         temp_file.unlink()
+
+
+def test_parallel_matches_serial():
+    project_dir = Path(tempfile.mkdtemp())
+    sources = {
+        "loops.py": "def f(xs):\n    out = []\n    for x in xs:\n        out.append(x)\n    return out\n",
+        "broken.py": "def invalid_syntax:",
+        "empty.py": "",
+    }
+    for index in range(6):
+        sources[f"mod_{index}.py"] = "x = 1\n" * (index * 50)
+    try:
+        for name, content in sources.items():
+            (project_dir / name).write_text(content)
+
+        serial = ProjectAnalyzer(str(project_dir), jobs=1).analyze_project()
+        parallel = ProjectAnalyzer(str(project_dir), jobs=2).analyze_project()
+
+        assert list(parallel) == list(serial)
+        assert _as_dicts(parallel) == _as_dicts(serial)
+        assert "SyntaxError" in parallel[str(project_dir / "broken.py")].error
+        assert parallel[str(project_dir / "loops.py")].issues
+    finally:
+        for name in sources:
+            (project_dir / name).unlink()
+        project_dir.rmdir()
+
+
+def test_iter_project_streams_every_file():
+    project_dir = Path(tempfile.mkdtemp())
+    names = [f"mod_{index}.py" for index in range(20)]
+    try:
+        for name in names:
+            (project_dir / name).write_text("for x in xs:\n    out.append(x)\n")
+
+        analyzer = ProjectAnalyzer(str(project_dir), jobs=2)
+        streamed = list(analyzer.iter_project(max_in_flight=1))
+
+        assert sorted(analysis.filepath.name for analysis in streamed) == sorted(names)
+        assert all(analysis.issues for analysis in streamed)
+    finally:
+        for name in names:
+            (project_dir / name).unlink()
+        project_dir.rmdir()
+
+
+def test_aiter_project():
+    import asyncio
+
+    project_dir = Path(tempfile.mkdtemp())
+    names = ["a.py", "b.py", "broken.py"]
+    try:
+        for name in names:
+            (project_dir / name).write_text("def invalid_syntax:" if name == "broken.py" else "x = 1\n")
+
+        async def collect():
+            return [analysis async for analysis in ProjectAnalyzer(str(project_dir), jobs=1).aiter_project()]
+
+        streamed = {analysis.filepath.name: analysis for analysis in asyncio.run(collect())}
+
+        assert sorted(streamed) == names
+        assert "SyntaxError" in streamed["broken.py"].error
+    finally:
+        for name in names:
+            (project_dir / name).unlink()
+        project_dir.rmdir()
+
+
+def test_aiter_project_schedules_like_iter_project():
+    import asyncio
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    project_dir = Path(tempfile.mkdtemp())
+    names = [f"mod_{index}.py" for index in range(20)]
+    try:
+        for name in names:
+            (project_dir / name).write_text("x = 1\n" * 100)
+
+        analyzer = ProjectAnalyzer(str(project_dir), jobs=2, memory_budget=1, profile=True)
+        analyzer._executor = lambda: ThreadPoolExecutor(max_workers=2)
+        lock = threading.Lock()
+        running = [0, 0]  # current, peak
+        analyze_chunk = analyzer._analyze_chunk
+
+        def counting_chunk(filepaths):
+            with lock:
+                running[0] += 1
+                running[1] = max(running)
+            try:
+                return analyze_chunk(filepaths)
+            finally:
+                with lock:
+                    running[0] -= 1
+
+        analyzer._analyze_chunk = counting_chunk
+
+        async def collect():
+            return [analysis async for analysis in analyzer.aiter_project()]
+
+        streamed = asyncio.run(collect())
+
+        assert sorted(analysis.filepath.name for analysis in streamed) == sorted(names)
+        # The memory budget holds back batches, as for iter_project()
+        assert running[1] == 1
+        # Per-file stats of the workers are merged, as by iter_project()
+        assert len(analyzer.stats.files) == len(names)
+    finally:
+        for name in names:
+            (project_dir / name).unlink()
+        project_dir.rmdir()
+
+
+def test_memory_budget_applies_back_pressure():
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    project_dir = Path(tempfile.mkdtemp())
+    names = [f"mod_{index}.py" for index in range(8)]
+    try:
+        for name in names:
+            (project_dir / name).write_text("x = 1\n" * 100)
+
+        analyzer = ProjectAnalyzer(str(project_dir), jobs=4, memory_budget=1)
+        analyzer._executor = lambda: ThreadPoolExecutor(max_workers=4)
+        lock = threading.Lock()
+        running = [0, 0]  # current, peak
+        analyze_chunk = analyzer._analyze_chunk
+
+        def counting_chunk(filepaths):
+            with lock:
+                running[0] += 1
+                running[1] = max(running)
+            try:
+                return analyze_chunk(filepaths)
+            finally:
+                with lock:
+                    running[0] -= 1
+
+        analyzer._analyze_chunk = counting_chunk
+        results = analyzer.analyze_project()
+
+        assert len(results) == len(names)
+        # Every batch exceeds the budget on its own, so they run one by one.
+        assert running[1] == 1
+    finally:
+        for name in names:
+            (project_dir / name).unlink()
+        project_dir.rmdir()
@@ -0,0 +1,84 @@
+"""
+Unit tests for function-level incremental analysis.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+from pyrefactor.analyzer import CodeAnalyzer
+from pyrefactor.engine import Rule
+from pyrefactor.incremental import SegmentCache, split_segments
+from pyrefactor.models import CodeIssue
+
+SOURCE = """import os
+
+def squares(numbers):
+    result = []
+    for n in numbers:
+        result.append(n * n)
+    return result
+
+TOTAL = 0
+for a in range(2):
+    for b in range(2):
+        for c in range(2):
+            TOTAL += 1
+
+@staticmethod
+def cube(xs):
+    out = []
+    for x in xs:
+        out.append(x ** 3)
+    return out
+"""
+
+
+def _summary(issues):
+    return [(issue.line_number, issue.issue_type, issue.original_code, issue.optimized_code) for issue in issues]
+
+
+def _full(source):
+    return _summary(CodeAnalyzer(source).analyze())
+
+
+def test_segments_cover_top_level_statements():
+    import ast
+
+    segments = split_segments(ast.parse(SOURCE))
+    assert [(segment.start_line, segment.end_line) for segment in segments] == [
+        (1, 1), (3, 7), (9, 13), (15, 20)
+    ]
+
+
+def test_incremental_matches_full_analysis_after_edits():
+    cache = SegmentCache()
+    assert _summary(CodeAnalyzer(SOURCE, segment_cache=cache).analyze()) == _full(SOURCE)
+    assert cache.hits == 0
+
+    # Shift everything down and edit one definition.
+    edited = "# header\n\n" + SOURCE.replace("out.append(x ** 3)", "out.append(x ** 4)")
+    issues = CodeAnalyzer(edited, segment_cache=cache).analyze()
+
+    assert _summary(issues) == _full(edited)
+    assert cache.hits == 3  # only the edited definition was walked again
+    assert issues[0].span.source.text == edited
+
+
+def test_import_changes_invalidate_definitions():
+    cache = SegmentCache()
+    CodeAnalyzer(SOURCE, segment_cache=cache).analyze()
+    CodeAnalyzer(SOURCE.replace("import os", "import sys"), segment_cache=cache).analyze()
+    assert cache.hits == 0
+
+
+def test_module_scoped_rules_always_run():
+    class CountModules(Rule):
+        def enter_Module(self, node):
+            self.issues.append(CodeIssue(1, "module", "", "", ""))
+
+    cache = SegmentCache()
+    for _ in range(2):
+        rules = [CountModules()]
+        issues = CodeAnalyzer(SOURCE, rules=rules, segment_cache=cache).analyze()
+        assert [issue.issue_type for issue in issues] == ["module"]
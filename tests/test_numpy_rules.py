@@ -0,0 +1,100 @@
+"""
+Unit tests for the NumPy vectorization rules.
+"""
+
+import ast
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+from pyrefactor.numpy_rules import NumpyVectorizationVisitor
+
+LOOPS = """
+def compute(a, b, c, out, matrix, result):
+    for i in range(len(a)):
+        out[i] = a[i] * b[i] + c
+    total = 0
+    for i in range(len(a)):
+        if a[i] > 0 and b[i] > 0:
+            total += a[i] * b[i]
+    for i in range(len(a)):
+        if a[i] > total:
+            total = a[i]
+    for i in range(len(a)):
+        if a[i] < 0:
+            out[i] = 0
+    for i in range(len(matrix)):
+        for j in range(len(matrix[i])):
+            for k in range(len(matrix[i][j])):
+                result.append(matrix[i][j][k])
+    for i in range(1, len(a)):
+        out[i] = out[i - 1] + a[i]
+    return total
+"""
+
+
+def _issues(source):
+    visitor = NumpyVectorizationVisitor()
+    visitor.visit(ast.parse(source), source)
+    return visitor.issues
+
+
+def test_vectorizes_index_loops_when_numpy_is_imported():
+    issues = _issues("import numpy as xp\n" + LOOPS)
+
+    found = [(issue.line_number, issue.optimized_code) for issue in issues]
+    assert found == [
+        (4, "out[:] = a * b + c"),
+        (7, "total += xp.sum(xp.where((a > 0) & (b > 0), a * b, 0))"),
+        (10, "total = xp.max(a, initial=total)"),
+        (13, "out[a < 0] = 0"),
+        # The nest is reported once, at its outer loop
+        (16, "result.extend(xp.ravel(matrix).tolist())"),
+    ]
+    # The prefix sum depends on the previous element and is left alone
+    assert all(issue.issue_type == "numpy_vectorization" for issue in issues)
+
+
+def test_needs_numpy_import_or_ndarray_annotation():
+    assert _issues(LOOPS) == []
+
+    source = """
+from numpy import ndarray
+
+def scale(a: ndarray, factor):
+    for i in range(a.shape[0]):
+        a[i] = a[i] * factor if a[i] > 0 else 0
+"""
+    # 'from numpy import ...' counts as importing numpy; the suggestion uses np
+    issues = _issues(source)
+    assert [issue.optimized_code for issue in issues] == ["a[:] = np.where(a > 0, a * factor, 0)"]
+
+    source = """
+def scale(values, weights: "np.ndarray"):
+    for i in range(len(values)):
+        values[i] = weights[i] * 2
+    for i in range(len(values)):
+        values[i] = values[i] * 2
+"""
+    # Only the loop that reads the annotated array
+    issues = _issues(source)
+    assert [issue.optimized_code for issue in issues] == ["values[:] = weights * 2"]
+    assert "import numpy as np" in issues[0].suggestion
+
+
+def test_numpy_reductions_are_not_element_wise():
+    source = """
+import numpy as np
+
+def rows(m, out):
+    for i in range(len(m)):
+        out[i] = np.sum(m[i])
+    for i in range(len(m)):
+        out[i] = np.linalg.norm(m[i])
+    for i in range(len(m)):
+        out[i] = np.sqrt(m[i]) + np.mean(m)
+    for i in range(len(m)):
+        out[i] = np.sqrt(m[i])
+"""
+    # Only ufuncs are vectorized; np.mean is rejected even where it does not read m[i]
+    assert [issue.optimized_code for issue in _issues(source)] == ["out[:] = np.sqrt(m)"]
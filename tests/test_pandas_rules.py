@@ -0,0 +1,112 @@
+"""
+Unit tests for the pandas anti-pattern rules.
+"""
+
+import ast
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+from pyrefactor.pandas_rules import PandasVisitor
+
+SOURCE = """
+import numpy
+import pandas as pd
+
+def enrich(df, paths, out):
+    for idx, row in df.iterrows():
+        if row["price"] > 100 and row["qty"] > 0:
+            df.at[idx, "tier"] = "high"
+        else:
+            df.at[idx, "tier"] = "low"
+    for row in df.itertuples():
+        if row.qty > 0:
+            out.append(row.price / row.qty)
+    for idx, row in df.iterrows():
+        print(idx, row["price"])
+    df["score"] = df.apply(lambda r: r["a"] * 2 if r["b"] > 0 else 0, axis=1)
+    df["other"] = df.apply(score, axis=1)
+    merged = pd.DataFrame()
+    for path in paths:
+        merged = pd.concat([merged, pd.read_csv(path)], ignore_index=True)
+    df["a"][df["b"] > 0] = 1
+    matrix = [[0]]
+    matrix[0][0] = 1
+"""
+
+
+def _issues(source):
+    visitor = PandasVisitor()
+    visitor.visit(ast.parse(source), source)
+    return visitor.issues
+
+
+def test_pandas_anti_patterns():
+    found = [(issue.line_number, issue.issue_type, issue.optimized_code) for issue in _issues(SOURCE)]
+    assert found == [
+        (6, "pandas_row_iteration",
+         "df['tier'] = numpy.where((df['price'] > 100) & (df['qty'] > 0), 'high', 'low')"),
+        (11, "pandas_row_iteration", "out.extend((df['price'] / df['qty'])[df['qty'] > 0].tolist())"),
+        # Not vectorizable, but itertuples() is much cheaper than iterrows()
+        (14, "pandas_row_iteration",
+         "for row in df.itertuples():\n    idx = row.Index\n    print(idx, row.price)"),
+        (16, "pandas_row_apply", "numpy.where(df['b'] > 0, df['a'] * 2, 0)"),
+        (17, "pandas_row_apply", None),
+        (20, "pandas_concat_in_loop",
+         "merged_frames = [merged]\nfor path in paths:\n    merged_frames.append(pd.read_csv(path))\n"
+         "merged = pd.concat(merged_frames, ignore_index=True)"),
+        (21, "pandas_chained_assignment", "df.loc[df['b'] > 0, 'a'] = 1"),
+    ]
+
+
+def test_requires_pandas_import():
+    assert _issues(SOURCE.replace("import pandas as pd\n", "")) == []
+
+    source = """
+from pandas import concat
+
+def load(frames, frame):
+    for extra in frames:
+        frame = concat([frame, extra])
+"""
+    issues = _issues(source)
+    assert [issue.issue_type for issue in issues] == ["pandas_concat_in_loop"]
+    assert issues[0].optimized_code.endswith("frame = concat(frame_frames)")
+
+
+def test_chained_assignment_needs_a_known_frame():
+    source = """
+import pandas as pd
+
+def count(stats, config, df, path, frame: pd.DataFrame):
+    stats["x"]["count"] = len(df)
+    config["db"]["host"] = "x"
+    loaded = pd.read_csv(path)
+    loaded["a"][loaded["b"] > 0] = 1
+    frame["a"][0] = 1
+    df["a"][0] = 1
+    df["label"] = df.apply(lambda r: r.name + r.suffix, axis=1)
+"""
+    found = [(issue.line_number, issue.optimized_code) for issue in _issues(source)]
+    assert found == [
+        (8, "loaded.loc[loaded['b'] > 0, 'a'] = 1"),
+        (9, "frame.loc[0, 'a'] = 1"),
+        # df is a frame since apply() is called on it; r.name is the row label, so no rewrite
+        (10, "df.loc[0, 'a'] = 1"),
+        (11, None),
+    ]
+
+
+def test_append_growth_needs_a_known_frame():
+    source = """
+import pandas as pd
+
+def collect(rows, log, paths):
+    frame = pd.DataFrame()
+    for row in rows:
+        log = log.append(row)
+        frame = frame.append(row)
+"""
+    found = [(issue.line_number, issue.issue_type) for issue in _issues(source)]
+    # 'log' might be anything with an append() returning a new object
+    assert found == [(8, "pandas_concat_in_loop")]
@@ -0,0 +1,55 @@
+"""
+Unit tests for the opt-in profiling hooks.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+from pyrefactor.analyzer import CodeAnalyzer
+from pyrefactor.file_analyzer import ProjectAnalyzer
+from pyrefactor.profiling import AnalysisStats
+
+SOURCE = """
+def get_squares(numbers):
+    squares = []
+    for num in numbers:
+        squares.append(num * num)
+    return squares
+"""
+
+
+def test_code_analyzer_records_phases_and_rules():
+    stats = AnalysisStats(trace_memory=True)
+    CodeAnalyzer(SOURCE, stats=stats).analyze()
+
+    assert set(stats.phases) == {"parse", "traverse"}
+    assert {"ComplexityVisitor", "CodeSmellVisitor", "OptimizationVisitor"} <= set(stats.rules)
+    assert stats.rules["OptimizationVisitor"].calls > 0
+    assert stats.phases["traverse"].seconds >= stats.rules["OptimizationVisitor"].seconds
+
+
+def test_project_stats_are_merged_from_workers(tmp_path):
+    for index in range(4):
+        (tmp_path / f"mod_{index}.py").write_text(SOURCE)
+
+    analyzer = ProjectAnalyzer(str(tmp_path), jobs=2, profile=True)
+    results = analyzer.analyze_project()
+
+    assert len(analyzer.stats.files) == 4
+    assert analyzer.stats.phases["read"].calls == 4
+    assert analyzer.stats.phases["parse"].calls == 4
+
+    report = analyzer.generate_report(results, stats=analyzer.stats)
+    assert "## Performance Profile" in report
+    assert "OptimizationVisitor" in report
+
+
+def test_profiling_is_off_by_default(tmp_path):
+    (tmp_path / "module.py").write_text(SOURCE)
+
+    analyzer = ProjectAnalyzer(str(tmp_path), jobs=1)
+    results = analyzer.analyze_project()
+
+    assert analyzer.stats is None
+    assert results[str(tmp_path / "module.py")].stats is None
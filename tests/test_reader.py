@@ -0,0 +1,58 @@
+"""
+Unit tests for bytes-level source reading and prefetching.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+from pyrefactor.file_analyzer import ProjectAnalyzer
+from pyrefactor.reader import prefetch, read_source
+
+LATIN1_SOURCE = """# -*- coding: latin-1 -*-
+def greet(names):
+    out = []
+    for name in names:
+        out.append("h\xe9llo " + name)
+    return out
+"""
+
+
+def test_encoding_cookie_is_honoured(tmp_path):
+    module = tmp_path / "latin.py"
+    module.write_bytes(LATIN1_SOURCE.encode("latin-1"))
+
+    results = ProjectAnalyzer(str(tmp_path), jobs=1).analyze_project()
+    analysis = results[str(module)]
+
+    assert analysis.error is None
+    assert "h\xe9llo" in analysis.issues[0].original_code
+
+
+def test_read_source_returns_raw_bytes(tmp_path):
+    module = tmp_path / "module.py"
+    module.write_bytes(LATIN1_SOURCE.encode("latin-1"))
+    empty = tmp_path / "empty.py"
+    empty.write_bytes(b"")
+
+    assert read_source(module) == module.read_bytes()
+    assert read_source(empty) == b""
+
+
+def test_prefetch_preserves_order_and_errors(tmp_path):
+    paths = []
+    for index in range(20):
+        paths.append(tmp_path / f"mod_{index}.py")
+        paths[-1].write_text(f"x = {index}\n")
+    paths.insert(5, tmp_path / "missing.py")
+
+    seen = []
+    for filepath, pending_read in prefetch(paths, depth=3):
+        try:
+            seen.append((filepath, pending_read.result()))
+        except FileNotFoundError:
+            seen.append((filepath, None))
+
+    assert [filepath for filepath, _ in seen] == paths
+    assert seen[5][1] is None
+    assert seen[0][1] == b"x = 0\n"
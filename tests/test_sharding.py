@@ -0,0 +1,97 @@
+"""
+Unit tests for sharded analysis and merging.
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+sys.path.append(str(SRC))
+from pyrefactor.file_analyzer import ProjectAnalyzer
+from pyrefactor.sharding import merge_shards, parse_shard, partition
+
+LOOP = "def f(xs):\n    out = []\n    for x in xs:\n        out.append(x)\n    return out\n"
+
+
+def _project(root: Path):
+    (root / "pkg").mkdir()
+    for index in range(7):
+        (root / "pkg" / f"mod_{index}.py").write_text(LOOP * (index + 1))
+    (root / "broken.py").write_text("def invalid_syntax:")
+    (root / "empty.py").write_text("")
+
+
+def _pyrefactor(cwd: Path, *args: str):
+    env = dict(os.environ, PYTHONPATH=str(SRC))
+    subprocess.run([sys.executable, "-m", "pyrefactor", *args], cwd=cwd, env=env, check=True,
+                   stdout=subprocess.DEVNULL)
+
+
+def test_parse_shard():
+    assert parse_shard("2/4") == (2, 4)
+    for spec in ("0/4", "5/4", "1", "a/b"):
+        with pytest.raises(ValueError):
+            parse_shard(spec)
+
+
+def test_partition_is_deterministic_and_balanced(tmp_path):
+    _project(tmp_path)
+    files = sorted(tmp_path.rglob("*.py"))
+
+    shards = partition(files, tmp_path, 3)
+
+    assert shards == partition(list(files), tmp_path, 3)
+    assert sorted(position for shard in shards for position in shard) == list(range(len(files)))
+    totals = [sum(files[position].stat().st_size for position in shard) for shard in shards]
+    assert max(totals) - min(totals) <= max(file.stat().st_size for file in files)
+
+
+def test_sharded_runs_merge_into_single_node_report(tmp_path):
+    project = tmp_path / "project"
+    project.mkdir()
+    _project(project)
+
+    for index in (1, 2, 3):
+        _pyrefactor(tmp_path, "analyze", "project", "--no-cache", "-j", "1",
+                    "--shard", f"{index}/3", "-o", f"shard{index}.json")
+    _pyrefactor(tmp_path, "merge", "shard3.json", "shard1.json", "shard2.json", "-o", "merged.md")
+    _pyrefactor(tmp_path, "analyze", "project", "--no-cache", "-j", "1", "-o", "single.md")
+
+    assert (tmp_path / "merged.md").read_text() == (tmp_path / "single.md").read_text()
+
+    root, merged = merge_shards([tmp_path / f"shard{index}.json" for index in (1, 2, 3)], root_path=project)
+    single = ProjectAnalyzer(str(project), jobs=1).analyze_project()
+    assert list(merged) == list(single)
+    assert [len(analysis.issues) for analysis in merged.values()] == \
+        [len(analysis.issues) for analysis in single.values()]
+
+
+def test_merge_rejects_incomplete_shards(tmp_path):
+    _project(tmp_path)
+    analyzer = ProjectAnalyzer(str(tmp_path), jobs=1, shard=(1, 2))
+    analyzer.save_shard(analyzer.analyze_project(), tmp_path / "shard1.json")
+
+    with pytest.raises(ValueError, match="exactly once"):
+        merge_shards([tmp_path / "shard1.json"])
+    with pytest.raises(ValueError, match="exactly once"):
+        merge_shards([tmp_path / "shard1.json", tmp_path / "shard1.json"])
+
+
+def test_merge_shards_from_different_checkouts(tmp_path):
+    for index in (1, 2):
+        checkout = tmp_path / f"checkout{index}"
+        checkout.mkdir()
+        _project(checkout)
+        analyzer = ProjectAnalyzer(str(checkout), jobs=1, shard=(index, 2))
+        analyzer.save_shard(analyzer.analyze_project(), tmp_path / f"shard{index}.json")
+    shards = [tmp_path / "shard1.json", tmp_path / "shard2.json"]
+
+    with pytest.raises(ValueError, match="disagree on root"):
+        merge_shards(shards)
+    root, merged = merge_shards(shards, root_path=tmp_path / "checkout1")
+    assert root == tmp_path / "checkout1"
+    assert all(Path(path).parent in (root, root / "pkg") for path in merged)
@@ -0,0 +1,70 @@
+"""
+Unit tests for the columnar IssueTable.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+from pyrefactor.file_analyzer import ProjectAnalyzer
+from pyrefactor.table import IssueTable
+
+NESTED = """
+def process_matrix(matrix):
+    result = []
+    for i in range(len(matrix)):
+        for j in range(len(matrix[i])):
+            for k in range(len(matrix[i][j])):
+                result.append(matrix[i][j][k])
+    return result
+"""
+
+SQUARES = """
+def get_squares(numbers):
+    squares = []
+    for num in numbers:
+        squares.append(num * num)
+    return squares
+"""
+
+
+def _project(tmp_path):
+    (tmp_path / "nested.py").write_text(NESTED)
+    (tmp_path / "squares.py").write_text(SQUARES)
+    (tmp_path / "broken.py").write_text("def invalid_syntax:")
+    (tmp_path / "empty.py").write_text("")
+    return ProjectAnalyzer(str(tmp_path), jobs=1)
+
+
+def test_rows_round_trip(tmp_path):
+    results = _project(tmp_path).analyze_project()
+    table = IssueTable.from_results(results)
+
+    expected = [issue for analysis in results.values() for issue in analysis.issues]
+    assert list(table) == expected
+    assert len(table) == len(expected)
+    assert table[-1] == expected[-1]
+    assert table.error(tmp_path / "broken.py").startswith("SyntaxError")
+
+
+def test_filter_sort_and_group(tmp_path):
+    table = IssueTable.from_results(_project(tmp_path).analyze_project())
+
+    comprehensions = table.filter(issue_type="list_comprehension")
+    assert {comprehensions.filepath(i) for i in range(len(comprehensions))} == {
+        str(tmp_path / "nested.py"), str(tmp_path / "squares.py")
+    }
+    assert len(table.filter(issue_type="missing")) == 0
+
+    by_line = table.sort("line_number", reverse=True).line_numbers()
+    assert list(by_line) == sorted(by_line, reverse=True)
+
+    assert table.count_by("issue_type") == {"nested_loops": 1, "list_comprehension": 2}
+    assert len(table.group_by("filepath")[str(tmp_path / "nested.py")]) == 2
+
+
+def test_report_from_table_matches_dict(tmp_path):
+    analyzer = _project(tmp_path)
+    results = analyzer.analyze_project()
+
+    assert analyzer.generate_report(analyzer.analyze_project_table()) == analyzer.generate_report(results)
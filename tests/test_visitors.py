@@ -88,3 +88,346 @@ def func2(x, y):
     assert "func1" in function_names
     assert "func2" in function_names
     assert len(function_names) == 2
+
+
+def test_complexity_keys_do_not_reference_nodes():
+    source = """
+class Shape:
+    def area(self):
+        def helper():
+            return 1
+        return helper()
+"""
+    visitor = ComplexityVisitor()
+    visitor.visit(ast.parse(source))
+
+    assert sorted(key.qualname for key in visitor.complexities) == [
+        "Shape.area", "Shape.area.<locals>.helper"
+    ]
+    assert not any(isinstance(field, ast.AST) for key in visitor.complexities for field in key)
+
+
+def test_membership_test_visitor():
+    from pyrefactor.visitors import MembershipTestVisitor
+
+    source = """
+def filter_users(users, banned, lookup: set):
+    allowed = ["alice", "bob"]
+    seen = []
+    for user in users:
+        if user in banned or user in lookup:
+            continue
+        if user.role in ("admin", "root", "staff", "ops") or user in seen:
+            seen.append(user)
+    for group in users:
+        for user in group:
+            if user not in allowed:
+                pass
+"""
+    visitor = MembershipTestVisitor()
+    visitor.visit(ast.parse(source), source)
+
+    found = [(issue.line_number, issue.description.split(" inside")[0]) for issue in visitor.issues]
+    assert found == [
+        (6, "Membership test against parameter 'banned'"),
+        (8, "Membership test against a tuple literal of 4 elements"),
+        (12, "Membership test against list 'allowed'"),
+    ]
+    assert "O(n²·m)" in visitor.issues[2].description
+    # Hoisted above the outer loop, since neither loop changes 'allowed'
+    assert visitor.issues[2].optimized_code.splitlines()[:3] == [
+        "allowed_set = set(allowed)",
+        "for group in users:",
+        "    for user in group:",
+    ]
+    assert "user not in allowed_set" in visitor.issues[2].optimized_code
+    assert "{'admin', 'root', 'staff', 'ops'}" in visitor.issues[1].optimized_code
+
+
+def test_membership_walks_loops_only_for_membership_tests(monkeypatch):
+    import pyrefactor.visitors as visitors
+
+    walked = []
+    monkeypatch.setattr(visitors, "mutated_names", lambda loop: walked.append(loop) or set())
+    source = "def f(data, names):\n" + "".join(
+        "    " * level + f"    for i{level} in data:\n" for level in range(30)
+    ) + "    " * 31 + "found = i0 + 1\n" + "    for i in data:\n        found = i in names\n"
+    visitor = visitors.MembershipTestVisitor()
+    visitor.visit(ast.parse(source), source)
+
+    # Only the loop with a membership test is walked
+    assert [loop.lineno for loop in walked] == [33]
+    assert len(visitor.issues) == 1
+
+
+def test_string_concatenation_in_loop():
+    source = """
+def render(rows, sep):
+    out = ""
+    for row in rows:
+        for cell in row:
+            out += f"{cell}{sep}"
+        out = out + "\\n"
+    return out
+
+def truncated(items):
+    text = "start:"
+    for item in items:
+        if len(text) > 80:
+            break
+        text += str(item)
+    return text
+
+def count(items):
+    total = 0
+    for item in items:
+        total += item
+    return total
+"""
+    visitor = OptimizationVisitor()
+    visitor.visit(ast.parse(source), source)
+
+    issues = [issue for issue in visitor.issues if issue.issue_type == "string_concatenation"]
+    # One finding per loop; 'text' is read inside its loop, 'total' is not a str
+    assert [issue.line_number for issue in issues] == [6]
+    assert issues[0].optimized_code.splitlines() == [
+        "out_parts = [out]",
+        "for row in rows:",
+        "    for cell in row:",
+        "        out_parts.append(f'{cell}{sep}')",
+        "    out_parts.append('\\n')",
+        "out = ''.join(out_parts)",
+    ]
+
+
+def test_loop_invariant_visitor():
+    from pyrefactor.visitors import LoopInvariantVisitor
+
+    source = """
+import re
+from datetime import datetime
+
+def process(self, items, lines):
+    for line in lines:
+        found = re.compile(r"[0-9]+").match(line)
+        self.config.handlers.dispatch(found, len(items))
+        for i in range(len(items)):
+            datetime.strptime("2020", "%Y")
+    while lines:
+        lines.pop(len(lines) - 1)
+    for row in items:
+        row.values.get(1)
+"""
+    visitor = LoopInvariantVisitor()
+    visitor.visit(ast.parse(source), source)
+
+    # One finding for the first loop; 'lines' is mutated and 'row' rebound in the others
+    assert len(visitor.issues) == 1
+    issue = visitor.issues[0]
+    assert issue.line_number == 7
+    assert "'self.config.handlers.dispatch' (O(n) times)" in issue.description
+    assert "'datetime.strptime('2020', '%Y')' (O(n²) times)" in issue.description
+    assert issue.optimized_code.splitlines() == [
+        "pattern = re.compile('[0-9]+')",
+        "dispatch = self.config.handlers.dispatch",
+        "items_len = len(items)",
+        "parsed_time = datetime.strptime('2020', '%Y')",
+        "for line in lines:",
+        "    found = pattern.match(line)",
+        "    dispatch(found, items_len)",
+        "    for i in range(items_len):",
+        "        parsed_time",
+    ]
+
+
+def test_loop_invariant_respects_try_and_existing_names():
+    from pyrefactor.visitors import LoopInvariantVisitor
+
+    source = """
+import numpy as np
+
+def total(self, rows):
+    count = 0
+    for row in rows:
+        try:
+            self.store.client.fetch(row)
+        except KeyError:
+            self.store.client.reset()
+        count += np.sum(row)
+    return count
+"""
+    visitor = LoopInvariantVisitor()
+    visitor.visit(ast.parse(source), source)
+
+    # Only np.sum, from after the try, is hoisted; 'sum' would shadow the builtin
+    assert len(visitor.issues) == 1
+    assert visitor.issues[0].optimized_code.splitlines()[0] == "np_sum = np.sum"
+
+    source = """
+def collect(self, rows, append):
+    for row in rows:
+        try:
+            for item in row:
+                self.items.append(item)
+        except ValueError:
+            pass
+    return append
+"""
+    visitor = LoopInvariantVisitor()
+    visitor.visit(ast.parse(source), source)
+
+    # Hoisted above the loop inside the try, not the outer one; 'append' is a parameter
+    assert visitor.issues[0].optimized_code.splitlines()[:2] == [
+        "self_items_append = self.items.append", "for item in row:",
+    ]
+
+
+def test_loop_invariant_only_hoists_unconditional_expressions():
+    from pyrefactor.visitors import LoopInvariantVisitor
+
+    source = """
+def run(self, xs, use):
+    for x in xs:
+        if self.cfg is not None:
+            use(self.cfg.opts.level)
+        use(x and self.a.b.c)
+        use(self.d.e.f if x else [self.g.h.i for _ in x])
+        if x:
+            continue
+        use(self.j.k.l)
+    for x in xs:
+        if self.cfg.opts.level:
+            for y in x:
+                use(self.m.n.o)
+"""
+    visitor = LoopInvariantVisitor()
+    visitor.visit(ast.parse(source), source)
+
+    # Nothing from the first loop; the inner loop of the second runs only under the if
+    assert [issue.optimized_code.splitlines()[:2] for issue in visitor.issues] == [
+        ["o = self.m.n.o", "for y in x:"],
+        ["level = self.cfg.opts.level", "for x in xs:"],
+    ]
+
+
+def test_loop_invariant_walks_loops_only_for_candidates(monkeypatch):
+    import pyrefactor.visitors as visitors
+
+    walked = []
+    monkeypatch.setattr(visitors, "rebound_paths", lambda loop: walked.append(loop) or set())
+    source = "def f(data):\n" + "".join(
+        "    " * level + f"    for i{level} in data:\n" for level in range(30)
+    ) + "    " * 31 + "total = i0\n"
+    visitor = visitors.LoopInvariantVisitor()
+    visitor.visit(ast.parse(source), source)
+
+    assert walked == []
+
+
+def test_memoization_visitor():
+    from pyrefactor.visitors import MemoizationVisitor
+
+    source = """
+import math
+
+def fib(n):
+    if n < 2:
+        return n
+    return fib(n - 1) + fib(n - 2)
+
+def depth(n):
+    return 0 if n == 0 else depth(n - 1) + 1
+
+def paths(grid: list, r, c):
+    if r == 0 or c == 0:
+        return 1
+    return paths(grid, r - 1, c) + paths(grid, r, c - 1)
+
+def noisy(n):
+    print(n)
+    return n if n < 2 else noisy(n - 1) + noisy(n - 2)
+
+def calls_noisy(n):
+    return noisy(n) if n < 2 else calls_noisy(n - 1) + calls_noisy(n - 2)
+
+def weight(kind):
+    return math.sqrt(len(kind))
+
+def total(items):
+    s = 0
+    for item in items:
+        s += weight("heavy") * item
+    return s + weight("light") + weight("light")
+"""
+    visitor = MemoizationVisitor()
+    visitor.visit(ast.parse(source), source)
+
+    # Not depth (linear recursion), noisy (I/O) or calls_noisy (calls an impure function)
+    assert [issue.line_number for issue in visitor.issues] == [4, 12, 24]
+    fib, paths, weight = visitor.issues
+    assert "calls itself up to 2 times per call" in fib.description
+    assert fib.optimized_code.splitlines()[:2] == ["@functools.lru_cache(maxsize=None)", "def fib(n):"]
+    assert "import functools" in fib.suggestion
+    assert "Warning: 'grid' may be unhashable" in paths.suggestion
+    assert weight.description == (
+        "Function 'weight' looks pure and is called with the same constant arguments inside a loop "
+        "(weight('heavy'), line 30); it is called with the same constant arguments at 2 call sites "
+        "(weight('light'), line 31)"
+    )
+
+
+def test_memoization_skips_mutable_results_and_argumentless_calls():
+    from pyrefactor.visitors import MemoizationVisitor
+
+    source = """
+class Node:
+    pass
+
+def make():
+    return Node()
+
+def make_named(name):
+    node = Node()
+    return node
+
+def label(name):
+    text = name.upper()
+    return text
+
+def build(names):
+    nodes = []
+    for name in names:
+        nodes.append(make())
+        nodes.append(make_named("leaf"))
+        nodes.append(label("leaf"))
+    return nodes
+"""
+    visitor = MemoizationVisitor()
+    visitor.visit(ast.parse(source), source)
+
+    # make() takes no arguments, make_named() returns a new object and label() a method call result
+    assert visitor.issues == []
+
+    source = """
+def scale(name):
+    factor = len(name) * 2
+    return factor, name
+
+def run(items):
+    for item in items:
+        item.total = scale("leaf")
+"""
+    visitor = MemoizationVisitor()
+    visitor.visit(ast.parse(source), source)
+    assert [issue.line_number for issue in visitor.issues] == [2]
+
+
+def test_memoization_handles_deeply_nested_expressions():
+    from pyrefactor.visitors import MemoizationVisitor
+
+    source = "def f(n):\n    return 1 if n < 2 else " + " + ".join(["f(n - 1)"] * 1400) + "\n"
+    visitor = MemoizationVisitor()
+    visitor.visit(ast.parse(source), source)
+
+    assert "calls itself up to 1400 times per call" in visitor.issues[0].description
+    assert visitor.issues[0].optimized_code.startswith("@functools.lru_cache(maxsize=None)\ndef f(n):")
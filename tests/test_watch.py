@@ -0,0 +1,67 @@
+"""
+Unit tests for watch mode.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+from pyrefactor.file_analyzer import ProjectAnalyzer
+from pyrefactor.watch import InotifyBackend, ProjectWatcher
+
+APPEND_LOOP = """
+def get_squares(numbers):
+    squares = []
+    for num in numbers:
+        squares.append(num * num)
+    return squares
+"""
+
+
+def _poll_until(watcher, predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        update = watcher.poll(timeout=0.05)
+        if update is not None and predicate(update):
+            return update
+    raise AssertionError("expected update did not arrive")
+
+
+@pytest.mark.parametrize("use_inotify", [False, True])
+def test_watcher_reanalyzes_only_changed_files(tmp_path, monkeypatch, use_inotify):
+    if use_inotify:
+        try:
+            InotifyBackend(None).close()
+        except OSError:
+            pytest.skip("inotify is not available")
+
+    (tmp_path / "clean.py").write_text("x = 1\n")
+    (tmp_path / "module.py").write_text("y = 2\n")
+    analyzer = ProjectAnalyzer(str(tmp_path), jobs=1)
+    watcher = ProjectWatcher(analyzer, debounce=0.05, poll_interval=0.05, use_inotify=use_inotify)
+
+    with watcher:
+        assert isinstance(watcher.backend, InotifyBackend) == use_inotify
+        assert all(not analysis.issues for analysis in watcher.results.values())
+
+        analyzed_files = []
+        original = analyzer.analyze_files
+        monkeypatch.setattr(analyzer, "analyze_files",
+                            lambda files: analyzed_files.extend(files) or original(files))
+
+        (tmp_path / "module.py").write_text(APPEND_LOOP)
+        update = _poll_until(watcher, lambda update: update.analyzed)
+        assert list(update.analyzed) == [str(tmp_path / "module.py")]
+        assert analyzed_files == [tmp_path / "module.py"]
+        assert watcher.results[str(tmp_path / "module.py")].issues[0].issue_type == "list_comprehension"
+
+        (tmp_path / "new.py").write_text("z = 3\n")
+        (tmp_path / "clean.py").unlink()
+        _poll_until(watcher, lambda update: str(tmp_path / "new.py") in watcher.results
+                    and str(tmp_path / "clean.py") not in watcher.results)
+        assert sorted(watcher.results) == [str(tmp_path / "module.py"), str(tmp_path / "new.py")]
+
+        assert watcher.report == analyzer.generate_report(watcher.results)
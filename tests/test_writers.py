@@ -0,0 +1,95 @@
+"""
+Unit tests for the streaming JSON Lines and SARIF writers.
+"""
+
+import io
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+from pyrefactor.file_analyzer import ProjectAnalyzer
+from pyrefactor.writers import write_results
+
+APPEND_LOOP = """
+def get_squares(numbers):
+    squares = []
+    for num in numbers:
+        squares.append(num * num)
+    return squares
+"""
+
+
+@pytest.fixture
+def project(tmp_path):
+    (tmp_path / "squares.py").write_text(APPEND_LOOP)
+    (tmp_path / "broken.py").write_text("def f(:\n")
+    return tmp_path
+
+
+def test_jsonl_writes_one_line_per_file(project):
+    analyzer = ProjectAnalyzer(str(project), jobs=1)
+    stream = io.StringIO()
+
+    assert write_results(analyzer.iter_project(), stream, "jsonl") == 2
+
+    records = {Path(record["filepath"]).name: record
+               for record in map(json.loads, stream.getvalue().splitlines())}
+    assert records["broken.py"]["error"].startswith("SyntaxError")
+    [issue] = records["squares.py"]["issues"]
+    assert issue["issue_type"] == "list_comprehension"
+    assert issue["original_code"].strip().startswith("for num in numbers:")
+
+
+def test_jsonl_paths_relative_to_root(project):
+    analyzer = ProjectAnalyzer(str(project), jobs=1)
+    stream = io.StringIO()
+
+    write_results(analyzer.iter_project(), stream, "jsonl", root_path=project)
+
+    paths = sorted(json.loads(line)["filepath"] for line in stream.getvalue().splitlines())
+    assert paths == sorted(path.relative_to(project).as_posix() for path in project.rglob("*.py"))
+
+
+def test_sarif_document(project):
+    analyzer = ProjectAnalyzer(str(project), jobs=1)
+    stream = io.StringIO()
+
+    write_results(analyzer.iter_project(), stream, "sarif", root_path=project)
+
+    log = json.loads(stream.getvalue())
+    assert log["version"] == "2.1.0"
+    [run] = log["runs"]
+    [result] = run["results"]
+    assert result["ruleId"] == "list_comprehension"
+    location = result["locations"][0]["physicalLocation"]
+    assert location["artifactLocation"] == {"uri": "squares.py", "uriBaseId": "%SRCROOT%"}
+    assert location["region"]["startLine"] == 4
+    [notification] = run["invocations"][0]["toolExecutionNotifications"]
+    assert notification["message"]["text"].startswith("SyntaxError")
+
+
+def test_sarif_columns_are_utf16_code_units():
+    from pyrefactor.models import CodeIssue, SourceSpan, SourceText
+    from pyrefactor.writers import SARIFWriter
+
+    prefix = 'x = "\xe9\U0001f600"; '
+    source = SourceText(prefix + "y = 1\n")
+    start = len(prefix.encode("utf-8"))
+    issue = CodeIssue(1, "example", "", "", SourceSpan(source, 1, start, 1, start + 5))
+
+    # 'é' is one UTF-16 code unit (two UTF-8 bytes), the emoji two (four bytes)
+    assert SARIFWriter._region(issue) == {"startLine": 1, "startColumn": 12, "endLine": 1, "endColumn": 17}
+
+
+def test_sarif_without_results_is_valid_json():
+    stream = io.StringIO()
+    write_results([], stream, "sarif")
+    assert json.loads(stream.getvalue())["runs"][0]["results"] == []
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        write_results([], io.StringIO(), "xml")